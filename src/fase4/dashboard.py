@@ -4,7 +4,7 @@ Dashboard principal integrando todas as fases do FarmTech Solutions
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from typing import Tuple
 import os
@@ -65,14 +65,19 @@ class Dashboard:
     def exibir_dados_sensor_umidade(self, conn):
         """Exibe os dados do sensor de umidade"""
         cursor = conn.cursor()
+        # Ordena pelas colunas da tabela (l.), não pelos aliases de TO_CHAR, para usar IX_LEITURA_*_DATA:
+        # o índice entrega as linhas já ordenadas e o ROWNUM para nas mais recentes
         cursor.execute("""
-            SELECT id_leitura_umidade, id_sensor_umidade, 
-                   TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
-                   TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
-                   valor_umidade_leitura 
-            FROM LEITURA_SENSOR_UMIDADE 
-            ORDER BY data_leitura DESC, hora_leitura DESC
-        """)
+            SELECT * FROM (
+                SELECT id_leitura_umidade, id_sensor_umidade, 
+                       TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
+                       TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
+                       valor_umidade_leitura 
+                FROM LEITURA_SENSOR_UMIDADE l
+                WHERE l.data_leitura IS NOT NULL
+                ORDER BY l.data_leitura DESC, l.hora_leitura DESC
+            ) WHERE ROWNUM <= :limite
+        """, limite=self.LIMITE_LEITURAS_RECENTES)
         resultados = cursor.fetchall()
         
         if resultados:
@@ -81,21 +86,79 @@ class Dashboard:
             ])
             
             # Formatação e métricas
-            self._exibir_metricas_umidade(df)
-            self._exibir_grafico_umidade(df)
+            periodo = self._periodo_rollups('umidade')
+            self._exibir_metricas_umidade(df, self._resumo_rollups(conn, 'umidade', periodo))
+            self._exibir_grafico_umidade(df, self._serie_rollups(conn, 'umidade', 'Umidade (%)', periodo))
             self._exibir_tabela_umidade(df)
         else:
             st.info("Nenhum dado encontrado para o sensor de umidade.")
         
         cursor.close()
     
-    def _exibir_metricas_umidade(self, df):
+    # Leituras brutas buscadas para a última leitura e o histórico; o gráfico e as médias vêm dos rollups
+    LIMITE_LEITURAS_RECENTES = 200
+    
+    # Período do gráfico -> (dias, duração do rollup em segundos): no máximo ~1.440 pontos por sensor
+    PERIODOS_ROLLUP = {
+        "Últimas 24 horas": (1, 60),
+        "Últimos 7 dias": (7, 3600),
+        "Últimos 90 dias": (90, 86400)
+    }
+    
+    def _periodo_rollups(self, tipo_sensor):
+        """Período escolhido para as métricas e o gráfico do sensor: (dias, duração do rollup em segundos)"""
+        periodo = st.selectbox("Período", list(self.PERIODOS_ROLLUP), index=1, key=f"periodo_{tipo_sensor}")
+        return self.PERIODOS_ROLLUP[periodo]
+    
+    def _serie_rollups(self, conn, tipo_sensor, coluna, periodo):
+        """Média, mínimo e máximo por período a partir de ROLLUP_LEITURA; None se não houver rollups"""
+        dias, duracao = periodo
+        cursor = conn.cursor()
+        try:
+            # Faixa da chave primária (tipo_sensor, duracao_periodo, inicio_periodo): um registro por período e sensor
+            cursor.execute("""
+                SELECT inicio_periodo, SUM(soma) / SUM(quantidade), MIN(minimo), MAX(maximo)
+                FROM ROLLUP_LEITURA
+                WHERE tipo_sensor = :tipo AND duracao_periodo = :duracao AND inicio_periodo >= :desde
+                GROUP BY inicio_periodo
+                ORDER BY inicio_periodo
+            """, tipo=tipo_sensor, duracao=duracao, desde=datetime.now() - timedelta(days=dias))
+            resultados = cursor.fetchall()
+        except Exception as e:
+            self.logger.warning(f"Rollups indisponíveis para {tipo_sensor}: {e}")
+            return None
+        finally:
+            cursor.close()
+        if not resultados:
+            return None
+        return pd.DataFrame(resultados, columns=['Data_Hora', coluna, 'Mínimo', 'Máximo'])
+    
+    def _resumo_rollups(self, conn, tipo_sensor, periodo):
+        """Média e leituras fora do limite no mesmo período do gráfico, a partir dos rollups da ingestão"""
+        dias, duracao = periodo
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT SUM(soma) / NULLIF(SUM(quantidade), 0), SUM(fora_limite)
+                FROM ROLLUP_LEITURA
+                WHERE tipo_sensor = :tipo AND duracao_periodo = :duracao AND inicio_periodo >= :desde
+            """, tipo=tipo_sensor, duracao=duracao, desde=datetime.now() - timedelta(days=dias))
+            media, valores_fora = cursor.fetchone()
+        except Exception as e:
+            self.logger.warning(f"Rollups indisponíveis para {tipo_sensor}: {e}")
+            return None
+        finally:
+            cursor.close()
+        # Sem rollups ainda, as métricas são calculadas a partir das leituras
+        return None if media is None else (float(media), int(valores_fora))
+    
+    def _exibir_metricas_umidade(self, df, resumo=None):
         """Exibe métricas do sensor de umidade"""
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(
                 "Média de Umidade", 
-                f"{df['Umidade (%)'].mean():.2f}%",
+                f"{(resumo[0] if resumo else df['Umidade (%)'].mean()):.2f}%",
                 delta_color="inverse"
             )
         with col2:
@@ -106,17 +169,20 @@ class Dashboard:
                 f"{ultimo_valor:.2f}% {status}"
             )
         with col3:
-            valores_fora = len(df[(df['Umidade (%)'] < 45) | (df['Umidade (%)'] > 55)])
+            valores_fora = resumo[1] if resumo else len(df[(df['Umidade (%)'] < 45) | (df['Umidade (%)'] > 55)])
             st.metric("Leituras Fora do Limite", valores_fora)
     
-    def _exibir_grafico_umidade(self, df):
-        """Exibe gráfico de umidade"""
+    def _exibir_grafico_umidade(self, df, serie=None):
+        """Exibe gráfico de umidade (médias dos rollups ou, sem eles, as leituras recentes)"""
         try:
-            # Combina data e hora em uma única coluna datetime
-            df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
-            
-            # Ordena o DataFrame pela data/hora
-            df = df.sort_values('Data_Hora')
+            if serie is not None:
+                df = serie
+            else:
+                # Combina data e hora em uma única coluna datetime
+                df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
+                
+                # Ordena o DataFrame pela data/hora
+                df = df.sort_values('Data_Hora')
             
             fig = px.line(df, x='Data_Hora', y='Umidade (%)', 
                          title='Monitoramento de Umidade',
@@ -149,13 +215,16 @@ class Dashboard:
         """Exibe os dados do sensor de temperatura"""
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id_leitura_temperatura, id_sensor_umidade, 
-                   TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
-                   TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
-                   valor_temperatura 
-            FROM LEITURA_SENSOR_TEMPERATURA 
-            ORDER BY data_leitura DESC, hora_leitura DESC
-        """)
+            SELECT * FROM (
+                SELECT id_leitura_temperatura, id_sensor_umidade, 
+                       TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
+                       TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
+                       valor_temperatura 
+                FROM LEITURA_SENSOR_TEMPERATURA l
+                WHERE l.data_leitura IS NOT NULL
+                ORDER BY l.data_leitura DESC, l.hora_leitura DESC
+            ) WHERE ROWNUM <= :limite
+        """, limite=self.LIMITE_LEITURAS_RECENTES)
         resultados = cursor.fetchall()
         
         if resultados:
@@ -164,21 +233,22 @@ class Dashboard:
             ])
             
             # Formatação e métricas
-            self._exibir_metricas_temperatura(df)
-            self._exibir_grafico_temperatura(df)
+            periodo = self._periodo_rollups('temperatura')
+            self._exibir_metricas_temperatura(df, self._resumo_rollups(conn, 'temperatura', periodo))
+            self._exibir_grafico_temperatura(df, self._serie_rollups(conn, 'temperatura', 'Temperatura (°C)', periodo))
             self._exibir_tabela_temperatura(df)
         else:
             st.info("Nenhum dado encontrado para o sensor de temperatura.")
         
         cursor.close()
     
-    def _exibir_metricas_temperatura(self, df):
+    def _exibir_metricas_temperatura(self, df, resumo=None):
         """Exibe métricas do sensor de temperatura"""
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(
                 "Temperatura Média", 
-                f"{df['Temperatura (°C)'].mean():.2f}°C",
+                f"{(resumo[0] if resumo else df['Temperatura (°C)'].mean()):.2f}°C",
                 delta_color="inverse"
             )
         with col2:
@@ -189,17 +259,20 @@ class Dashboard:
                 f"{ultimo_valor:.2f}°C {status}"
             )
         with col3:
-            valores_fora = len(df[(df['Temperatura (°C)'] < 12) | (df['Temperatura (°C)'] > 36)])
+            valores_fora = resumo[1] if resumo else len(df[(df['Temperatura (°C)'] < 12) | (df['Temperatura (°C)'] > 36)])
             st.metric("Leituras Fora do Limite", valores_fora)
     
-    def _exibir_grafico_temperatura(self, df):
-        """Exibe gráfico de temperatura"""
+    def _exibir_grafico_temperatura(self, df, serie=None):
+        """Exibe gráfico de temperatura (médias dos rollups ou, sem eles, as leituras recentes)"""
         try:
-            # Combina data e hora em uma única coluna datetime
-            df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
-            
-            # Ordena o DataFrame pela data/hora
-            df = df.sort_values('Data_Hora')
+            if serie is not None:
+                df = serie
+            else:
+                # Combina data e hora em uma única coluna datetime
+                df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
+                
+                # Ordena o DataFrame pela data/hora
+                df = df.sort_values('Data_Hora')
             
             fig = px.line(df, x='Data_Hora', y='Temperatura (°C)', 
                          title='Monitoramento de Temperatura',
@@ -232,13 +305,16 @@ class Dashboard:
         """Exibe os dados do sensor de pH"""
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id_leitura_ph, id_sensor_ph, 
-                   TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
-                   TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
-                   valor_ph_leitura 
-            FROM LEITURA_SENSOR_PH 
-            ORDER BY data_leitura DESC, hora_leitura DESC
-        """)
+            SELECT * FROM (
+                SELECT id_leitura_ph, id_sensor_ph, 
+                       TO_CHAR(data_leitura, 'YYYY-MM-DD') as data_leitura,
+                       TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura, 
+                       valor_ph_leitura 
+                FROM LEITURA_SENSOR_PH l
+                WHERE l.data_leitura IS NOT NULL
+                ORDER BY l.data_leitura DESC, l.hora_leitura DESC
+            ) WHERE ROWNUM <= :limite
+        """, limite=self.LIMITE_LEITURAS_RECENTES)
         resultados = cursor.fetchall()
         
         if resultados:
@@ -247,21 +323,22 @@ class Dashboard:
             ])
             
             # Formatação e métricas
-            self._exibir_metricas_ph(df)
-            self._exibir_grafico_ph(df)
+            periodo = self._periodo_rollups('ph')
+            self._exibir_metricas_ph(df, self._resumo_rollups(conn, 'ph', periodo))
+            self._exibir_grafico_ph(df, self._serie_rollups(conn, 'ph', 'pH', periodo))
             self._exibir_tabela_ph(df)
         else:
             st.info("Nenhum dado encontrado para o sensor de pH.")
         
         cursor.close()
     
-    def _exibir_metricas_ph(self, df):
+    def _exibir_metricas_ph(self, df, resumo=None):
         """Exibe métricas do sensor de pH"""
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(
                 "pH Médio", 
-                f"{df['pH'].mean():.2f}",
+                f"{(resumo[0] if resumo else df['pH'].mean()):.2f}",
                 delta_color="inverse"
             )
         with col2:
@@ -273,17 +350,20 @@ class Dashboard:
                 f"{ultimo_valor:.2f} {status}"
             )
         with col3:
-            valores_fora = len(df[(df['pH'] < 6.0) | (df['pH'] > 7.5)])
+            valores_fora = resumo[1] if resumo else len(df[(df['pH'] < 6.0) | (df['pH'] > 7.5)])
             st.metric("Leituras Fora do Limite", valores_fora)
     
-    def _exibir_grafico_ph(self, df):
-        """Exibe gráfico de pH"""
+    def _exibir_grafico_ph(self, df, serie=None):
+        """Exibe gráfico de pH (médias dos rollups ou, sem eles, as leituras recentes)"""
         try:
-            # Combina data e hora em uma única coluna datetime
-            df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
-            
-            # Ordena o DataFrame pela data/hora
-            df = df.sort_values('Data_Hora')
+            if serie is not None:
+                df = serie
+            else:
+                # Combina data e hora em uma única coluna datetime
+                df['Data_Hora'] = pd.to_datetime(df['Data'] + ' ' + df['Hora'])
+                
+                # Ordena o DataFrame pela data/hora
+                df = df.sort_values('Data_Hora')
             
             fig = px.line(df, x='Data_Hora', y='pH', 
                          title='Monitoramento de pH do Solo',
@@ -312,6 +392,113 @@ class Dashboard:
         styled_df = df.style.format({'pH': '{:.2f}'})
         st.dataframe(styled_df, width=1000)
     
+    # id_sensor -> nutriente (botões K e P do ESP32, tópicos sensor/potassio e sensor/sodio)
+    NUTRIENTES_POR_SENSOR = {4: "Potássio (K)", 5: "Fósforo (P)"}
+    
+    def exibir_dados_sensor_nutrientes(self, conn):
+        """Exibe as leituras dos botões de nutrientes no intervalo escolhido"""
+        hoje = datetime.now().date()
+        intervalo = st.date_input("Intervalo", (hoje - timedelta(days=7), hoje))
+        if not isinstance(intervalo, tuple) or len(intervalo) != 2:
+            st.info("Selecione a data inicial e a final.")
+            return
+        inicio, fim = intervalo
+        
+        # Faixa de datas em data_leitura: varredura de intervalo em IX_LEITURA_NUTRIENTES_DATA
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT l.id_sensor_nutrientes,
+                   CAST(l.data_leitura AS TIMESTAMP) + (l.hora_leitura - TRUNC(l.hora_leitura)) as momento,
+                   l.valor_nutrientes_leitura
+            FROM LEITURA_SENSOR_NUTRIENTES l
+            WHERE l.data_leitura >= :inicio AND l.data_leitura < :fim
+            ORDER BY l.data_leitura DESC, l.hora_leitura DESC
+        """, inicio=datetime.combine(inicio, datetime.min.time()),
+            fim=datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+        resultados = cursor.fetchall()
+        cursor.close()
+        
+        if not resultados:
+            st.info("Nenhuma leitura de nutrientes no intervalo.")
+            return
+        
+        df = pd.DataFrame(resultados, columns=['ID Sensor', 'Momento', 'Valor'])
+        df['Nutriente'] = df['ID Sensor'].map(self.NUTRIENTES_POR_SENSOR).fillna('Sensor ' + df['ID Sensor'].astype(str))
+        
+        colunas = st.columns(max(1, df['Nutriente'].nunique()))
+        for coluna, (nutriente, leituras) in zip(colunas, df.groupby('Nutriente')):
+            with coluna:
+                st.metric(f"Último {nutriente}", f"{leituras['Valor'].iloc[0]:.2f}",
+                          help=f"{len(leituras)} leitura(s) no intervalo")
+        
+        fig = px.line(df.sort_values('Momento'), x='Momento', y='Valor', color='Nutriente',
+                      line_shape='hv', markers=True, title='Leituras de Nutrientes')
+        fig.update_layout(xaxis_title="Data/Hora", yaxis_title="Valor", hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.write("### Histórico de Leituras")
+        st.dataframe(df[['Momento', 'Nutriente', 'Valor']], width=1000)
+    
+    # Período do gráfico -> (dias, granularidade do TRUNC no Oracle)
+    PERIODOS_TENDENCIA = {
+        "Últimos 7 dias": (7, 'HH'),
+        "Últimos 30 dias": (30, 'HH'),
+        "Últimos 90 dias": (90, 'DD'),
+        "Último ano": (365, 'DD')
+    }
+    
+    def exibir_tendencias_agregadas(self, conn):
+        """Exibe as tendências de longo prazo a partir dos resumos de janela (LEITURA_AGREGADA)"""
+        col1, col2 = st.columns(2)
+        with col1:
+            tipo = st.selectbox("Sensor", ["umidade", "temperatura", "ph"])
+        with col2:
+            periodo = st.selectbox("Período", list(self.PERIODOS_TENDENCIA))
+        dias, granularidade = self.PERIODOS_TENDENCIA[periodo]
+        
+        # As janelas são combinadas no banco: média ponderada pela contagem de cada janela
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT TRUNC(inicio_janela, '{granularidade}') as periodo, id_sensor,
+                   MIN(valor_minimo), MAX(valor_maximo),
+                   SUM(valor_medio * quantidade_leituras) / SUM(quantidade_leituras),
+                   SUM(quantidade_leituras)
+            FROM LEITURA_AGREGADA
+            WHERE tipo_sensor = :tipo AND inicio_janela >= :desde
+            GROUP BY TRUNC(inicio_janela, '{granularidade}'), id_sensor
+            ORDER BY periodo
+        """, tipo=tipo, desde=datetime.now() - timedelta(days=dias))
+        resultados = cursor.fetchall()
+        cursor.close()
+        
+        if not resultados:
+            st.info("Nenhum resumo de janela encontrado para o período.")
+            return
+        
+        df = pd.DataFrame(resultados, columns=[
+            'Período', 'ID Sensor', 'Mínimo', 'Máximo', 'Média', 'Leituras'
+        ])
+        df['ID Sensor'] = df['ID Sensor'].astype(str)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Média no Período", f"{(df['Média'] * df['Leituras']).sum() / df['Leituras'].sum():.2f}")
+        with col2:
+            st.metric("Mínimo / Máximo", f"{df['Mínimo'].min():.2f} / {df['Máximo'].max():.2f}")
+        with col3:
+            st.metric("Leituras Resumidas", int(df['Leituras'].sum()))
+        
+        fig = px.line(df, x='Período', y='Média', color='ID Sensor',
+                      title=f'Tendência de {tipo} ({periodo.lower()})')
+        for _, sensor in df.groupby('ID Sensor'):
+            fig.add_scatter(x=sensor['Período'], y=sensor['Máximo'], mode='lines',
+                            line=dict(width=0), showlegend=False, hoverinfo='skip')
+            fig.add_scatter(x=sensor['Período'], y=sensor['Mínimo'], mode='lines',
+                            line=dict(width=0), fill='tonexty', fillcolor='rgba(57, 255, 20, 0.15)',
+                            showlegend=False, hoverinfo='skip')
+        fig.update_layout(xaxis_title="Período", yaxis_title=tipo, hovermode='x unified')
+        st.plotly_chart(fig, use_container_width=True)
+    
     def run(self):
         """Executa o dashboard"""
         conn = conectar_banco()
@@ -329,6 +516,8 @@ class Dashboard:
                     "Exibir Dados do Sensor de Umidade",
                     "Exibir Dados do Sensor de Temperatura",
                     "Exibir Dados do Sensor de pH",
+                    "Exibir Dados dos Sensores de Nutrientes",
+                    "Tendências de Longo Prazo",
                     "Ligar Bomba de Água",
                     "Desligar Bomba de Água",
                     "Consultar Previsão do Tempo",
@@ -411,6 +600,14 @@ class Dashboard:
                     # Aqui você pode adicionar alertas de pH se necessário
                     # self.alert_system.check_ph_alert(ultimo_ph, self.logger)
             
+            elif selected == "Exibir Dados dos Sensores de Nutrientes":
+                st.title("Dados dos Sensores de Nutrientes")
+                self.exibir_dados_sensor_nutrientes(conn)
+            
+            elif selected == "Tendências de Longo Prazo":
+                st.title("Tendências de Longo Prazo")
+                self.exibir_tendencias_agregadas(conn)
+            
             elif selected == "Ligar Bomba de Água":
                 st.title("Controle da Bomba de Água")
                 self.mqtt_handler.ligar_bomba_agua()
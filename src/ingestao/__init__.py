@@ -0,0 +1,3 @@
+"""
+Módulo de ingestão das leituras MQTT no banco Oracle
+"""
@@ -0,0 +1,75 @@
+"""
+Resumos de janela (mínimo, máximo, média e contagem) calculados no próprio dispositivo
+
+Em vez de publicar cada leitura, o dispositivo pode publicar um resumo por
+janela, no mesmo formato JSON das leituras, trocando ``Valor`` pelos campos
+da janela:
+
+    {"id_sensor": 3, "data_leitura": "2024-11-20", "hora_leitura": "10:00:00",
+     "janela": 60, "minimo": 6.1, "maximo": 6.4, "media": 6.25, "contagem": 12}
+
+``data_leitura``/``hora_leitura`` marcam o início da janela e ``janela`` é a
+duração em segundos. Os resumos de todos os tipos vão para LEITURA_AGREGADA.
+"""
+import math
+from datetime import datetime
+from typing import Optional, Tuple
+
+TABELA_AGREGADOS = 'LEITURA_AGREGADA'
+
+COMANDO_AGREGADOS = """
+    INSERT INTO LEITURA_AGREGADA
+    (id_leitura_agregada, tipo_sensor, id_sensor, inicio_janela, duracao_janela,
+     valor_minimo, valor_maximo, valor_medio, quantidade_leituras, recebida_em)
+    VALUES
+    (LEITURA_AGREGADA_SEQ.NEXTVAL, :tipo_sensor, :id_sensor, :inicio_janela, :duracao_janela,
+     :valor_minimo, :valor_maximo, :valor_medio, :quantidade_leituras, :recebida_em)
+"""
+
+CAMPO_JANELA = "janela"
+
+# (id_sensor, início da janela, duração em s, mínimo, máximo, média, contagem)
+Agregado = Tuple[object, datetime, int, float, float, float, int]
+
+
+def eh_agregado(item: dict) -> bool:
+    """Indica se o item do payload é um resumo de janela em vez de uma leitura"""
+    return CAMPO_JANELA in item
+
+
+def valores_da_janela(item: dict) -> Optional[Tuple[int, float, float, float, int]]:
+    """
+    (duração, mínimo, máximo, média, contagem) do item; None se faltar campo ou a janela estiver vazia.
+
+    Valores não finitos ou mínimo acima do máximo levantam ValueError: o
+    resumo é descartado como uma leitura inválida, antes de chegar ao banco.
+    """
+    campos = (item.get(CAMPO_JANELA), item.get("minimo"), item.get("maximo"),
+              item.get("media"), item.get("contagem"))
+    if None in campos:
+        return None
+    duracao, minimo, maximo, media, contagem = campos
+    duracao, contagem = int(duracao), int(contagem)
+    if duracao <= 0 or contagem <= 0:
+        return None
+    minimo, maximo, media = float(minimo), float(maximo), float(media)
+    if not all(math.isfinite(valor) for valor in (minimo, maximo, media)):
+        raise ValueError(f"resumo com valor não finito: {(minimo, maximo, media)!r}")
+    if minimo > maximo:
+        raise ValueError(f"resumo com mínimo {minimo} acima do máximo {maximo}")
+    return duracao, minimo, maximo, media, contagem
+
+
+def montar_linha_agregada(tipo_sensor: str, agregado: Agregado) -> dict:
+    """Converte um resumo de janela nos binds do INSERT de LEITURA_AGREGADA"""
+    id_sensor, inicio, duracao, minimo, maximo, media, contagem = agregado
+    return {
+        'tipo_sensor': tipo_sensor,
+        'id_sensor': id_sensor,
+        'inicio_janela': inicio,
+        'duracao_janela': duracao,
+        'valor_minimo': round(minimo, 2),
+        'valor_maximo': round(maximo, 2),
+        'valor_medio': round(media, 2),
+        'quantidade_leituras': contagem
+    }
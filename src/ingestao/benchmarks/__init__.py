@@ -0,0 +1,3 @@
+"""
+Benchmarks da ingestão (executar a partir de src/ com python -m)
+"""
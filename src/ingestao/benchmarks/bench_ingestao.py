@@ -0,0 +1,247 @@
+"""
+Vazão da ingestão com uma frota sintética de ESP32
+
+Gera payloads no formato do firmware (id_sensor, data_leitura, hora_leitura,
+Valor) para N dispositivos e os entrega ao ``on_message`` do mqtt_client, como
+faria a thread de rede do paho. O Oracle é substituído por um banco local em
+memória com latência configurável por executemany/commit. Relata msgs/s,
+latência de ponta a ponta (on_message -> commit) p50/p99 e commits/s.
+Com ``--formato binario`` os mesmos dados vão no layout de ingestao.binario.
+
+Executar a partir de src/:
+    python -m ingestao.benchmarks.bench_ingestao --dispositivos 50 --mensagens 200
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from ingestao.binario import codificar_leitura
+
+# Topicos e IDs publicados pelo firmware (PlatformIO/src/main.cpp)
+SENSORES_DO_FIRMWARE = (
+    ("sensor/umidade", 1, 30.0, 70.0),
+    ("sensor/temperatura", 2, 12.0, 36.0),
+    ("sensor/ph", 3, 4.0, 9.0),
+)
+INICIO = datetime(2024, 5, 1)
+
+
+def gerar_frota(dispositivos: int, mensagens: int, formato: str = 'json',
+                por_mensagem: int = 1) -> List[Tuple[str, bytes, List[tuple]]]:
+    """
+    Mensagens (tópico, payload, chaves) de ``dispositivos`` ESP32, cada um
+    publicando ``mensagens`` leituras de cada sensor, intercaladas como na
+    rede. Com ``por_mensagem`` > 1 cada payload leva várias leituras (lista
+    JSON ou registros binários concatenados). A hora é única por dispositivo
+    para que nenhuma leitura seja descartada como repetida; as chaves
+    identificam as linhas gravadas no banco.
+    """
+    frota = []
+    for primeira in range(0, mensagens, por_mensagem):
+        for dispositivo in range(dispositivos):
+            for topico, id_sensor, minimo, maximo in SENSORES_DO_FIRMWARE:
+                leituras, chaves = [], []
+                for indice in range(primeira, min(primeira + por_mensagem, mensagens)):
+                    momento = INICIO + timedelta(seconds=indice * dispositivos + dispositivo)
+                    valor = round(minimo + (indice * 7 + dispositivo * 13) % 100 * (maximo - minimo) / 100, 2)
+                    leituras.append((id_sensor, momento, valor))
+                    chaves.append((id_sensor, momento.date(), momento.time()))
+                if formato == 'binario':
+                    payload = b''.join(codificar_leitura(*leitura) for leitura in leituras)
+                else:
+                    itens = [{
+                        "id_sensor": id_sensor,
+                        "data_leitura": momento.strftime('%Y-%m-%d'),
+                        "hora_leitura": momento.strftime('%H:%M:%S'),
+                        "Valor": valor
+                    } for id_sensor, momento, valor in leituras]
+                    payload = json.dumps(itens if por_mensagem > 1 else itens[0]).encode()
+                frota.append((topico, payload, chaves))
+    return frota
+
+
+class BancoLocal:
+    """Substituto do Oracle: guarda as linhas e mede quando cada uma foi confirmada"""
+
+    def __init__(self, latencia_executemany: float = 0.0, latencia_commit: float = 0.0):
+        self.latencia_executemany = latencia_executemany
+        self.latencia_commit = latencia_commit
+        self.commits = 0
+        self.linhas_gravadas = 0
+        self.confirmadas: Dict[tuple, float] = {}  # chave -> instante do commit
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def conexao(self):
+        """Mesma interface do ``PoolConexoes``"""
+        yield _ConexaoLocal(self)
+
+    def fechar(self):
+        pass
+
+
+class _ConexaoLocal:
+    def __init__(self, banco: BancoLocal):
+        self.banco = banco
+        self.pendentes: List[dict] = []
+
+    def cursor(self):
+        return _CursorLocal(self)
+
+    def commit(self):
+        time.sleep(self.banco.latencia_commit)
+        agora = time.perf_counter()
+        with self.banco._lock:
+            self.banco.commits += 1
+            for linha in self.pendentes:
+                if 'data_leitura' in linha:
+                    chave = (linha['id_sensor'], linha['data_leitura'], linha['hora_leitura'].time())
+                    self.banco.confirmadas[chave] = agora
+                    self.banco.linhas_gravadas += 1
+        self.pendentes = []
+
+    def is_healthy(self):
+        return True
+
+
+class _CursorLocal:
+    def __init__(self, conexao: _ConexaoLocal):
+        self.conexao = conexao
+
+    def execute(self, sql, parametros=None):
+        pass
+
+    def executemany(self, sql, linhas, batcherrors=False):
+        time.sleep(self.conexao.banco.latencia_executemany)
+        self.conexao.pendentes.extend(linhas)
+
+    def getbatcherrors(self):
+        return []
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ClienteFalso:
+    """Cliente MQTT que só conta as publicações (comandos da bomba)"""
+
+    def __init__(self):
+        self.publicacoes = 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.publicacoes += 1
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por posição (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def executar(dispositivos: int, mensagens: int, latencia_executemany: float,
+             latencia_commit: float, timeout: float, formato: str = 'json', por_mensagem: int = 1) -> dict:
+    """Roda a frota pelo mqtt_client e devolve as métricas"""
+    # Configuração lida na importação do mqtt_client: sem Oracle real nem spool no repositório
+    os.environ.setdefault('DB_USER', 'benchmark')
+    os.environ.setdefault('DB_PASSWORD', 'benchmark')
+    os.environ.setdefault('DB_DSN', 'localhost/benchmark')
+    os.environ.setdefault('SPOOL_CAMINHO', os.path.join(tempfile.mkdtemp(), 'spool.db'))
+    if formato == 'binario':
+        os.environ['PAYLOAD_BINARIO_TOPICOS'] = 'sensor/#'
+    import paho.mqtt.client as mqtt
+    import mqtt_client
+
+    # O console não faz parte da medição; o arquivo de log continua sendo escrito
+    devnull = open(os.devnull, 'w')
+    for handler in mqtt_client.ouvinte_logs.handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(devnull)
+
+    banco = BancoLocal(latencia_executemany, latencia_commit)
+    mqtt_client.escritor.pool_conexoes = banco
+    cliente = ClienteFalso()
+    frota = gerar_frota(dispositivos, mensagens, formato, por_mensagem)
+    total = sum(len(chaves) for _, _, chaves in frota)
+    enviadas: Dict[tuple, float] = {}
+
+    mqtt_client.escritor.iniciar()
+    mqtt_client.pipeline.iniciar()
+    try:
+        with contextlib.redirect_stdout(devnull):
+            inicio = time.perf_counter()
+            for topico, payload, chaves in frota:
+                msg = mqtt.MQTTMessage(topic=topico.encode())
+                msg.payload = payload
+                agora = time.perf_counter()
+                for chave in chaves:
+                    enviadas[chave] = agora
+                mqtt_client.on_message(cliente, None, msg)
+            fim_envio = time.perf_counter()
+
+            limite = fim_envio + timeout
+            while banco.linhas_gravadas < total and time.perf_counter() < limite:
+                time.sleep(0.01)
+            fim = time.perf_counter()
+    finally:
+        mqtt_client.pipeline.encerrar()
+        mqtt_client.escritor.encerrar()
+        mqtt_client.spool.fechar()
+        mqtt_client.ouvinte_logs.stop()
+        devnull.close()
+
+    latencias = sorted((banco.confirmadas[chave] - enviadas[chave]) * 1000
+                       for chave in enviadas if chave in banco.confirmadas)
+    duracao = fim - inicio
+    return {
+        'mensagens': len(frota),
+        'leituras': total,
+        'gravadas': banco.linhas_gravadas,
+        'duracao': duracao,
+        'leituras_por_s': banco.linhas_gravadas / duracao,
+        'on_message_por_s': len(frota) / (fim_envio - inicio),
+        'p50_ms': percentil(latencias, 0.50),
+        'p99_ms': percentil(latencias, 0.99),
+        'media_ms': statistics.fmean(latencias) if latencias else 0.0,
+        'commits': banco.commits,
+        'commits_por_s': banco.commits / duracao,
+        'publicacoes_bomba': cliente.publicacoes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão MQTT com frota sintética de ESP32")
+    parser.add_argument('--dispositivos', type=int, default=50, help="ESP32 simulados")
+    parser.add_argument('--mensagens', type=int, default=200, help="leituras de cada sensor por dispositivo")
+    parser.add_argument('--latencia-executemany', type=float, default=2.0, help="ms por executemany no banco local")
+    parser.add_argument('--latencia-commit', type=float, default=5.0, help="ms por commit no banco local")
+    parser.add_argument('--formato', choices=('json', 'binario'), default='json', help="codificação dos payloads")
+    parser.add_argument('--por-mensagem', type=int, default=1, help="leituras por payload (lista JSON ou binário)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="segundos de espera pelos commits após o envio")
+    args = parser.parse_args()
+
+    resultado = executar(args.dispositivos, args.mensagens, args.latencia_executemany / 1000,
+                         args.latencia_commit / 1000, args.timeout, args.formato,
+                         args.por_mensagem)
+    print(f"Mensagens:        {resultado['mensagens']} com {resultado['leituras']} leituras "
+          f"({resultado['gravadas']} gravadas em {resultado['duracao']:.2f} s)")
+    print(f"Vazão:            {resultado['leituras_por_s']:.0f} leituras/s (on_message: {resultado['on_message_por_s']:.0f} msgs/s)")
+    print(f"Latência:         p50 {resultado['p50_ms']:.1f} ms | p99 {resultado['p99_ms']:.1f} ms | média {resultado['media_ms']:.1f} ms")
+    print(f"Commits:          {resultado['commits']} ({resultado['commits_por_s']:.1f}/s)")
+    print(f"Comandos bomba:   {resultado['publicacoes_bomba']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compara a decodificação do payload JSON do firmware com o formato binário
+
+Executar a partir de src/:
+    python -m ingestao.benchmarks.bench_payload
+"""
+import json
+import timeit
+from datetime import datetime
+
+from ingestao.binario import codificar_leitura, decodificar_leituras
+from ingestao.tempo import converter_data_hora
+
+REPETICOES = 200000
+
+PAYLOAD_JSON = json.dumps({
+    "id_sensor": 1,
+    "data_leitura": "2024-05-01",
+    "hora_leitura": "10:30:15",
+    "Valor": 48.57
+}).encode()
+PAYLOAD_BINARIO = codificar_leitura(1, datetime(2024, 5, 1, 10, 30, 15), 48.57)
+
+
+def decodificar_json(payload: bytes):
+    """Caminho JSON do mqtt_client: json.loads, campos e conversão de data/hora"""
+    leitura = json.loads(payload)
+    return (leitura.get("id_sensor"),
+            converter_data_hora(leitura.get("data_leitura"), leitura.get("hora_leitura")),
+            leitura.get("Valor"))
+
+
+def medir(funcao, payload: bytes) -> float:
+    """Microssegundos por payload"""
+    tempo = timeit.timeit(lambda: funcao(payload), number=REPETICOES)
+    return tempo / REPETICOES * 1e6
+
+
+def main():
+    json_us = medir(decodificar_json, PAYLOAD_JSON)
+    binario_us = medir(decodificar_leituras, PAYLOAD_BINARIO)
+    print(f"JSON:    {len(PAYLOAD_JSON):3} bytes | {json_us:5.2f} µs")
+    print(f"Binário: {len(PAYLOAD_BINARIO):3} bytes | {binario_us:5.2f} µs | "
+          f"{json_us / binario_us:4.1f}x mais rápido, {len(PAYLOAD_JSON) / len(PAYLOAD_BINARIO):4.1f}x menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Compara a conversão de data/hora do ingestao.tempo com o strptime usado antes
+
+Executar a partir de src/:
+    python -m ingestao.benchmarks.bench_tempo
+"""
+import timeit
+from datetime import datetime
+
+from ingestao.tempo import converter_data_hora
+
+REPETICOES = 200000
+
+
+def strptime_anterior(data_leitura, hora_leitura):
+    """Conversão antiga: tenta HH:MM:SS e cai no ValueError para HH:MM"""
+    try:
+        return datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return datetime.strptime(f"{data_leitura} {hora_leitura}:00", '%Y-%m-%d %H:%M:%S')
+
+
+def medir(funcao, hora_leitura: str) -> float:
+    """Microssegundos por conversão"""
+    tempo = timeit.timeit(lambda: funcao("2024-05-01", hora_leitura), number=REPETICOES)
+    return tempo / REPETICOES * 1e6
+
+
+def main():
+    for formato, hora_leitura in (("HH:MM:SS", "10:30:15"), ("HH:MM", "10:30")):
+        anterior = medir(strptime_anterior, hora_leitura)
+        atual = medir(converter_data_hora, hora_leitura)
+        print(f"{formato:9} strptime: {anterior:6.2f} µs | ingestao.tempo: {atual:6.2f} µs | {anterior / atual:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
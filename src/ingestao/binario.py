@@ -0,0 +1,47 @@
+"""
+Formato binário compacto das leituras, alternativo ao JSON do firmware
+
+Cada leitura ocupa 13 bytes little-endian (contra ~80 do JSON):
+
+    uint16 id_sensor | uint16 ano | uint8 mês | uint8 dia |
+    uint8 hora | uint8 minuto | uint8 segundo | float32 valor
+
+Um payload pode trazer várias leituras concatenadas. No ESP32 basta um
+``struct __attribute__((packed))`` com esses campos. Registros com data/hora
+inválida ou valor não finito (NaN, ±inf) são descartados um a um, como no
+JSON, sem perder as demais leituras do payload.
+"""
+import logging
+import math
+import struct
+from datetime import datetime
+from typing import List, Tuple
+
+LEITURA = struct.Struct('<HHBBBBBf')
+
+# Content-Type (MQTT v5) que seleciona o formato binário independentemente do tópico
+CONTEUDO_BINARIO = "application/vnd.farmtech.leitura"
+
+FORMATO_JSON = "json"
+FORMATO_BINARIO = "binario"
+
+
+def codificar_leitura(id_sensor: int, data_hora: datetime, valor: float) -> bytes:
+    """Empacota uma leitura no layout binário"""
+    return LEITURA.pack(id_sensor, data_hora.year, data_hora.month, data_hora.day,
+                        data_hora.hour, data_hora.minute, data_hora.second, valor)
+
+
+def decodificar_leituras(payload: bytes) -> List[Tuple[int, datetime, float]]:
+    """Desempacota as leituras de um payload: (id_sensor, data_hora, valor)"""
+    if not payload or len(payload) % LEITURA.size:
+        raise ValueError(f"Payload binário com tamanho inválido: {len(payload)} bytes")
+    leituras = []
+    for id_sensor, ano, mes, dia, hora, minuto, segundo, valor in LEITURA.iter_unpack(payload):
+        try:
+            if not math.isfinite(valor):
+                raise ValueError(f"valor não finito: {valor!r}")
+            leituras.append((id_sensor, datetime(ano, mes, dia, hora, minuto, segundo), valor))
+        except ValueError as e:
+            logging.warning("⚠️ Leitura ignorada: %s", e)
+    return leituras
@@ -0,0 +1,101 @@
+"""
+Controle da bomba de irrigação com histerese e publicação só nas transições
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from ingestao import config
+
+LIGADA = "ON"
+DESLIGADA = "OFF"
+
+
+class ControladorBomba:
+    """
+    Máquina de estados de uma bomba.
+
+    Liga quando a umidade fica abaixo de ``umidade_ligar`` e desliga quando
+    passa de ``umidade_desligar``; entre os dois limites o estado atual é
+    mantido. Depois de uma mudança, o estado fica fixo por pelo menos
+    ``permanencia_minima`` segundos. Leituras com horário do dispositivo
+    anterior ao da última avaliada chegaram fora de ordem e são ignoradas.
+    """
+
+    def __init__(self, topico: str,
+                 umidade_ligar: float = config.BOMBA_UMIDADE_LIGAR,
+                 umidade_desligar: float = config.BOMBA_UMIDADE_DESLIGAR,
+                 permanencia_minima: float = config.BOMBA_PERMANENCIA_MINIMA):
+        if umidade_ligar > umidade_desligar:
+            raise ValueError("umidade_ligar deve ser menor ou igual a umidade_desligar")
+        self.topico = topico
+        self.umidade_ligar = umidade_ligar
+        self.umidade_desligar = umidade_desligar
+        self.permanencia_minima = permanencia_minima
+        self.estado: Optional[str] = None  # desconhecido até a primeira decisão ou mensagem retida
+        self.acionamentos = 0
+        self.historico = deque(maxlen=100)  # (timestamp, estado, umidade)
+        self._ultima_mudanca = float('-inf')
+        self._ultima_leitura: Optional[datetime] = None  # horário do dispositivo da última leitura avaliada
+        self._lock = threading.Lock()
+
+    def avaliar(self, umidade: float, agora: Optional[float] = None,
+                data_hora: Optional[datetime] = None) -> Optional[str]:
+        """Retorna o comando a publicar (ON/OFF) ou None quando o estado não muda"""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            if data_hora is not None:
+                if self._ultima_leitura is not None and data_hora < self._ultima_leitura:
+                    return None
+                self._ultima_leitura = data_hora
+            if umidade < self.umidade_ligar:
+                desejado = LIGADA
+            elif umidade > self.umidade_desligar:
+                desejado = DESLIGADA
+            elif self.estado is not None:
+                desejado = self.estado
+            else:
+                # Sem estado conhecido, decide pelo meio da faixa
+                meio = (self.umidade_ligar + self.umidade_desligar) / 2
+                desejado = LIGADA if umidade <= meio else DESLIGADA
+
+            if desejado == self.estado:
+                return None
+            if self.estado is not None and agora - self._ultima_mudanca < self.permanencia_minima:
+                return None
+
+            self.estado = desejado
+            self._ultima_mudanca = agora
+            self.acionamentos += 1
+            self.historico.append((time.time(), desejado, umidade))
+        logging.info(f"💧 Bomba {self.topico} -> {desejado} (umidade {umidade:.2f}%)")
+        return desejado
+
+    def sincronizar(self, estado: str, agora: Optional[float] = None):
+        """Atualiza o estado a partir do tópico da bomba (mensagem retida ou comando manual)"""
+        if estado not in (LIGADA, DESLIGADA):
+            return
+        with self._lock:
+            if estado != self.estado:
+                self.estado = estado
+                self._ultima_mudanca = time.monotonic() if agora is None else agora
+
+
+class ControladoresBomba:
+    """Um ``ControladorBomba`` por tópico de bomba, criado sob demanda"""
+
+    def __init__(self, **parametros):
+        self.parametros = parametros
+        self._controladores: Dict[str, ControladorBomba] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, topico: str) -> ControladorBomba:
+        """Retorna o controlador da bomba publicada em ``topico``"""
+        controlador = self._controladores.get(topico)
+        if controlador is None:
+            with self._lock:
+                controlador = self._controladores.setdefault(topico, ControladorBomba(topico, **self.parametros))
+        return controlador
@@ -0,0 +1,98 @@
+"""
+Configurações da ingestão MQTT -> Oracle, lidas das variáveis de ambiente
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool de sessões Oracle
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 4))
+DB_POOL_INCREMENT = int(os.getenv('DB_POOL_INCREMENT', 1))
+DB_POOL_PING_INTERVAL = int(os.getenv('DB_POOL_PING_INTERVAL', 60))  # segundos
+DB_POOL_WAIT_TIMEOUT = int(os.getenv('DB_POOL_WAIT_TIMEOUT', 5000))  # milissegundos
+
+# Escritor em lote
+LOTE_TAMANHO = int(os.getenv('LOTE_TAMANHO', 200))
+LOTE_LATENCIA_MAXIMA = float(os.getenv('LOTE_LATENCIA_MAXIMA', 1.0))  # segundos
+LOTE_MAXIMO_PENDENTES = int(os.getenv('LOTE_MAXIMO_PENDENTES', 10000))
+
+# Spool local usado enquanto o Oracle está inacessível
+SPOOL_CAMINHO = os.getenv('SPOOL_CAMINHO', 'spool/leituras.db')
+SPOOL_INTERVALO_REPLAY = float(os.getenv('SPOOL_INTERVALO_REPLAY', 10))  # segundos
+SPOOL_LOTE_REPLAY = int(os.getenv('SPOOL_LOTE_REPLAY', 1000))
+
+# Pipeline de processamento (fila limitada + workers)
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 4))
+PIPELINE_TAMANHO_FILA = int(os.getenv('PIPELINE_TAMANHO_FILA', 10000))
+PIPELINE_POLITICA = os.getenv('PIPELINE_POLITICA', 'bloquear')  # bloquear | descartar_nova | descartar_antiga
+PIPELINE_ESPERA_MAXIMA = float(os.getenv('PIPELINE_ESPERA_MAXIMA', 0.5))  # segundos
+PIPELINE_INTERVALO_RELATORIO = float(os.getenv('PIPELINE_INTERVALO_RELATORIO', 30))  # segundos
+
+# Modo de execução do cliente MQTT: paho (threads) ou asyncio (aiomqtt + oracledb assíncrono)
+INGESTAO_MODO = os.getenv('INGESTAO_MODO', 'paho')
+
+# Sessão MQTT: client id fixo entre reinícios (cada worker acrescenta o número) e sessão persistente no
+# broker, que guarda as assinaturas e as mensagens QoS1 publicadas enquanto a ingestão esteve fora
+MQTT_CLIENT_ID = os.getenv('MQTT_CLIENT_ID', 'FarmTech_Ingestao')
+MQTT_SESSAO_PERSISTENTE = os.getenv('MQTT_SESSAO_PERSISTENTE', '1') == '1'
+MQTT_SESSAO_EXPIRACAO = int(os.getenv('MQTT_SESSAO_EXPIRACAO', 86400))  # segundos; só MQTT v5 (grupo de workers)
+MQTT_INFLIGHT = int(os.getenv('MQTT_INFLIGHT', 20))  # mensagens QoS>0 em voo (Receive Maximum no MQTT v5)
+MQTT_FILA_MAXIMA = int(os.getenv('MQTT_FILA_MAXIMA', 1000))  # publicações aguardando conexão ou janela; 0 = sem limite
+
+# Reconexão ao broker: backoff exponencial com jitter entre os limites (segundos)
+MQTT_RECONEXAO_MINIMA = float(os.getenv('MQTT_RECONEXAO_MINIMA', 1))
+MQTT_RECONEXAO_MAXIMA = float(os.getenv('MQTT_RECONEXAO_MAXIMA', 120))
+
+# Deduplicação de leituras repetidas
+DEDUP_CAPACIDADE = int(os.getenv('DEDUP_CAPACIDADE', 100000))
+
+# Limite de mensagens por tópico (balde de tokens) antes do parse; taxa 0 desliga
+LIMITE_TAXA = float(os.getenv('LIMITE_TAXA', 10))  # mensagens por segundo por tópico
+LIMITE_RAJADA = float(os.getenv('LIMITE_RAJADA', 50))  # mensagens aceitas de uma vez antes de limitar
+# Taxas próprias por filtro de tópico: "farm/+/+/+/ph=1,sensor/bomba=0.5" (o primeiro filtro que casar vale)
+LIMITE_TAXAS_TOPICOS = [(filtro.strip(), float(taxa)) for filtro, _, taxa in
+                        (item.rpartition('=') for item in os.getenv('LIMITE_TAXAS_TOPICOS', '').split(',') if '=' in item)]
+LIMITE_COALESCER = os.getenv('LIMITE_COALESCER', '1') == '1'  # guarda só a última mensagem barrada em vez de descartar
+# Filtros de tópicos compartilhados por todos os dispositivos (o dispositivo só aparece no payload):
+# sem limite, salvo filtro próprio em LIMITE_TAXAS_TOPICOS, e nunca coalescidos
+LIMITE_TOPICOS_COMPARTILHADOS = [filtro.strip() for filtro in
+                                 os.getenv('LIMITE_TOPICOS_COMPARTILHADOS', 'sensor/#').split(',') if filtro.strip()]
+
+# Controle da bomba (histerese em % de umidade e permanência mínima em segundos)
+BOMBA_UMIDADE_LIGAR = float(os.getenv('BOMBA_UMIDADE_LIGAR', 48))
+BOMBA_UMIDADE_DESLIGAR = float(os.getenv('BOMBA_UMIDADE_DESLIGAR', 52))
+BOMBA_PERMANENCIA_MINIMA = float(os.getenv('BOMBA_PERMANENCIA_MINIMA', 30))
+
+# Leituras com horário do dispositivo mais antigo que isso (em relação à leitura mais recente do
+# mesmo sensor, no relógio do dispositivo) são gravadas e entram nos rollups, mas não acionam a
+# bomba; 0 desliga a verificação
+LEITURA_ATRASO_MAXIMO = float(os.getenv('LEITURA_ATRASO_MAXIMO', 300))  # segundos
+
+# Presença dos dispositivos: silêncio após PRESENCA_SILENCIO segundos sem mensagem; 0 desliga a verificação
+PRESENCA_SILENCIO = float(os.getenv('PRESENCA_SILENCIO', 300))
+PRESENCA_INTERVALO = float(os.getenv('PRESENCA_INTERVALO', 10))  # segundos entre verificações dos prazos
+
+# Logging da ingestão (fila assíncrona + arquivo rotativo)
+LOG_NIVEL = os.getenv('LOG_NIVEL', 'INFO')
+LOG_ARQUIVO = os.getenv('LOG_ARQUIVO', 'logs/mqtt.log')
+LOG_TAMANHO_MAXIMO = int(os.getenv('LOG_TAMANHO_MAXIMO', 10 * 1024 * 1024))  # bytes por arquivo
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+LOG_TAMANHO_FILA = int(os.getenv('LOG_TAMANHO_FILA', 10000))
+LOG_AMOSTRAGEM = int(os.getenv('LOG_AMOSTRAGEM', 100))  # 1 a cada N mensagens rotineiras por tópico
+
+# Vários processos de ingestão dividindo as mensagens por assinatura compartilhada (MQTT v5)
+INGESTAO_WORKERS = int(os.getenv('INGESTAO_WORKERS', 1))  # processos lançados pelo run.py
+INGESTAO_GRUPO = os.getenv('INGESTAO_GRUPO', '')  # vazio: um único processo com assinatura normal
+INGESTAO_WORKER = int(os.getenv('INGESTAO_WORKER', 0))  # número deste processo no grupo
+
+# Filtros de tópico (separados por vírgula) cujos payloads usam o formato binário de ingestao.binario
+PAYLOAD_BINARIO_TOPICOS = [filtro.strip() for filtro in os.getenv('PAYLOAD_BINARIO_TOPICOS', '').split(',') if filtro.strip()]
+
+# Endpoint HTTP local com as métricas da ingestão (formato Prometheus); porta 0 desliga
+METRICAS_PORTA = int(os.getenv('METRICAS_PORTA', 9108))  # com vários workers, cada um usa porta + INGESTAO_WORKER
+METRICAS_ENDERECO = os.getenv('METRICAS_ENDERECO', '127.0.0.1')
+
+# Encerramento ordenado (SIGTERM/SIGINT): prazo para esvaziar filas, gravar os lotes e desconectar
+ENCERRAMENTO_PRAZO = float(os.getenv('ENCERRAMENTO_PRAZO', 20))  # segundos
@@ -0,0 +1,50 @@
+"""
+Descarte de leituras repetidas (mensagens retidas e reentregas de QoS1)
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable
+
+from ingestao import config
+
+
+class Deduplicador:
+    """
+    Memória LRU limitada das últimas leituras vistas.
+
+    A ingestão usa como chave ``('leitura', tópico, id_sensor, data_hora,
+    valor)`` para as leituras e ``('agregado', tópico, id_sensor, início,
+    duração)`` para os resumos de janela: a marca e o tópico impedem que um
+    resumo ou a mesma leitura vinda de outro tópico seja tomada por
+    repetição. Uma leitura repetida é descartada antes de chegar ao banco; o
+    que escapar da janela (por exemplo, após reiniciar o processo) é barrado
+    pelo índice único das tabelas de leitura.
+
+    A ingestão consulta com ``vista`` e só marca com ``registrar`` as
+    leituras efetivamente entregues ao escritor: uma mensagem recusada no
+    meio do caminho pode ser reenviada sem ser tomada por repetição.
+    """
+
+    def __init__(self, capacidade: int = config.DEDUP_CAPACIDADE):
+        self.capacidade = capacidade
+        self.descartadas = 0
+        self._vistas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def vista(self, chave: Hashable) -> bool:
+        """Retorna True (e conta um descarte) se a chave já foi registrada, sem registrá-la"""
+        with self._lock:
+            if chave in self._vistas:
+                self._vistas.move_to_end(chave)
+                self.descartadas += 1
+                return True
+            return False
+
+    def registrar(self, chaves: Iterable[Hashable]):
+        """Registra as chaves das leituras já entregues ao escritor"""
+        with self._lock:
+            for chave in chaves:
+                self._vistas[chave] = None
+                self._vistas.move_to_end(chave)
+            while len(self._vistas) > self.capacidade:
+                self._vistas.popitem(last=False)
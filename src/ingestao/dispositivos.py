@@ -0,0 +1,226 @@
+"""
+Índice em memória dos dispositivos do esquema farm/<propriedade>/<campo>/<dispositivo>/<tipo>
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import oracledb
+
+from ingestao.registro_sensores import TABELAS_SENSOR
+
+CONSULTA_CAMPOS = "SELECT id_campo, id_propriedade FROM CAMPO"
+CONSULTA_DISPOSITIVOS = "SELECT id_campo, codigo_dispositivo, tabela_sensor, id_sensor FROM DISPOSITIVO_SENSOR"
+CONSULTA_DISPOSITIVO = """
+    SELECT id_sensor FROM DISPOSITIVO_SENSOR
+    WHERE id_campo = :id_campo AND codigo_dispositivo = :codigo AND tabela_sensor = :tabela
+"""
+INSERIR_DISPOSITIVO = """
+    INSERT INTO DISPOSITIVO_SENSOR (id_campo, codigo_dispositivo, tabela_sensor, id_sensor)
+    VALUES (:id_campo, :codigo, :tabela, :id_sensor)
+"""
+
+# Início da faixa de IDs dos sensores cadastrados por dispositivo (DISPOSITIVO_SENSOR_SEQ no setup_db).
+# Os IDs abaixo dela são os dos sensores cadastrados à mão e os enviados no payload dos tópicos sensor/
+ID_SENSOR_DISPOSITIVOS = 1000000000
+
+# (id_campo, código do dispositivo, tabela do sensor)
+Chave = Tuple[int, str, str]
+
+
+def id_reservado(id_sensor) -> bool:
+    """Se um id_sensor vindo de payload cai na faixa dos dispositivos (e seria gravado no sensor de um deles)"""
+    return isinstance(id_sensor, int) and id_sensor >= ID_SENSOR_DISPOSITIVOS
+
+
+def _separar(dispositivo: str) -> Optional[Tuple[int, int, str]]:
+    """(id_propriedade, id_campo, código) de ``"<propriedade>/<campo>/<dispositivo>"``"""
+    propriedade, campo, codigo = dispositivo.split('/')
+    if not (propriedade.isdigit() and campo.isdigit() and codigo):
+        return None
+    return int(propriedade), int(campo), codigo
+
+
+class IndiceDispositivos:
+    """
+    Mapa dispositivo -> id do sensor e campo -> propriedade, compartilhado pelo processo.
+
+    As leituras dos tópicos farm/... chegam ao escritor com a chave
+    ``dispositivo`` em vez de ``id_sensor``; ``resolver`` preenche o ID a
+    partir do índice no momento da gravação do lote. Um dispositivo novo é
+    cadastrado uma única vez (linha em SENSOR_* e em DISPOSITIVO_SENSOR);
+    leituras de campo inexistente ou de outra propriedade são descartadas.
+    Os sensores dos dispositivos recebem IDs de DISPOSITIVO_SENSOR_SEQ, a
+    partir de ``ID_SENSOR_DISPOSITIVOS``, para não colidir com os IDs
+    explícitos que o ``RegistroSensores`` cadastra.
+    """
+
+    def __init__(self, tabelas: Dict[str, str] = None):
+        self.tabelas = tabelas or TABELAS_SENSOR
+        self._sensores: Dict[Chave, int] = {}
+        self._campos: Dict[int, int] = {}  # id_campo -> id_propriedade
+        self._comandos_cadastro = {
+            tabela: f"""
+                INSERT INTO {tabela} ({coluna}, id_campo, data_instalacao, hora_instalacao)
+                VALUES (DISPOSITIVO_SENSOR_SEQ.NEXTVAL, :id_campo, TRUNC(SYSDATE), SYSTIMESTAMP)
+                RETURNING {coluna} INTO :id_sensor
+            """
+            for tabela, coluna in self.tabelas.items()
+        }
+        self._lock = threading.Lock()
+
+    def carregar(self, conn):
+        """Carrega os campos e os dispositivos já cadastrados"""
+        cursor = conn.cursor()
+        try:
+            for consulta, registrar in ((CONSULTA_CAMPOS, self._registrar_campos),
+                                        (CONSULTA_DISPOSITIVOS, self._registrar_dispositivos)):
+                try:
+                    cursor.execute(consulta)
+                except oracledb.DatabaseError as e:
+                    logging.warning(f"Não foi possível carregar o índice de dispositivos: {e}")
+                    continue
+                registrar(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    async def carregar_async(self, conn):
+        """Versão de ``carregar`` para conexões assíncronas"""
+        cursor = conn.cursor()
+        for consulta, registrar in ((CONSULTA_CAMPOS, self._registrar_campos),
+                                    (CONSULTA_DISPOSITIVOS, self._registrar_dispositivos)):
+            try:
+                await cursor.execute(consulta)
+            except oracledb.DatabaseError as e:
+                logging.warning(f"Não foi possível carregar o índice de dispositivos: {e}")
+                continue
+            registrar(await cursor.fetchall())
+
+    def resolver(self, conn, tabela: str, linhas: List[dict]):
+        """Preenche o id_sensor das linhas com ``dispositivo``, cadastrando os dispositivos novos"""
+        campos, novos = self._pendentes(tabela, linhas)
+        if campos is None:
+            return
+        if campos - self._campos.keys():
+            cursor = conn.cursor()
+            try:
+                cursor.execute(CONSULTA_CAMPOS)
+                self._registrar_campos(cursor.fetchall())
+            finally:
+                cursor.close()
+        for chave in self._validos(novos):
+            self._cadastrar(conn, chave)
+        self._aplicar(tabela, linhas)
+
+    async def resolver_async(self, conn, tabela: str, linhas: List[dict]):
+        """Versão de ``resolver`` para conexões assíncronas"""
+        campos, novos = self._pendentes(tabela, linhas)
+        if campos is None:
+            return
+        if campos - self._campos.keys():
+            cursor = conn.cursor()
+            await cursor.execute(CONSULTA_CAMPOS)
+            self._registrar_campos(await cursor.fetchall())
+        for chave in self._validos(novos):
+            await self._cadastrar_async(conn, chave)
+        self._aplicar(tabela, linhas)
+
+    def _cadastrar(self, conn, chave: Chave):
+        id_campo, codigo, tabela = chave
+        cursor = conn.cursor()
+        try:
+            try:
+                id_sensor = cursor.var(int)
+                cursor.execute(self._comandos_cadastro[tabela], id_campo=id_campo, id_sensor=id_sensor)
+                valor = id_sensor.getvalue()[0]
+                cursor.execute(INSERIR_DISPOSITIVO, id_campo=id_campo, codigo=codigo, tabela=tabela, id_sensor=valor)
+                conn.commit()
+            except oracledb.IntegrityError:
+                # Outro worker cadastrou o mesmo dispositivo primeiro: desfaz o sensor criado aqui
+                conn.rollback()
+                cursor.execute(CONSULTA_DISPOSITIVO, id_campo=id_campo, codigo=codigo, tabela=tabela)
+                existente = cursor.fetchone()
+                if existente is None:
+                    raise
+                valor = existente[0]
+        finally:
+            cursor.close()
+        self._confirmar(chave, valor)
+
+    async def _cadastrar_async(self, conn, chave: Chave):
+        id_campo, codigo, tabela = chave
+        cursor = conn.cursor()
+        try:
+            id_sensor = cursor.var(int)
+            await cursor.execute(self._comandos_cadastro[tabela], id_campo=id_campo, id_sensor=id_sensor)
+            valor = id_sensor.getvalue()[0]
+            await cursor.execute(INSERIR_DISPOSITIVO, id_campo=id_campo, codigo=codigo, tabela=tabela, id_sensor=valor)
+            await conn.commit()
+        except oracledb.IntegrityError:
+            await conn.rollback()
+            await cursor.execute(CONSULTA_DISPOSITIVO, id_campo=id_campo, codigo=codigo, tabela=tabela)
+            existente = await cursor.fetchone()
+            if existente is None:
+                raise
+            valor = existente[0]
+        self._confirmar(chave, valor)
+
+    def _pendentes(self, tabela: str, linhas: Iterable[dict]) -> Tuple[Optional[Set[int]], Set[Tuple[int, Chave]]]:
+        """Campos citados e dispositivos fora do índice; (None, ...) quando o lote não tem tópicos farm/"""
+        campos: Optional[Set[int]] = None
+        novos = set()
+        for linha in linhas:
+            dispositivo = linha.get('dispositivo')
+            if dispositivo is None:
+                continue
+            if campos is None:
+                campos = set()
+            partes = _separar(dispositivo)
+            if partes is None:
+                continue
+            id_propriedade, id_campo, codigo = partes
+            campos.add(id_campo)
+            chave = (id_campo, codigo, tabela)
+            if chave not in self._sensores:
+                novos.add((id_propriedade, chave))
+        return campos, novos
+
+    def _validos(self, novos: Set[Tuple[int, Chave]]) -> List[Chave]:
+        return [chave for id_propriedade, chave in novos if self._campos.get(chave[0]) == id_propriedade]
+
+    def _aplicar(self, tabela: str, linhas: List[dict]):
+        """Troca ``dispositivo`` por ``id_sensor`` e remove, no próprio lote, as linhas sem sensor válido"""
+        validas = []
+        for linha in linhas:
+            dispositivo = linha.get('dispositivo')
+            if dispositivo is None:
+                validas.append(linha)
+                continue
+            partes = _separar(dispositivo)
+            if partes is not None and self._campos.get(partes[1]) == partes[0]:
+                id_sensor = self._sensores.get((partes[1], partes[2], tabela))
+                if id_sensor is not None:
+                    del linha['dispositivo']
+                    linha['id_sensor'] = id_sensor
+                    validas.append(linha)
+                    continue
+        if len(validas) < len(linhas):
+            logging.warning(f"⚠️ {len(linhas) - len(validas)} leituras de {tabela} descartadas: "
+                            f"dispositivo sem campo válido na propriedade.")
+        linhas[:] = validas
+
+    def _registrar_campos(self, linhas):
+        with self._lock:
+            self._campos.update((id_campo, id_propriedade) for id_campo, id_propriedade in linhas)
+        logging.info(f"Índice de dispositivos: {len(self._campos)} campos.")
+
+    def _registrar_dispositivos(self, linhas):
+        with self._lock:
+            self._sensores.update(((id_campo, codigo, tabela), id_sensor)
+                                  for id_campo, codigo, tabela, id_sensor in linhas)
+        logging.info(f"Índice de dispositivos: {len(self._sensores)} sensores de dispositivos.")
+
+    def _confirmar(self, chave: Chave, id_sensor: int):
+        with self._lock:
+            self._sensores[chave] = id_sensor
+        logging.info(f"Dispositivo {chave[1]} do campo {chave[0]} cadastrado em {chave[2]} (id {id_sensor}).")
@@ -0,0 +1,304 @@
+"""
+Escritor em lote das leituras de sensores
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import oracledb
+
+from ingestao import config
+from ingestao.metricas import LATENCIA_COMMIT, LATENCIA_INSERCAO, LEITURAS_REJEITADAS
+from ingestao.pool import PoolConexoes, erro_de_conexao
+from ingestao.spool import SpoolLocal
+
+# ORA-00001: linha barrada pelo índice único das leituras (leitura repetida)
+ORA_CHAVE_DUPLICADA = 1
+
+
+def registrar_erros_do_lote(tabela: str, erros):
+    """Registra os erros por linha do executemany, separando as leituras repetidas"""
+    repetidas = 0
+    for erro in erros:
+        if erro.code == ORA_CHAVE_DUPLICADA:
+            repetidas += 1
+        else:
+            logging.error(f"Erro na linha {erro.offset} do lote de {tabela}: {erro.message}")
+    if repetidas:
+        logging.info(f"🔁 {repetidas} leituras repetidas ignoradas em {tabela}.")
+
+
+def linhas_gravadas(linhas: List[dict], erros) -> List[dict]:
+    """Linhas do executemany que o banco aceitou (sem as apontadas em ``getbatcherrors``)"""
+    if not erros:
+        return linhas
+    rejeitadas = {erro.offset for erro in erros}
+    return [linha for indice, linha in enumerate(linhas) if indice not in rejeitadas]
+
+
+class EscritorLotes:
+    """
+    Acumula leituras por tabela de destino e grava com ``executemany``.
+
+    O lote é gravado quando atinge ``tamanho_lote`` leituras ou quando a
+    leitura mais antiga pendente espera ``latencia_maxima`` segundos, com um
+    único commit por lote. A gravação roda em uma thread própria; com
+    ``maximo_pendentes`` leituras acumuladas, ``adicionar`` bloqueia até o
+    lote em andamento ser retirado, propagando a pressão para quem produz.
+
+    Com um ``spool`` configurado, lotes que não chegaram ao banco por falta
+    de conexão vão para o disco e novos lotes seguem direto para lá por
+    ``intervalo_replay`` segundos, sem insistir no banco a cada lote. Uma
+    segunda thread drena o spool com inserções em lote quando o banco volta.
+    Um lote recusado por erro de dados é regravado linha a linha e só as
+    linhas recusadas de novo são separadas (``rejeitadas`` no spool).
+    """
+
+    def __init__(self, pool_conexoes: PoolConexoes, comandos: Dict[str, str],
+                 antes_de_gravar: Optional[Callable] = None,
+                 depois_de_inserir: Optional[Callable] = None,
+                 tamanho_lote: int = config.LOTE_TAMANHO,
+                 latencia_maxima: float = config.LOTE_LATENCIA_MAXIMA,
+                 maximo_pendentes: int = config.LOTE_MAXIMO_PENDENTES,
+                 spool: Optional[SpoolLocal] = None,
+                 intervalo_replay: float = config.SPOOL_INTERVALO_REPLAY,
+                 lote_replay: int = config.SPOOL_LOTE_REPLAY):
+        self.pool_conexoes = pool_conexoes
+        self.comandos = comandos  # tabela -> INSERT com binds nomeados
+        self.antes_de_gravar = antes_de_gravar  # (conn, tabela, linhas) antes do executemany
+        self.depois_de_inserir = depois_de_inserir  # (conn, tabela -> linhas aceitas) antes do commit
+        self.tamanho_lote = tamanho_lote
+        self.latencia_maxima = latencia_maxima
+        self.maximo_pendentes = max(maximo_pendentes, tamanho_lote)
+        self.spool = spool
+        self.intervalo_replay = intervalo_replay
+        self.lote_replay = lote_replay
+
+        self._buffers: Dict[str, List[dict]] = {}
+        self._pendentes = 0
+        self._inicio_lote = 0.0
+        self._parar = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # acorda a thread de gravação
+        self._espaco = threading.Condition(self._lock)  # acorda quem espera espaço no buffer
+        self._thread = None
+        self._lote_em_andamento: Optional[Dict[str, List[dict]]] = None
+        self._thread_replay = None
+        self._parar_replay = threading.Event()
+        self._banco_indisponivel_ate = 0.0
+
+    def iniciar(self):
+        """Inicia a thread de gravação"""
+        self._parar = False
+        self._thread = threading.Thread(target=self._executar, name="EscritorLotes", daemon=True)
+        self._thread.start()
+        if self.spool is not None:
+            self._parar_replay.clear()
+            self._thread_replay = threading.Thread(target=self._reprocessar, name="ReplaySpool", daemon=True)
+            self._thread_replay.start()
+
+    def adicionar(self, tabela: str, linha: dict):
+        """Enfileira uma linha para a tabela informada"""
+        self.adicionar_varias(tabela, (linha,))
+
+    def adicionar_varias(self, tabela: str, linhas: Sequence[dict]):
+        """Enfileira várias linhas da mesma tabela de uma vez; elas seguem no mesmo lote"""
+        if tabela not in self.comandos:
+            raise ValueError(f"Tabela sem comando de inserção: {tabela}")
+        if not linhas:
+            return
+        with self._cond:
+            while self._pendentes >= self.maximo_pendentes and not self._parar:
+                self._espaco.wait()
+            self._buffers.setdefault(tabela, []).extend(linhas)
+            vazio = self._pendentes == 0
+            self._pendentes += len(linhas)
+            if vazio:
+                self._inicio_lote = time.monotonic()
+                self._cond.notify()
+            elif self._pendentes >= self.tamanho_lote:
+                self._cond.notify()
+
+    def pendentes(self) -> int:
+        """Quantidade de linhas aguardando gravação"""
+        with self._cond:
+            return self._pendentes
+
+    def encerrar(self, timeout: Optional[float] = None):
+        """
+        Grava o que estiver pendente, com commit, e encerra as threads.
+
+        ``timeout`` é o prazo total. Se ele acabar antes de o banco confirmar,
+        o lote em andamento e o que restou no buffer vão para o spool; uma
+        leitura gravada duas vezes é barrada pelos índices únicos.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._parar = True
+            self._cond.notify()
+            self._espaco.notify_all()
+        self._parar_replay.set()
+        if self._thread is not None:
+            self._thread.join(None if limite is None else max(0.0, limite - time.monotonic()))
+            if self._thread.is_alive():
+                self._despejar_no_spool(self._lote_em_andamento)
+            self._thread = None
+        with self._cond:
+            sobra = self._retirar_lote() if self._pendentes else None
+        if sobra:
+            self._despejar_no_spool(sobra)
+        if self._thread_replay is not None:
+            self._thread_replay.join(None if limite is None else max(0.0, limite - time.monotonic()))
+            self._thread_replay = None
+
+    def _despejar_no_spool(self, lote: Optional[Dict[str, List[dict]]]):
+        """Guarda no spool um lote que não será gravado antes do encerramento"""
+        if not lote:
+            return
+        total = sum(len(linhas) for linhas in lote.values())
+        if self.spool is None:
+            logging.error(f"Encerramento sem spool: {total} leituras não gravadas.")
+            return
+        self.spool.guardar(lote)
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._parar and not self._lote_pronto():
+                    if self._pendentes:
+                        self._cond.wait(self._inicio_lote + self.latencia_maxima - time.monotonic())
+                    else:
+                        self._cond.wait()
+                lote = self._retirar_lote()
+                parar = self._parar
+            if lote:
+                self._lote_em_andamento = lote
+                try:
+                    self.gravar(lote)
+                except Exception as e:
+                    logging.error(f"Erro inesperado ao gravar lote: {e}")
+                finally:
+                    self._lote_em_andamento = None
+            if parar:
+                return
+
+    def _lote_pronto(self) -> bool:
+        if self._pendentes >= self.tamanho_lote:
+            return True
+        return self._pendentes > 0 and time.monotonic() - self._inicio_lote >= self.latencia_maxima
+
+    def _retirar_lote(self) -> Dict[str, List[dict]]:
+        lote, self._buffers = self._buffers, {}
+        self._pendentes = 0
+        self._espaco.notify_all()
+        return lote
+
+    def gravar(self, lote: Dict[str, List[dict]]) -> bool:
+        """Grava um lote no banco ou, se ele estiver inacessível, no spool local"""
+        if self.spool is not None and time.monotonic() < self._banco_indisponivel_ate:
+            self.spool.guardar(lote)
+            return False
+        if self._gravar_no_banco(lote):
+            return True
+        if self.spool is not None:
+            self._banco_indisponivel_ate = time.monotonic() + self.intervalo_replay
+            self.spool.guardar(lote)
+        return False
+
+    def reprocessar_spool(self) -> int:
+        """Drena o spool em lotes enquanto o banco aceitar; retorna quantas leituras foram gravadas"""
+        gravadas = 0
+        while True:
+            ultimo_id, lote = self.spool.ler(self.lote_replay)
+            if not lote:
+                break
+            if not self._gravar_no_banco(lote):
+                self._banco_indisponivel_ate = time.monotonic() + self.intervalo_replay
+                break
+            self._banco_indisponivel_ate = 0.0
+            self.spool.confirmar(ultimo_id)
+            gravadas += sum(len(linhas) for linhas in lote.values())
+        if gravadas:
+            logging.info(f"💾 Spool reprocessado: {gravadas} leituras gravadas no banco.")
+        return gravadas
+
+    def _reprocessar(self):
+        while not self._parar_replay.wait(self.intervalo_replay):
+            try:
+                self.reprocessar_spool()
+            except Exception as e:
+                logging.error(f"Erro ao reprocessar spool: {e}")
+
+    def _gravar_no_banco(self, lote: Dict[str, List[dict]]) -> bool:
+        """Grava um lote (tabela -> linhas) com um único commit; False só quando o banco está inacessível"""
+        total = sum(len(linhas) for linhas in lote.values())
+        try:
+            with self.pool_conexoes.conexao() as conn:
+                if conn is None:
+                    logging.error(f"Banco indisponível; lote de {total} leituras não gravado.")
+                    return False
+                self._gravar_lote(conn, lote)
+        except oracledb.Error as e:
+            # A sessão volta ao pool sem commit, o que desfaz o lote parcial
+            if erro_de_conexao(e):
+                logging.error(f"Erro ao gravar lote de {total} leituras: {e}")
+                return False
+            logging.error(f"Lote de {total} leituras recusado pelo banco ({e}); gravando linha a linha.")
+            return self._gravar_linha_a_linha(lote)
+        logging.info(f"✅ Lote gravado: {total} leituras em {len(lote)} tabela(s).")
+        return True
+
+    def _gravar_linha_a_linha(self, lote: Dict[str, List[dict]]) -> bool:
+        """Regrava um lote recusado uma linha por vez, separando as que o banco recusar de novo"""
+        rejeitadas = []
+        try:
+            with self.pool_conexoes.conexao() as conn:
+                if conn is None:
+                    return False
+                for tabela, linhas in lote.items():
+                    for linha in linhas:
+                        try:
+                            self._gravar_lote(conn, {tabela: [linha]})
+                        except oracledb.Error as e:
+                            if erro_de_conexao(e):
+                                raise
+                            conn.rollback()
+                            rejeitadas.append((tabela, linha, str(e)))
+        except oracledb.Error as e:
+            # As linhas já confirmadas voltam com o lote e são barradas pelos índices únicos
+            logging.error(f"Erro ao gravar lote linha a linha: {e}")
+            return False
+        self._rejeitar(rejeitadas)
+        return True
+
+    def _rejeitar(self, rejeitadas):
+        """Separa as linhas recusadas pelo banco: tabela de rejeitadas do spool ou, sem spool, só o log"""
+        for tabela, linha, erro in rejeitadas:
+            LEITURAS_REJEITADAS.inc(tabela)
+            if self.spool is None:
+                logging.error(f"🚫 Leitura recusada pelo banco em {tabela} e descartada: {linha} ({erro})")
+        if rejeitadas and self.spool is not None:
+            self.spool.rejeitar(rejeitadas)
+
+    def _gravar_lote(self, conn, lote: Dict[str, List[dict]]):
+        cursor = conn.cursor()
+        try:
+            if self.antes_de_gravar:
+                for tabela, linhas in lote.items():
+                    self.antes_de_gravar(conn, tabela, linhas)
+            gravadas = {}
+            for tabela, linhas in lote.items():
+                inicio = time.perf_counter()
+                cursor.executemany(self.comandos[tabela], linhas, batcherrors=True)
+                LATENCIA_INSERCAO.observar(time.perf_counter() - inicio, tabela)
+                erros = cursor.getbatcherrors()
+                registrar_erros_do_lote(tabela, erros)
+                gravadas[tabela] = linhas_gravadas(linhas, erros)
+            if self.depois_de_inserir:
+                self.depois_de_inserir(conn, gravadas)
+            inicio = time.perf_counter()
+            conn.commit()
+            LATENCIA_COMMIT.observar(time.perf_counter() - inicio)
+        finally:
+            cursor.close()
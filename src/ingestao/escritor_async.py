@@ -0,0 +1,283 @@
+"""
+Escritor em lote das leituras de sensores para o modo asyncio
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+import oracledb
+
+from ingestao import config
+from ingestao.escritor import linhas_gravadas, registrar_erros_do_lote
+from ingestao.metricas import LATENCIA_COMMIT, LATENCIA_INSERCAO, LEITURAS_REJEITADAS
+from ingestao.pool import erro_de_conexao
+from ingestao.spool import SpoolLocal
+
+
+def criar_pool_async(user: str, password: str, dsn: str):
+    """Cria o pool assíncrono de sessões Oracle com as mesmas configurações do pool síncrono"""
+    return oracledb.create_pool_async(
+        user=user,
+        password=password,
+        dsn=dsn,
+        min=config.DB_POOL_MIN,
+        max=config.DB_POOL_MAX,
+        increment=config.DB_POOL_INCREMENT,
+        ping_interval=config.DB_POOL_PING_INTERVAL,
+        getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+        wait_timeout=config.DB_POOL_WAIT_TIMEOUT
+    )
+
+
+class EscritorLotesAsync:
+    """
+    Versão asyncio do ``EscritorLotes``.
+
+    ``adicionar`` é síncrono e só acumula a linha; quem produz deve aguardar
+    ``aguardar_espaco`` para respeitar ``maximo_pendentes``. Cada lote é
+    gravado em uma tarefa própria, com até ``gravacoes_simultaneas`` lotes
+    em andamento ao mesmo tempo. O ``spool`` e a regravação linha a linha
+    dos lotes recusados por erro de dados funcionam como no escritor
+    síncrono, com o acesso ao SQLite feito fora do loop.
+    """
+
+    def __init__(self, pool, comandos: Dict[str, str],
+                 antes_de_gravar: Optional[Callable[..., Awaitable]] = None,
+                 depois_de_inserir: Optional[Callable[..., Awaitable]] = None,
+                 tamanho_lote: int = config.LOTE_TAMANHO,
+                 latencia_maxima: float = config.LOTE_LATENCIA_MAXIMA,
+                 maximo_pendentes: int = config.LOTE_MAXIMO_PENDENTES,
+                 gravacoes_simultaneas: int = config.DB_POOL_MAX,
+                 spool: Optional[SpoolLocal] = None,
+                 intervalo_replay: float = config.SPOOL_INTERVALO_REPLAY,
+                 lote_replay: int = config.SPOOL_LOTE_REPLAY):
+        self.pool = pool
+        self.comandos = comandos
+        self.antes_de_gravar = antes_de_gravar  # corrotina (conn, tabela, linhas)
+        self.depois_de_inserir = depois_de_inserir  # corrotina (conn, tabela -> linhas aceitas)
+        self.tamanho_lote = tamanho_lote
+        self.latencia_maxima = latencia_maxima
+        self.maximo_pendentes = max(maximo_pendentes, tamanho_lote)
+        self.spool = spool
+        self.intervalo_replay = intervalo_replay
+        self.lote_replay = lote_replay
+
+        self._buffers: Dict[str, List[dict]] = {}
+        self._pendentes = 0
+        self._inicio_lote = 0.0
+        self._parar = False
+        self._evento = asyncio.Event()
+        self._espaco = asyncio.Event()
+        self._espaco.set()
+        self._limite = asyncio.Semaphore(max(1, gravacoes_simultaneas))
+        self._tarefas: Set[asyncio.Task] = set()
+        self._em_andamento: Dict[int, Dict[str, List[dict]]] = {}  # id do lote -> lote sendo gravado
+        self._tarefa_principal = None
+        self._tarefa_replay = None
+        self._banco_indisponivel_ate = 0.0
+
+    def iniciar(self):
+        """Inicia a tarefa de gravação no loop atual"""
+        self._parar = False
+        loop = asyncio.get_running_loop()
+        self._tarefa_principal = loop.create_task(self._executar())
+        if self.spool is not None:
+            self._tarefa_replay = loop.create_task(self._reprocessar())
+
+    def adicionar(self, tabela: str, linha: dict):
+        """Acumula uma linha para a tabela informada"""
+        self.adicionar_varias(tabela, (linha,))
+
+    def adicionar_varias(self, tabela: str, linhas: Sequence[dict]):
+        """Acumula várias linhas da mesma tabela de uma vez; elas seguem no mesmo lote"""
+        if tabela not in self.comandos:
+            raise ValueError(f"Tabela sem comando de inserção: {tabela}")
+        if not linhas:
+            return
+        self._buffers.setdefault(tabela, []).extend(linhas)
+        vazio = self._pendentes == 0
+        self._pendentes += len(linhas)
+        if vazio:
+            self._inicio_lote = time.monotonic()
+            self._evento.set()
+        elif self._pendentes >= self.tamanho_lote:
+            self._evento.set()
+        if self._pendentes >= self.maximo_pendentes:
+            self._espaco.clear()
+
+    async def aguardar_espaco(self):
+        """Espera enquanto o buffer estiver no limite de leituras pendentes"""
+        await self._espaco.wait()
+
+    def pendentes(self) -> int:
+        """Quantidade de linhas aguardando gravação"""
+        return self._pendentes
+
+    async def encerrar(self, timeout: Optional[float] = None):
+        """
+        Grava o que estiver pendente e aguarda os lotes em andamento.
+
+        Se ``timeout`` acabar antes, os lotes em andamento e o buffer vão para
+        o spool, como no ``EscritorLotes``.
+        """
+        self._parar = True
+        self._evento.set()
+        if self._tarefa_replay is not None:
+            self._tarefa_replay.cancel()
+            self._tarefa_replay = None
+        if self._tarefa_principal is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._tarefa_principal), timeout)
+            except asyncio.TimeoutError:
+                for lote in list(self._em_andamento.values()) + [self._retirar_lote()]:
+                    await self._despejar_no_spool(lote)
+            self._tarefa_principal = None
+
+    async def _despejar_no_spool(self, lote: Dict[str, List[dict]]):
+        """Guarda no spool um lote que não será gravado antes do encerramento"""
+        if not lote:
+            return
+        total = sum(len(linhas) for linhas in lote.values())
+        if self.spool is None:
+            logging.error(f"Encerramento sem spool: {total} leituras não gravadas.")
+            return
+        await asyncio.to_thread(self.spool.guardar, lote)
+
+    async def _executar(self):
+        while True:
+            while not self._parar and not self._lote_pronto():
+                espera = None
+                if self._pendentes:
+                    espera = max(0.0, self._inicio_lote + self.latencia_maxima - time.monotonic())
+                self._evento.clear()
+                try:
+                    await asyncio.wait_for(self._evento.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+            lote = self._retirar_lote()
+            if lote:
+                self._em_andamento[id(lote)] = lote
+                await self._limite.acquire()
+                tarefa = asyncio.create_task(self._gravar_e_liberar(lote))
+                self._tarefas.add(tarefa)
+                tarefa.add_done_callback(self._tarefas.discard)
+            if self._parar:
+                await asyncio.gather(*self._tarefas)
+                return
+
+    def _lote_pronto(self) -> bool:
+        if self._pendentes >= self.tamanho_lote:
+            return True
+        return self._pendentes > 0 and time.monotonic() - self._inicio_lote >= self.latencia_maxima
+
+    def _retirar_lote(self) -> Dict[str, List[dict]]:
+        lote, self._buffers = self._buffers, {}
+        self._pendentes = 0
+        self._espaco.set()
+        return lote
+
+    async def _gravar_e_liberar(self, lote: Dict[str, List[dict]]):
+        try:
+            await self.gravar(lote)
+        except Exception as e:
+            logging.error(f"Erro inesperado ao gravar lote: {e}")
+        finally:
+            del self._em_andamento[id(lote)]
+            self._limite.release()
+
+    async def gravar(self, lote: Dict[str, List[dict]]) -> bool:
+        """Grava um lote no banco ou, se ele estiver inacessível, no spool local"""
+        if self.spool is not None and time.monotonic() < self._banco_indisponivel_ate:
+            await asyncio.to_thread(self.spool.guardar, lote)
+            return False
+        if await self._gravar_no_banco(lote):
+            return True
+        if self.spool is not None:
+            self._banco_indisponivel_ate = time.monotonic() + self.intervalo_replay
+            await asyncio.to_thread(self.spool.guardar, lote)
+        return False
+
+    async def reprocessar_spool(self) -> int:
+        """Drena o spool em lotes enquanto o banco aceitar; retorna quantas leituras foram gravadas"""
+        gravadas = 0
+        while True:
+            ultimo_id, lote = await asyncio.to_thread(self.spool.ler, self.lote_replay)
+            if not lote:
+                break
+            if not await self._gravar_no_banco(lote):
+                self._banco_indisponivel_ate = time.monotonic() + self.intervalo_replay
+                break
+            self._banco_indisponivel_ate = 0.0
+            await asyncio.to_thread(self.spool.confirmar, ultimo_id)
+            gravadas += sum(len(linhas) for linhas in lote.values())
+        if gravadas:
+            logging.info(f"💾 Spool reprocessado: {gravadas} leituras gravadas no banco.")
+        return gravadas
+
+    async def _reprocessar(self):
+        while True:
+            await asyncio.sleep(self.intervalo_replay)
+            try:
+                await self.reprocessar_spool()
+            except Exception as e:
+                logging.error(f"Erro ao reprocessar spool: {e}")
+
+    async def _gravar_no_banco(self, lote: Dict[str, List[dict]]) -> bool:
+        """Grava um lote (tabela -> linhas) com um único commit; False só quando o banco está inacessível"""
+        total = sum(len(linhas) for linhas in lote.values())
+        try:
+            async with self.pool.acquire() as conn:
+                await self._gravar_lote(conn, lote)
+        except oracledb.Error as e:
+            if erro_de_conexao(e):
+                logging.error(f"Erro ao gravar lote de {total} leituras: {e}")
+                return False
+            logging.error(f"Lote de {total} leituras recusado pelo banco ({e}); gravando linha a linha.")
+            return await self._gravar_linha_a_linha(lote)
+        logging.info(f"✅ Lote gravado: {total} leituras em {len(lote)} tabela(s).")
+        return True
+
+    async def _gravar_linha_a_linha(self, lote: Dict[str, List[dict]]) -> bool:
+        """Regrava um lote recusado uma linha por vez, separando as que o banco recusar de novo"""
+        rejeitadas = []
+        try:
+            async with self.pool.acquire() as conn:
+                for tabela, linhas in lote.items():
+                    for linha in linhas:
+                        try:
+                            await self._gravar_lote(conn, {tabela: [linha]})
+                        except oracledb.Error as e:
+                            if erro_de_conexao(e):
+                                raise
+                            await conn.rollback()
+                            rejeitadas.append((tabela, linha, str(e)))
+        except oracledb.Error as e:
+            logging.error(f"Erro ao gravar lote linha a linha: {e}")
+            return False
+        for tabela, linha, erro in rejeitadas:
+            LEITURAS_REJEITADAS.inc(tabela)
+            if self.spool is None:
+                logging.error(f"🚫 Leitura recusada pelo banco em {tabela} e descartada: {linha} ({erro})")
+        if rejeitadas and self.spool is not None:
+            await asyncio.to_thread(self.spool.rejeitar, rejeitadas)
+        return True
+
+    async def _gravar_lote(self, conn, lote: Dict[str, List[dict]]):
+        if self.antes_de_gravar:
+            for tabela, linhas in lote.items():
+                await self.antes_de_gravar(conn, tabela, linhas)
+        cursor = conn.cursor()
+        gravadas = {}
+        for tabela, linhas in lote.items():
+            inicio = time.perf_counter()
+            await cursor.executemany(self.comandos[tabela], linhas, batcherrors=True)
+            LATENCIA_INSERCAO.observar(time.perf_counter() - inicio, tabela)
+            erros = cursor.getbatcherrors()
+            registrar_erros_do_lote(tabela, erros)
+            gravadas[tabela] = linhas_gravadas(linhas, erros)
+        if self.depois_de_inserir:
+            await self.depois_de_inserir(conn, gravadas)
+        inicio = time.perf_counter()
+        await conn.commit()
+        LATENCIA_COMMIT.observar(time.perf_counter() - inicio)
@@ -0,0 +1,28 @@
+"""
+Ingestão com vários processos em um grupo de assinatura compartilhada (MQTT v5)
+"""
+import os
+from typing import Iterable, List, Tuple
+
+PREFIXO_COMPARTILHADO = "$share"
+
+
+def assinaturas(grupo: str, compartilhados: Iterable[str], exclusivos: Iterable[str] = (),
+                qos: int = 1) -> List[Tuple[str, int]]:
+    """
+    Assinaturas de um worker do grupo.
+
+    Os filtros ``compartilhados`` viram ``$share/<grupo>/<filtro>``: o broker
+    entrega cada mensagem a um único worker do grupo. Os ``exclusivos`` são
+    assinados normalmente, para que todos os workers recebam (ex.: o estado
+    retido da bomba, que cada processo precisa conhecer).
+    """
+    topicos = [(f"{PREFIXO_COMPARTILHADO}/{grupo}/{filtro}", qos) for filtro in compartilhados]
+    topicos.extend((topico, qos) for topico in exclusivos)
+    return topicos
+
+
+def arquivo_do_worker(caminho: str, worker: int) -> str:
+    """Acrescenta o número do worker ao nome do arquivo (spool e log não são compartilhados)"""
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}_w{worker}{extensao}"
@@ -0,0 +1,157 @@
+"""
+Limite de mensagens por tópico (balde de tokens) aplicado antes do parse
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ingestao import config
+from ingestao.metricas import MENSAGENS_LIMITADAS
+from ingestao.roteador import topico_corresponde
+
+# Baldes mantidos em memória; o menos usado é descartado (voltaria cheio de qualquer forma)
+CAPACIDADE_BALDES = 10000
+
+
+class BaldeTokens:
+    """Balde de ``rajada`` tokens reabastecido a ``taxa`` tokens por segundo"""
+
+    __slots__ = ('taxa', 'rajada', 'tokens', 'atualizado')
+
+    def __init__(self, taxa: float, rajada: float, agora: float):
+        self.taxa = taxa
+        self.rajada = max(1.0, rajada)
+        self.tokens = self.rajada
+        self.atualizado = agora
+
+    def consumir(self, agora: float) -> bool:
+        """Retira um token se houver; False quando o tópico passou do limite"""
+        self.tokens = min(self.rajada, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LimitadorIngestao:
+    """
+    Um balde de tokens por tópico, consultado no callback do MQTT.
+
+    No esquema farm/ o tópico identifica o dispositivo, então um nó com
+    defeito (ex.: em loop de reconexão republicando mensagens retidas) só
+    consome o próprio limite. O que passar do limite é descartado ou, com
+    ``coalescer``, guarda apenas a mensagem mais recente do tópico, que é
+    entregue quando o balde volta a ter token.
+
+    Os tópicos ``compartilhados`` (sensor/..., onde todos os dispositivos
+    publicam) não são limitados, já que um balde único faria um nó ruidoso
+    barrar a frota inteira; se um filtro de ``taxas_por_topico`` os limitar,
+    o excesso é descartado e nunca coalescido, pois a mensagem retida de um
+    dispositivo seria trocada pela de outro.
+    """
+
+    def __init__(self, taxa: float = config.LIMITE_TAXA,
+                 rajada: float = config.LIMITE_RAJADA,
+                 taxas_por_topico: Iterable[Tuple[str, float]] = config.LIMITE_TAXAS_TOPICOS,
+                 coalescer: bool = config.LIMITE_COALESCER,
+                 compartilhados: Iterable[str] = config.LIMITE_TOPICOS_COMPARTILHADOS):
+        self.taxa = taxa
+        self.rajada = rajada
+        self.taxas_por_topico = list(taxas_por_topico)
+        self.coalescer = coalescer
+        self.compartilhados = list(compartilhados)
+        self._baldes: OrderedDict = OrderedDict()
+        self._taxas: Dict[str, Tuple[float, bool]] = {}  # tópico -> (taxa, coalescer) resolvidos pelos filtros
+        self._pendentes: Dict[str, tuple] = {}  # tópico -> argumentos da última mensagem retida
+        self._entregar: Optional[Callable] = None
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _regra(self, topico: str) -> Tuple[float, bool]:
+        """
+        (taxa, coalescer) do tópico: a taxa do primeiro filtro de LIMITE_TAXAS_TOPICOS que casa com ele,
+        ou a taxa geral; tópicos compartilhados ficam sem limite salvo filtro próprio
+        """
+        regra = self._taxas.get(topico)
+        if regra is None:
+            compartilhado = any(topico_corresponde(padrao, topico) for padrao in self.compartilhados)
+            taxa = next((taxa for padrao, taxa in self.taxas_por_topico if topico_corresponde(padrao, topico)),
+                        0 if compartilhado else self.taxa)
+            regra = self._taxas[topico] = (taxa, self.coalescer and not compartilhado)
+        return regra
+
+    def permitir(self, topico: str, *args, agora: Optional[float] = None) -> bool:
+        """
+        Indica se a mensagem segue para o processamento.
+
+        Com ``coalescer``, os ``args`` da mensagem barrada ficam guardados e
+        são passados depois para o ``entregar`` informado em ``iniciar``.
+        """
+        taxa, coalescer = self._regra(topico)
+        if taxa <= 0:
+            return True
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            balde = self._baldes.get(topico)
+            if balde is None:
+                balde = self._baldes[topico] = BaldeTokens(taxa, self.rajada, agora)
+                if len(self._baldes) > CAPACIDADE_BALDES:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(topico)
+            if topico not in self._pendentes and balde.consumir(agora):
+                return True
+            if not coalescer:
+                MENSAGENS_LIMITADAS.inc(topico, 'descartada')
+                return False
+            if topico in self._pendentes:
+                MENSAGENS_LIMITADAS.inc(topico, 'coalescida')  # a pendente é substituída pela mais recente
+            self._pendentes[topico] = args
+            return False
+
+    def liberar_pendentes(self, agora: Optional[float] = None) -> int:
+        """Entrega as mensagens retidas cujos baldes já têm token"""
+        agora = time.monotonic() if agora is None else agora
+        liberadas = []
+        with self._lock:
+            for topico in list(self._pendentes):
+                balde = self._baldes.get(topico)
+                if balde is None or balde.consumir(agora):
+                    liberadas.append(self._pendentes.pop(topico))
+        for args in liberadas:
+            self._entregar(*args)
+        return len(liberadas)
+
+    def iniciar(self, entregar: Callable):
+        """Define para onde vão as mensagens retidas e, com ``coalescer``, inicia a thread que as libera"""
+        self._entregar = entregar
+        if not self.coalescer or (self.taxa <= 0 and all(taxa <= 0 for _, taxa in self.taxas_por_topico)):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._liberar_periodicamente, name="LimitadorIngestao", daemon=True)
+        self._thread.start()
+
+    def encerrar(self) -> List[tuple]:
+        """Para a thread e devolve os argumentos das mensagens ainda retidas, para o chamador processá-las"""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            retidas = list(self._pendentes.values())
+            self._pendentes.clear()
+        return retidas
+
+    def _liberar_periodicamente(self):
+        # Intervalo de um token da maior taxa configurada, entre 50 ms e 1 s
+        taxas = [taxa for taxa in [self.taxa] + [taxa for _, taxa in self.taxas_por_topico] if taxa > 0]
+        intervalo = min(1.0, max(0.05, 1 / max(taxas)))
+        while not self._parar.wait(intervalo):
+            try:
+                self.liberar_pendentes()
+            except Exception as e:
+                logging.error(f"❌ Erro ao liberar mensagens retidas pelo limitador: {e}")
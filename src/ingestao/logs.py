@@ -0,0 +1,91 @@
+"""
+Logging assíncrono da ingestão: fila em memória, arquivo rotativo e amostragem por tópico
+"""
+import logging
+import os
+import queue
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from ingestao import config
+
+FORMATO = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class AmostragemPorTopico(logging.Filter):
+    """
+    Deixa passar 1 a cada ``intervalo`` registros rotineiros de cada tópico.
+
+    Só afeta registros com o atributo ``topico`` (``extra={'topico': ...}``)
+    e nível até INFO; avisos e erros passam sempre.
+    """
+
+    def __init__(self, intervalo: int = config.LOG_AMOSTRAGEM):
+        super().__init__()
+        self.intervalo = max(1, intervalo)
+        self._contagem = defaultdict(int)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        topico = getattr(record, 'topico', None)
+        if topico is None or record.levelno > logging.INFO:
+            return True
+        contagem = self._contagem[topico]
+        self._contagem[topico] = contagem + 1
+        return contagem % self.intervalo == 0
+
+
+class FilaDeLogs(QueueHandler):
+    """
+    ``QueueHandler`` que não formata na thread de quem loga e descarta em vez de bloquear.
+
+    A mensagem (``msg % args``) só é montada na thread do ``QueueListener``.
+    Com a fila cheia o registro é descartado e contado em ``descartados``.
+    """
+
+    def __init__(self, fila: queue.Queue):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def configurar_logs(arquivo: str = config.LOG_ARQUIVO, nivel: str = config.LOG_NIVEL,
+                    console: bool = True) -> QueueListener:
+    """
+    Troca os handlers do logger raiz por uma fila atendida por um ``QueueListener``.
+
+    O listener escreve no arquivo rotativo e, se ``console``, no terminal.
+    Retorna o listener já iniciado; chame ``stop()`` no encerramento para
+    esvaziar a fila.
+    """
+    diretorio = os.path.dirname(arquivo)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+    formatador = logging.Formatter(FORMATO)
+    handlers = [RotatingFileHandler(arquivo, maxBytes=config.LOG_TAMANHO_MAXIMO,
+                                    backupCount=config.LOG_BACKUPS, encoding='utf-8')]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatador)
+
+    fila_de_logs = FilaDeLogs(queue.Queue(config.LOG_TAMANHO_FILA))
+    fila_de_logs.addFilter(AmostragemPorTopico())
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(fila_de_logs)
+    raiz.setLevel(nivel.upper())
+
+    ouvinte = QueueListener(fila_de_logs.queue, *handlers, respect_handler_level=True)
+    ouvinte.start()
+    return ouvinte
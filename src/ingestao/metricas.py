@@ -0,0 +1,220 @@
+"""
+Métricas da ingestão no formato texto do Prometheus, servidas por um endpoint HTTP local
+"""
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTEUDO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites (em segundos) dos histogramas de latência do banco
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes: Sequence[str], valores: Sequence) -> str:
+    if not nomes:
+        return ''
+    pares = ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores))
+    return '{' + pares + '}'
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    """Base das métricas: nome, texto de ajuda, tipo e nomes dos rótulos"""
+
+    tipo = 'untyped'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def linhas(self) -> List[str]:
+        """Linhas ``# HELP``/``# TYPE`` seguidas das amostras"""
+        return [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}'] + self._amostras()
+
+    def _amostras(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(Metrica):
+    """Contador monotônico; os valores dos rótulos são passados na ordem de ``rotulos``"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, *valores, quantidade: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0)
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        return [f'{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}' for chave, valor in valores]
+
+
+class Medidor(Metrica):
+    """
+    Valor instantâneo (profundidade de fila, sessões em uso).
+
+    Pode ser definido com ``definir`` ou lido no momento da coleta de uma
+    função registrada com ``acompanhar``, o que evita custo no caminho quente.
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[Tuple, float] = {}
+        self._funcoes: Dict[Tuple, Callable[[], float]] = {}
+
+    def definir(self, valor: float, *valores):
+        with self._lock:
+            self._valores[valores] = valor
+
+    def acompanhar(self, funcao: Callable[[], float], *valores):
+        """Lê o valor dos rótulos chamando ``funcao()`` a cada coleta"""
+        with self._lock:
+            self._funcoes[valores] = funcao
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            valores = dict(self._valores)
+            funcoes = list(self._funcoes.items())
+        for chave, funcao in funcoes:
+            try:
+                valores[chave] = funcao()
+            except Exception as e:
+                logging.warning(f"Falha ao coletar a métrica {self.nome}: {e}")
+        return [f'{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}' for chave, valor in valores.items()]
+
+
+class Histograma(Metrica):
+    """Histograma com limites fixos (cumulativos na exposição), soma e contagem"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 limites: Iterable[float] = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series: Dict[Tuple, list] = {}  # rótulos -> [contagens por faixa, soma]
+
+    def observar(self, valor: float, *valores):
+        faixa = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+
+    def contagem(self, *valores) -> int:
+        serie = self._series.get(valores)
+        return sum(serie[0]) if serie else 0
+
+    def _amostras(self) -> List[str]:
+        with self._lock:
+            series = [(chave, list(contagens), soma) for chave, (contagens, soma) in self._series.items()]
+        linhas = []
+        nomes = self.rotulos + ('le',)
+        for chave, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float('inf'),), contagens):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{_rotulos(nomes, chave + (_numero(limite),))} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}')
+            linhas.append(f'{self.nome}_count{_rotulos(self.rotulos, chave)} {acumulado}')
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas expostas pelo endpoint"""
+
+    def __init__(self):
+        self._metricas: List[Metrica] = []
+
+    def registrar(self, metrica: Metrica) -> Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def texto(self) -> str:
+        """Exposição completa no formato texto do Prometheus"""
+        return '\n'.join(linha for metrica in self._metricas for linha in metrica.linhas()) + '\n'
+
+
+REGISTRO = RegistroMetricas()
+
+MENSAGENS = REGISTRO.registrar(Contador(
+    'ingestao_mensagens_total', 'Mensagens MQTT recebidas por tópico.', ('topico',)))
+FALHAS_PARSE = REGISTRO.registrar(Contador(
+    'ingestao_falhas_parse_total', 'Payloads que não puderam ser decodificados, por tópico.', ('topico',)))
+PROFUNDIDADE_FILAS = REGISTRO.registrar(Medidor(
+    'ingestao_fila_profundidade', 'Itens aguardando em cada fila da ingestão.', ('fila',)))
+LATENCIA_INSERCAO = REGISTRO.registrar(Histograma(
+    'ingestao_insercao_segundos', 'Duração do executemany de cada tabela do lote.', ('tabela',)))
+LATENCIA_COMMIT = REGISTRO.registrar(Histograma(
+    'ingestao_commit_segundos', 'Duração do commit de cada lote.'))
+SESSOES_POOL = REGISTRO.registrar(Medidor(
+    'ingestao_pool_sessoes', 'Sessões do pool Oracle (ocupadas, abertas e máximo).', ('estado',)))
+ACIONAMENTOS_BOMBA = REGISTRO.registrar(Contador(
+    'ingestao_acionamentos_bomba_total', 'Comandos publicados para as bombas.', ('comando',)))
+LEITURAS_REJEITADAS = REGISTRO.registrar(Contador(
+    'ingestao_leituras_rejeitadas_total', 'Leituras recusadas pelo banco por erro de dados, por tabela.', ('tabela',)))
+LEITURAS_ATRASADAS = REGISTRO.registrar(Contador(
+    'ingestao_leituras_atrasadas_total', 'Leituras recebidas depois da janela de reordenação, por tipo.', ('tipo',)))
+MENSAGENS_LIMITADAS = REGISTRO.registrar(Contador(
+    'ingestao_mensagens_limitadas_total', 'Mensagens barradas pelo limite por tópico (descartadas ou coalescidas).',
+    ('topico', 'motivo')))
+PRESENCA = REGISTRO.registrar(Medidor(
+    'ingestao_presenca', 'Sensores e dispositivos com contato recente (ativos) e em silêncio.', ('estado',)))
+RECONEXOES = REGISTRO.registrar(Contador(
+    'ingestao_reconexoes_broker_total', 'Quedas da conexão com o broker seguidas de reconexão.'))
+
+
+class _TratadorMetricas(BaseHTTPRequestHandler):
+    registro: RegistroMetricas = REGISTRO
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        corpo = self.registro.texto().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTEUDO_PROMETHEUS)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # Cada coleta do Prometheus não deve virar uma linha de log
+        pass
+
+
+def iniciar_servidor(porta: int, endereco: str = '127.0.0.1',
+                     registro: RegistroMetricas = REGISTRO) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` em uma thread própria; encerre com ``shutdown()``"""
+    tratador = type('TratadorMetricas', (_TratadorMetricas,), {'registro': registro})
+    servidor = ThreadingHTTPServer((endereco, porta), tratador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="Metricas", daemon=True).start()
+    logging.info(f"📈 Métricas em http://{endereco}:{servidor.server_port}/metrics")
+    return servidor
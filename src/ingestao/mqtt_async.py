@@ -0,0 +1,31 @@
+"""
+Adaptadores para usar o processamento de mensagens com o cliente aiomqtt
+"""
+import asyncio
+from collections import namedtuple
+from typing import Set
+
+# Mensagem no mesmo formato usado pelo paho (topic como str, payload em bytes, propriedades MQTT v5)
+Mensagem = namedtuple('Mensagem', ['topic', 'payload', 'properties'], defaults=(None,))
+
+
+class PublicadorAsync:
+    """Oferece o ``publish`` síncrono do paho sobre o cliente aiomqtt"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self._tarefas: Set[asyncio.Task] = set()
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        """Agenda a publicação no loop atual sem bloquear quem chamou"""
+        tarefa = asyncio.get_running_loop().create_task(
+            self.cliente.publish(topic, payload, qos=qos, retain=retain)
+        )
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+        return tarefa
+
+    async def aguardar(self):
+        """Aguarda as publicações ainda em andamento"""
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
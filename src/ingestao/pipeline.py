@@ -0,0 +1,157 @@
+"""
+Pipeline de processamento das mensagens MQTT fora da thread de rede do paho
+"""
+import logging
+import queue
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from ingestao import config
+
+POLITICAS = ('bloquear', 'descartar_nova', 'descartar_antiga')
+
+_FIM = object()  # sentinela que encerra um worker
+
+
+class PipelineIngestao:
+    """
+    Distribui mensagens entre filas limitadas consumidas por threads de trabalho.
+
+    O callback do MQTT apenas chama ``enfileirar``; o parse e a persistência
+    acontecem nos workers. Mensagens com a mesma chave (o tópico, por padrão)
+    sempre caem na mesma fila e são processadas em ordem.
+
+    Quando a fila está cheia a política define o comportamento:
+    ``bloquear`` espera até ``espera_maxima`` segundos e então descarta a
+    mensagem nova; ``descartar_nova`` descarta a nova na hora;
+    ``descartar_antiga`` descarta a mais antiga da fila para abrir espaço.
+    """
+
+    def __init__(self, processador: Callable,
+                 workers: int = config.PIPELINE_WORKERS,
+                 tamanho_fila: int = config.PIPELINE_TAMANHO_FILA,
+                 politica: str = config.PIPELINE_POLITICA,
+                 espera_maxima: float = config.PIPELINE_ESPERA_MAXIMA,
+                 intervalo_relatorio: float = config.PIPELINE_INTERVALO_RELATORIO):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica}. Use uma de {POLITICAS}")
+        self.processador = processador
+        self.workers = max(1, workers)
+        self.politica = politica
+        self.espera_maxima = espera_maxima
+        self.intervalo_relatorio = intervalo_relatorio
+
+        capacidade = max(1, tamanho_fila // self.workers)
+        self._filas: List[queue.Queue] = [queue.Queue(maxsize=capacidade) for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._aceitando = False
+        self._parar_relatorio = threading.Event()
+        self._lock = threading.Lock()
+        self._contadores = {'recebidas': 0, 'processadas': 0, 'descartadas': 0, 'erros': 0}
+
+    def iniciar(self):
+        """Inicia os workers e o relatório periódico da profundidade das filas"""
+        self._aceitando = True
+        self._parar_relatorio.clear()
+        for indice, fila in enumerate(self._filas):
+            thread = threading.Thread(target=self._trabalhar, args=(fila,),
+                                      name=f"IngestaoWorker-{indice}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.intervalo_relatorio > 0:
+            threading.Thread(target=self._relatar, name="IngestaoRelatorio", daemon=True).start()
+
+    def enfileirar(self, chave: str, *args) -> bool:
+        """Coloca a mensagem na fila da chave. Retorna False se ela foi descartada"""
+        if not self._aceitando:
+            self._contar('descartadas')
+            return False
+        self._contar('recebidas')
+        fila = self._filas[zlib.crc32(chave.encode()) % self.workers]
+
+        try:
+            if self.politica == 'bloquear':
+                fila.put(args, timeout=self.espera_maxima)
+            else:
+                fila.put_nowait(args)
+            return True
+        except queue.Full:
+            pass
+
+        if self.politica == 'descartar_antiga':
+            try:
+                fila.get_nowait()
+                fila.task_done()
+            except queue.Empty:
+                pass
+            self._contar('descartadas')
+            try:
+                fila.put_nowait(args)
+                return True
+            except queue.Full:
+                pass
+
+        self._contar('descartadas')
+        logging.warning(f"Fila de ingestão cheia; mensagem de '{chave}' descartada.")
+        return False
+
+    def profundidade(self) -> int:
+        """Total de mensagens aguardando nas filas"""
+        return sum(fila.qsize() for fila in self._filas)
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores do pipeline e profundidade atual das filas"""
+        with self._lock:
+            dados = dict(self._contadores)
+        dados['profundidade'] = self.profundidade()
+        return dados
+
+    def encerrar(self, timeout: Optional[float] = None) -> int:
+        """
+        Para de aceitar mensagens, processa as que já estão nas filas e encerra os workers.
+
+        ``timeout`` é o prazo total, não por worker. Retorna quantas mensagens
+        ficaram sem processar quando o prazo acabou.
+        """
+        self._aceitando = False
+        self._parar_relatorio.set()
+        limite = None if timeout is None else time.monotonic() + timeout
+        for fila in self._filas:
+            try:
+                fila.put(_FIM, timeout=None if limite is None else max(0.0, limite - time.monotonic()))
+            except queue.Full:
+                pass  # fila cheia além do prazo: o worker fica para trás
+        for thread in self._threads:
+            thread.join(None if limite is None else max(0.0, limite - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        restantes = 0
+        for fila in self._filas:
+            with fila.mutex:
+                restantes += sum(1 for args in fila.queue if args is not _FIM)
+        if restantes:
+            logging.warning(f"Pipeline encerrado com {restantes} mensagem(ns) sem processar.")
+        return restantes
+
+    def _trabalhar(self, fila: queue.Queue):
+        while True:
+            args = fila.get()
+            try:
+                if args is _FIM:
+                    return
+                self.processador(*args)
+                self._contar('processadas')
+            except Exception as e:
+                self._contar('erros')
+                logging.error(f"Erro no worker de ingestão: {e}")
+            finally:
+                fila.task_done()
+
+    def _contar(self, contador: str):
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def _relatar(self):
+        while not self._parar_relatorio.wait(self.intervalo_relatorio):
+            logging.info(f"📊 Pipeline de ingestão: {self.estatisticas()}")
@@ -0,0 +1,156 @@
+"""
+Pool de sessões Oracle usado pela ingestão MQTT
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+import oracledb
+
+from ingestao import config
+
+# DPY-4005: nenhuma sessão livre no pool dentro de ``wait_timeout`` (pool esgotado, não quebrado)
+DPY_POOL_ESGOTADO = "DPY-4005"
+
+# Erros que indicam banco ou rede fora do ar, além de OperationalError e sessões mortas
+CODIGOS_CONEXAO = frozenset({
+    DPY_POOL_ESGOTADO,
+    "DPY-1001",  # sessão não conectada
+    "DPY-4011",  # banco ou rede encerrou a conexão
+    "ORA-01033", "ORA-01034", "ORA-01089", "ORA-01090",  # instância iniciando, parada ou encerrando
+    "ORA-03113", "ORA-03114", "ORA-03135",  # fim de arquivo no canal, sem conexão, conexão perdida
+    "ORA-12170", "ORA-12514", "ORA-12528", "ORA-12537", "ORA-12541",  # listener e rede
+})
+
+
+def codigo_erro(erro: oracledb.Error) -> str:
+    """Código completo do erro do oracledb (ex.: ``ORA-00001``, ``DPY-4005``), ou '' se não houver"""
+    detalhe = erro.args[0] if erro.args else None
+    return getattr(detalhe, 'full_code', None) or ''
+
+
+def erro_de_conexao(erro: oracledb.Error) -> bool:
+    """
+    Indica se o erro vem do banco ou da rede inacessível, e não dos dados.
+
+    Só nesse caso vale guardar o lote e tentar de novo mais tarde; um erro
+    de dados (NULL, bind inválido, restrição) se repetiria a cada tentativa.
+    """
+    if isinstance(erro, oracledb.OperationalError):
+        return True
+    detalhe = erro.args[0] if erro.args else None
+    if getattr(detalhe, 'is_session_dead', False) or getattr(detalhe, 'isrecoverable', False):
+        return True
+    return codigo_erro(erro) in CODIGOS_CONEXAO
+
+
+class PoolConexoes:
+    """Mantém um pool de sessões Oracle com ping de saúde e reconexão automática"""
+
+    def __init__(self, user: str, password: str, dsn: str,
+                 minimo: int = config.DB_POOL_MIN,
+                 maximo: int = config.DB_POOL_MAX,
+                 incremento: int = config.DB_POOL_INCREMENT,
+                 ping_interval: int = config.DB_POOL_PING_INTERVAL,
+                 wait_timeout: int = config.DB_POOL_WAIT_TIMEOUT):
+        self.user = user
+        self.password = password
+        self.dsn = dsn
+        self.minimo = minimo
+        self.maximo = maximo
+        self.incremento = incremento
+        self.ping_interval = ping_interval
+        self.wait_timeout = wait_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _criar_pool(self):
+        """Cria o pool de sessões no banco"""
+        return oracledb.create_pool(
+            user=self.user,
+            password=self.password,
+            dsn=self.dsn,
+            min=self.minimo,
+            max=self.maximo,
+            increment=self.incremento,
+            ping_interval=self.ping_interval,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=self.wait_timeout
+        )
+
+    def obter_pool(self):
+        """Retorna o pool, criando-o sob demanda. Retorna None se o banco estiver indisponível"""
+        with self._lock:
+            if self._pool is None:
+                try:
+                    self._pool = self._criar_pool()
+                    logging.info(f"Pool Oracle criado (min={self.minimo}, max={self.maximo}).")
+                except oracledb.DatabaseError as e:
+                    logging.error(f"Erro ao criar pool de conexões: {e}")
+            return self._pool
+
+    def _descartar_pool(self, pool):
+        """Fecha um pool com falha para que o próximo acesso crie um novo"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        try:
+            pool.close(force=True)
+        except oracledb.Error as e:
+            logging.warning(f"Erro ao fechar pool com falha: {e}")
+        logging.warning("Pool Oracle descartado; será recriado na próxima leitura.")
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma sessão do pool durante o bloco ``with``.
+
+        Produz None quando o banco está indisponível ou quando todas as
+        sessões estão ocupadas; só no primeiro caso o pool é descartado, já
+        que as sessões emprestadas a outras threads continuam válidas.
+        Sessões que deixam de responder são removidas do pool em vez de
+        devolvidas.
+        """
+        pool = self.obter_pool()
+        if pool is None:
+            yield None
+            return
+
+        try:
+            conn = pool.acquire()
+        except oracledb.DatabaseError as e:
+            if codigo_erro(e) == DPY_POOL_ESGOTADO:
+                logging.warning(f"Pool Oracle sem sessões livres: {e}")
+                yield None
+                return
+            logging.error(f"Erro ao obter conexão do pool: {e}")
+            self._descartar_pool(pool)
+            yield None
+            return
+
+        try:
+            yield conn
+        except oracledb.Error:
+            if not conn.is_healthy():
+                pool.drop(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                pool.release(conn)
+
+    def sessoes(self) -> dict:
+        """Sessões ocupadas, abertas e o máximo do pool (zeros enquanto ele não existe)"""
+        pool = self._pool
+        if pool is None:
+            return {'ocupadas': 0, 'abertas': 0, 'maximo': self.maximo}
+        return {'ocupadas': pool.busy, 'abertas': pool.opened, 'maximo': pool.max}
+
+    def fechar(self):
+        """Fecha o pool e todas as sessões abertas"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close(force=True)
+            logging.info("Pool Oracle encerrado.")
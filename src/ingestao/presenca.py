@@ -0,0 +1,155 @@
+"""
+Presença dos dispositivos: último contato em memória e detecção de silêncio por heap de prazos
+"""
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from ingestao import config
+
+ONLINE = "online"
+OFFLINE = "offline"
+
+
+class PresencaDispositivos:
+    """
+    Índice do último contato de cada sensor e dispositivo.
+
+    ``visto`` só grava o instante em um dicionário (O(1) por mensagem). Cada
+    sensor tem no máximo uma entrada em um heap ordenado pelo prazo em que
+    ele ficaria em silêncio; ao vencer, a entrada é reagendada se houve
+    contato nesse meio-tempo ou o sensor é marcado como silencioso. Assim a
+    verificação só olha as chaves cujo prazo venceu, sem varrer o índice nem
+    as tabelas LEITURA_*.
+
+    Um sensor informado com o seu ``dispositivo`` fica ligado a ele: as
+    leituras renovam também o dispositivo, que fica em silêncio quando todos
+    os seus sensores ficam, e o status ``offline`` (LWT) marca na hora o
+    dispositivo e os sensores. O dispositivo em si não entra no heap, pois
+    só o status o renovaria; sem sensores ligados (ex.: sensor/status, cujas
+    leituras não dizem o dispositivo) ele muda apenas pelo status.
+    """
+
+    def __init__(self, silencio: float = config.PRESENCA_SILENCIO,
+                 intervalo: float = config.PRESENCA_INTERVALO):
+        self.silencio = silencio
+        self.intervalo = intervalo
+        self._ultimo: Dict[Hashable, float] = {}  # chave -> instante monotônico do último contato
+        self._status: Dict[Hashable, str] = {}  # dispositivo -> último status publicado (LWT)
+        self._sensores: Dict[Hashable, Set[Hashable]] = {}  # dispositivo -> chaves dos seus sensores
+        self._dispositivo_da_chave: Dict[Hashable, Hashable] = {}
+        self._prazos: List[Tuple[float, Hashable]] = []
+        self._agendadas: Set[Hashable] = set()
+        self._silenciosas: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def visto(self, chave: Hashable, agora: Optional[float] = None, dispositivo: Optional[Hashable] = None):
+        """Registra um contato do sensor (leitura) e, se informado, do dispositivo que o publicou"""
+        agora = time.monotonic() if agora is None else agora
+        self._ultimo[chave] = agora
+        if dispositivo is not None:
+            self._ultimo[dispositivo] = agora
+            if self._dispositivo_da_chave.get(chave) != dispositivo or dispositivo in self._silenciosas:
+                self._ligar(chave, dispositivo)
+        if chave in self._agendadas and chave not in self._silenciosas:
+            return
+        with self._lock:
+            self._voltou(chave)
+            if chave not in self._agendadas:
+                self._agendadas.add(chave)
+                heapq.heappush(self._prazos, (agora + self.silencio, chave))
+
+    def _ligar(self, chave: Hashable, dispositivo: Hashable):
+        with self._lock:
+            anterior = self._dispositivo_da_chave.get(chave)
+            if anterior != dispositivo:
+                if anterior is not None:
+                    self._sensores[anterior].discard(chave)
+                self._dispositivo_da_chave[chave] = dispositivo
+                self._sensores.setdefault(dispositivo, set()).add(chave)
+            self._voltou(dispositivo)
+
+    def _voltou(self, chave: Hashable):
+        # Chamado com o lock
+        if chave in self._silenciosas:
+            self._silenciosas.discard(chave)
+            logging.info(f"📶 {chave} voltou a enviar dados")
+
+    def registrar_status(self, dispositivo: Hashable, status: str, agora: Optional[float] = None):
+        """Status publicado pelo dispositivo; ``offline`` (o LWT) o marca, com os seus sensores, na hora"""
+        anterior = self._status.get(dispositivo)
+        self._status[dispositivo] = status
+        if status == OFFLINE:
+            with self._lock:
+                marcadas = [chave for chave in (dispositivo, *self._sensores.get(dispositivo, ()))
+                            if chave not in self._silenciosas]
+                self._silenciosas.update(marcadas)
+            if marcadas:
+                logging.warning(f"🔌 {dispositivo} ficou offline (status)")
+        elif status == ONLINE:
+            self._ultimo[dispositivo] = time.monotonic() if agora is None else agora
+            with self._lock:
+                self._voltou(dispositivo)
+        if status != anterior:
+            logging.info(f"📊 Status de {dispositivo}: {anterior or '?'} -> {status}")
+
+    def verificar(self, agora: Optional[float] = None) -> List[Hashable]:
+        """Marca as chaves sem contato há ``silencio`` segundos; retorna as que ficaram silenciosas agora"""
+        agora = time.monotonic() if agora is None else agora
+        novas = []
+        with self._lock:
+            while self._prazos and self._prazos[0][0] <= agora:
+                _, chave = heapq.heappop(self._prazos)
+                if chave in self._silenciosas:
+                    self._agendadas.discard(chave)  # já marcada pelo status; volta a ser agendada no próximo contato
+                    continue
+                prazo = self._ultimo[chave] + self.silencio
+                if prazo > agora:
+                    heapq.heappush(self._prazos, (prazo, chave))
+                    continue
+                self._agendadas.discard(chave)
+                self._silenciosas.add(chave)
+                novas.append(chave)
+                dispositivo = self._dispositivo_da_chave.get(chave)
+                if (dispositivo is not None and dispositivo not in self._silenciosas
+                        and self._sensores[dispositivo] <= self._silenciosas):
+                    self._silenciosas.add(dispositivo)
+                    novas.append(dispositivo)
+        for chave in novas:
+            logging.warning(f"🔕 {chave} sem dados há mais de {self.silencio:.0f}s")
+        return novas
+
+    def silenciosas(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._silenciosas)
+
+    def ativas(self) -> int:
+        """Chaves conhecidas que não estão em silêncio"""
+        with self._lock:
+            return len(self._ultimo) - sum(1 for chave in self._silenciosas if chave in self._ultimo)
+
+    def iniciar(self):
+        """Verifica os prazos a cada ``intervalo`` segundos em uma thread própria"""
+        if self.silencio <= 0:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._verificar_periodicamente, name="PresencaDispositivos",
+                                        daemon=True)
+        self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _verificar_periodicamente(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.verificar()
+            except Exception as e:
+                logging.error(f"❌ Erro ao verificar a presença dos dispositivos: {e}")
@@ -0,0 +1,39 @@
+"""
+Espera entre tentativas de reconexão ao broker: backoff exponencial com jitter
+"""
+import random
+import threading
+from typing import Callable
+
+from ingestao import config
+
+
+class EsperaReconexao:
+    """
+    Calcula a espera antes de cada nova tentativa de conexão.
+
+    O teto dobra a cada falha seguida, de ``minimo`` até ``maximo``, e a
+    espera é sorteada entre ``minimo`` e o teto, para que vários workers (ou
+    vários processos após uma queda do broker) não reconectem todos no mesmo
+    instante. ``reiniciar`` volta ao início depois de uma conexão aceita.
+    """
+
+    def __init__(self, minimo: float = config.MQTT_RECONEXAO_MINIMA,
+                 maximo: float = config.MQTT_RECONEXAO_MAXIMA,
+                 sortear: Callable[[float, float], float] = random.uniform):
+        self.minimo = minimo
+        self.maximo = max(minimo, maximo)
+        self.sortear = sortear
+        self.falhas = 0
+        self._lock = threading.Lock()
+
+    def proxima(self) -> float:
+        """Espera, em segundos, antes da próxima tentativa; conta mais uma falha"""
+        with self._lock:
+            teto = min(self.maximo, self.minimo * 2 ** min(self.falhas, 32))
+            self.falhas += 1
+        return self.sortear(self.minimo, teto)
+
+    def reiniciar(self):
+        with self._lock:
+            self.falhas = 0
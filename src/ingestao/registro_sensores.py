@@ -0,0 +1,102 @@
+"""
+Registro em memória dos sensores já cadastrados no banco
+"""
+import logging
+import threading
+from typing import Dict, Iterable, Set
+
+import oracledb
+
+# Tabela de sensor -> coluna de identificação
+TABELAS_SENSOR = {
+    'SENSOR_UMIDADE': 'id_sensor_umidade',
+    'SENSOR_PH': 'id_sensor_ph',
+    'SENSOR_NUTRIENTES': 'id_sensor_nutrientes'
+}
+
+
+class RegistroSensores:
+    """
+    Conjunto de IDs de sensores conhecidos por tabela, compartilhado pelo processo.
+
+    É aquecido com os sensores existentes na inicialização; IDs novos são
+    cadastrados uma única vez com MERGE, que é idempotente. Depois disso a
+    ingestão não consulta mais as tabelas de sensores.
+    """
+
+    def __init__(self, tabelas: Dict[str, str] = None):
+        self.tabelas = tabelas or TABELAS_SENSOR
+        self._conhecidos: Dict[str, Set[int]] = {tabela: set() for tabela in self.tabelas}
+        self._comandos_merge = {
+            tabela: f"""
+                MERGE INTO {tabela} s
+                USING (SELECT :id_sensor AS id_sensor FROM dual) n
+                ON (s.{coluna} = n.id_sensor)
+                WHEN NOT MATCHED THEN INSERT ({coluna}) VALUES (n.id_sensor)
+            """
+            for tabela, coluna in self.tabelas.items()
+        }
+        self._lock = threading.Lock()
+
+    def carregar(self, conn):
+        """Carrega os IDs já cadastrados em todas as tabelas de sensores"""
+        cursor = conn.cursor()
+        try:
+            for tabela, coluna in self.tabelas.items():
+                try:
+                    cursor.execute(f"SELECT {coluna} FROM {tabela}")
+                except oracledb.DatabaseError as e:
+                    logging.warning(f"Não foi possível carregar sensores de {tabela}: {e}")
+                    continue
+                self._registrar_carga(tabela, cursor.fetchall())
+        finally:
+            cursor.close()
+
+    async def carregar_async(self, conn):
+        """Versão de ``carregar`` para conexões assíncronas"""
+        cursor = conn.cursor()
+        for tabela, coluna in self.tabelas.items():
+            try:
+                await cursor.execute(f"SELECT {coluna} FROM {tabela}")
+            except oracledb.DatabaseError as e:
+                logging.warning(f"Não foi possível carregar sensores de {tabela}: {e}")
+                continue
+            self._registrar_carga(tabela, await cursor.fetchall())
+
+    def garantir(self, conn, tabela: str, ids_sensor: Iterable[int]):
+        """Cadastra, com um único MERGE em lote e commit, os sensores ainda desconhecidos"""
+        novos = self._desconhecidos(tabela, ids_sensor)
+        if not novos:
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(self._comandos_merge[tabela], [{'id_sensor': i} for i in novos])
+            conn.commit()
+        finally:
+            cursor.close()
+        self._confirmar(tabela, novos)
+
+    async def garantir_async(self, conn, tabela: str, ids_sensor: Iterable[int]):
+        """Versão de ``garantir`` para conexões assíncronas"""
+        novos = self._desconhecidos(tabela, ids_sensor)
+        if not novos:
+            return
+        cursor = conn.cursor()
+        await cursor.executemany(self._comandos_merge[tabela], [{'id_sensor': i} for i in novos])
+        await conn.commit()
+        self._confirmar(tabela, novos)
+
+    def _registrar_carga(self, tabela: str, linhas):
+        ids = {linha[0] for linha in linhas}
+        with self._lock:
+            self._conhecidos[tabela].update(ids)
+        logging.info(f"Registro de sensores: {len(ids)} sensores em {tabela}.")
+
+    def _desconhecidos(self, tabela: str, ids_sensor: Iterable[int]) -> Set[int]:
+        conhecidos = self._conhecidos[tabela]
+        return {id_sensor for id_sensor in ids_sensor if id_sensor not in conhecidos}
+
+    def _confirmar(self, tabela: str, novos: Set[int]):
+        with self._lock:
+            self._conhecidos[tabela].update(novos)
+        logging.info(f"Sensores cadastrados em {tabela}: {sorted(novos)}")
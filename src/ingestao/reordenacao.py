@@ -0,0 +1,37 @@
+"""
+Janela de reordenação das leituras, medida no relógio de cada dispositivo
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Hashable
+
+from ingestao import config
+
+
+class JanelaReordenacao:
+    """
+    Horário mais recente (do dispositivo) já visto de cada sensor.
+
+    Uma leitura é atrasada quando é mais antiga que esse horário por mais de
+    ``atraso_maximo`` segundos: um backfill após reconexão, por exemplo. A
+    comparação nunca usa o relógio do servidor, então fuso (o firmware usa
+    UTC-3) e deriva do relógio do ESP32 não tornam atrasadas as leituras ao
+    vivo. A primeira leitura de cada sensor após o início do processo é
+    sempre aceita.
+    """
+
+    def __init__(self, atraso_maximo: float = config.LEITURA_ATRASO_MAXIMO):
+        self.atraso_maximo = timedelta(seconds=atraso_maximo)
+        self._mais_recente: Dict[Hashable, datetime] = {}
+        self._lock = threading.Lock()
+
+    def atrasada(self, sensor: Hashable, data_hora: datetime) -> bool:
+        """Registra a leitura do sensor e diz se ela ficou fora da janela"""
+        if not self.atraso_maximo:
+            return False
+        with self._lock:
+            mais_recente = self._mais_recente.get(sensor)
+            if mais_recente is None or data_hora > mais_recente:
+                self._mais_recente[sensor] = data_hora
+                return False
+        return mais_recente - data_hora > self.atraso_maximo
@@ -0,0 +1,129 @@
+"""
+Rollups incrementais por sensor (1 minuto, 1 hora e 1 dia) mantidos pela ingestão
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from ingestao.escritor import ORA_CHAVE_DUPLICADA
+
+TABELA_ROLLUPS = 'ROLLUP_LEITURA'
+
+# Duração de cada período em segundos (coluna duracao_periodo)
+PERIODOS = (60, 3600, 86400)
+
+# (mínimo, máximo) aceitáveis por tipo de sensor, contados em fora_limite; tipos sem faixa ficam de fora.
+# Fonte única para a ingestão (TipoSensor.limites) e para o cálculo inicial no setup_db
+LIMITES = {
+    'umidade': (45.0, 55.0),
+    'temperatura': (12.0, 36.0),
+    'ph': (6.0, 7.5),
+}
+
+# Soma os incrementos do lote ao período existente ou cria o período
+COMANDO_ROLLUPS = """
+    MERGE INTO ROLLUP_LEITURA r
+    USING (SELECT :tipo_sensor AS tipo_sensor, :id_sensor AS id_sensor,
+                  :duracao_periodo AS duracao_periodo, :inicio_periodo AS inicio_periodo,
+                  :quantidade AS quantidade, :soma AS soma, :minimo AS minimo,
+                  :maximo AS maximo, :fora_limite AS fora_limite
+           FROM dual) n
+    ON (r.tipo_sensor = n.tipo_sensor AND r.id_sensor = n.id_sensor
+        AND r.duracao_periodo = n.duracao_periodo AND r.inicio_periodo = n.inicio_periodo)
+    WHEN MATCHED THEN UPDATE SET
+        r.quantidade = r.quantidade + n.quantidade,
+        r.soma = r.soma + n.soma,
+        r.minimo = LEAST(r.minimo, n.minimo),
+        r.maximo = GREATEST(r.maximo, n.maximo),
+        r.fora_limite = r.fora_limite + n.fora_limite
+    WHEN NOT MATCHED THEN INSERT
+        (tipo_sensor, id_sensor, duracao_periodo, inicio_periodo, quantidade, soma, minimo, maximo, fora_limite)
+        VALUES (n.tipo_sensor, n.id_sensor, n.duracao_periodo, n.inicio_periodo,
+                n.quantidade, n.soma, n.minimo, n.maximo, n.fora_limite)
+"""
+
+# (tipo, id_sensor, duração, início) -> [quantidade, soma, mínimo, máximo, fora do limite]
+Chave = Tuple[str, int, int, datetime]
+
+
+def inicio_periodo(data_hora: datetime, duracao: int) -> datetime:
+    """Início do período de ``duracao`` segundos que contém ``data_hora``"""
+    if duracao == 86400:
+        return data_hora.replace(hour=0, minute=0, second=0, microsecond=0)
+    if duracao == 3600:
+        return data_hora.replace(minute=0, second=0, microsecond=0)
+    return data_hora.replace(second=0, microsecond=0)
+
+
+class Rollups:
+    """
+    Acumula os incrementos dos rollups de um lote antes do MERGE.
+
+    As leituras do lote são somadas em memória por sensor e período, então
+    o banco recebe uma linha por período tocado, e não uma por leitura.
+    """
+
+    def __init__(self, periodos: Iterable[int] = PERIODOS):
+        self.periodos = tuple(periodos)
+        self._acumulado: Dict[Chave, list] = {}
+
+    def adicionar(self, tipo_sensor: str, id_sensor: int, data_hora: datetime, valor: float, fora_limite: bool):
+        for duracao in self.periodos:
+            chave = (tipo_sensor, id_sensor, duracao, inicio_periodo(data_hora, duracao))
+            acumulado = self._acumulado.get(chave)
+            if acumulado is None:
+                self._acumulado[chave] = [1, valor, valor, valor, int(fora_limite)]
+                continue
+            acumulado[0] += 1
+            acumulado[1] += valor
+            if valor < acumulado[2]:
+                acumulado[2] = valor
+            if valor > acumulado[3]:
+                acumulado[3] = valor
+            acumulado[4] += fora_limite
+
+    def linhas(self) -> List[dict]:
+        """Binds do MERGE, um por sensor e período"""
+        return [
+            {'tipo_sensor': tipo_sensor, 'id_sensor': id_sensor, 'duracao_periodo': duracao,
+             'inicio_periodo': inicio, 'quantidade': quantidade, 'soma': soma,
+             'minimo': minimo, 'maximo': maximo, 'fora_limite': fora_limite}
+            for (tipo_sensor, id_sensor, duracao, inicio), (quantidade, soma, minimo, maximo, fora_limite)
+            in self._acumulado.items()
+        ]
+
+
+def _conflitos(linhas: List[dict], erros) -> List[dict]:
+    """Linhas cujo INSERT do MERGE perdeu a corrida para outro worker (ORA-00001)"""
+    conflitos = []
+    for erro in erros:
+        if erro.code == ORA_CHAVE_DUPLICADA:
+            conflitos.append(linhas[erro.offset])
+        else:
+            logging.error(f"Erro no rollup {linhas[erro.offset]}: {erro.message}")
+    return conflitos
+
+
+def gravar_rollups(conn, linhas: List[dict]):
+    """Aplica os incrementos na transação do lote; conflitos são repetidos e caem no UPDATE"""
+    if not linhas:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(COMANDO_ROLLUPS, linhas, batcherrors=True)
+        conflitos = _conflitos(linhas, cursor.getbatcherrors())
+        if conflitos:
+            cursor.executemany(COMANDO_ROLLUPS, conflitos)
+    finally:
+        cursor.close()
+
+
+async def gravar_rollups_async(conn, linhas: List[dict]):
+    """Versão de ``gravar_rollups`` para conexões assíncronas"""
+    if not linhas:
+        return
+    cursor = conn.cursor()
+    await cursor.executemany(COMANDO_ROLLUPS, linhas, batcherrors=True)
+    conflitos = _conflitos(linhas, cursor.getbatcherrors())
+    if conflitos:
+        await cursor.executemany(COMANDO_ROLLUPS, conflitos)
@@ -0,0 +1,166 @@
+"""
+Roteamento das mensagens MQTT por tabela: tópico e id_sensor -> tratador
+"""
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ingestao.binario import FORMATO_JSON
+from ingestao.tempo import DATA_BASE_HORA
+
+# Esquema por dispositivo: farm/<propriedade>/<campo>/<dispositivo>/<tipo>
+PREFIXO_FAZENDA = "farm/"
+NIVEIS_FAZENDA = 5
+
+
+def dispositivo_do_topico(topico: str) -> Optional[str]:
+    """``"<propriedade>/<campo>/<dispositivo>"`` de um tópico farm/..., ou None para os demais"""
+    if not topico.startswith(PREFIXO_FAZENDA):
+        return None
+    partes = topico.split('/')
+    if len(partes) != NIVEIS_FAZENDA:
+        return None
+    return '/'.join(partes[1:4])
+
+
+def topico_corresponde(padrao: str, topico: str) -> bool:
+    """Verifica se o tópico casa com um filtro MQTT (``+`` e ``#``)"""
+    partes_padrao = padrao.split('/')
+    partes_topico = topico.split('/')
+    for indice, parte in enumerate(partes_padrao):
+        if parte == '#':
+            return True
+        if indice >= len(partes_topico):
+            return False
+        if parte != '+' and parte != partes_topico[indice]:
+            return False
+    return len(partes_padrao) == len(partes_topico)
+
+
+class TipoSensor:
+    """
+    Descrição pré-calculada de um tipo de sensor.
+
+    Guarda a tabela de leitura, o INSERT usado pelo escritor em lote, a
+    tabela do sensor (para o registro de sensores), o nome do bind do valor,
+    como converter a hora e a faixa aceitável usada nos rollups.
+    ``montar_linha`` produz os binds de uma leitura.
+    """
+
+    def __init__(self, nome: str, tabela: str, comando: str, tabela_sensor: str,
+                 coluna_valor: str, unidade: str = "", icone: str = "",
+                 hora_sem_data: bool = False, extras: Optional[dict] = None,
+                 aciona_bomba: bool = False, limites: Optional[Tuple[float, float]] = None):
+        self.nome = nome
+        self.tabela = tabela
+        self.comando = comando
+        self.tabela_sensor = tabela_sensor
+        self.coluna_valor = coluna_valor
+        self.unidade = unidade
+        self.icone = icone
+        self.hora_sem_data = hora_sem_data  # hora gravada com a data base 1900-01-01
+        self.extras = extras or {}  # binds constantes, como limites
+        self.aciona_bomba = aciona_bomba
+        self.limites = limites  # (mínimo, máximo) aceitáveis; None quando o tipo não tem faixa
+
+    def montar_linha(self, id_sensor, data_hora: datetime, valor) -> dict:
+        """Converte os campos já decodificados do payload nos binds do INSERT"""
+        linha = {
+            'id_sensor': id_sensor,
+            'data_leitura': data_hora.date(),
+            'hora_leitura': data_hora.replace(year=DATA_BASE_HORA.year, month=DATA_BASE_HORA.month,
+                                              day=DATA_BASE_HORA.day) if self.hora_sem_data else data_hora,
+            self.coluna_valor: round(float(valor), 2)
+        }
+        linha.update(self.extras)
+        return linha
+
+    def data_hora_da_linha(self, linha: dict) -> datetime:
+        """Data e hora da leitura a partir dos binds (desfaz a data base de ``hora_sem_data``)"""
+        if self.hora_sem_data:
+            return datetime.combine(linha['data_leitura'], linha['hora_leitura'].time())
+        return linha['hora_leitura']
+
+    def fora_do_limite(self, valor: float) -> bool:
+        return self.limites is not None and not self.limites[0] <= valor <= self.limites[1]
+
+
+class Roteador:
+    """
+    Resolve o destino de cada mensagem com buscas em dicionário.
+
+    Tópicos com tratador próprio (bomba, status) são consultados primeiro,
+    com filtros MQTT avaliados só quando não há correspondência exata. As
+    leituras são resolvidas pelo tópico, quando ele identifica o tipo, pelo
+    último nível dos tópicos farm/... (o ``nome`` do tipo) ou pelo
+    ``id_sensor`` do payload.
+    """
+
+    def __init__(self):
+        self._tipos: Dict[str, TipoSensor] = {}  # tabela -> tipo
+        self._tipos_por_id: Dict[int, TipoSensor] = {}
+        self._tipos_por_topico: Dict[str, TipoSensor] = {}
+        self._tipos_por_nome: Dict[str, TipoSensor] = {}
+        self._tratadores: Dict[str, Callable] = {}
+        self._tratadores_por_padrao: List[Tuple[str, Callable]] = []
+        self._formatos_por_padrao: List[Tuple[str, str]] = []
+        self._formatos: Dict[str, str] = {}  # tópico -> formato já resolvido
+
+    def registrar_tipo(self, tipo: TipoSensor, ids_sensor: Iterable[int] = (), topicos: Iterable[str] = ()):
+        """Registra um tipo de sensor pelos IDs e/ou tópicos que o identificam"""
+        self._tipos[tipo.tabela] = tipo
+        self._tipos_por_nome[tipo.nome] = tipo
+        for id_sensor in ids_sensor:
+            self._tipos_por_id[id_sensor] = tipo
+        for topico in topicos:
+            self._tipos_por_topico[topico] = tipo
+
+    def registrar_tratador(self, padrao: str, tratador: Callable):
+        """Associa um tópico ou filtro MQTT a uma função ``tratador(client, topico, payload_str)``"""
+        if '+' in padrao or '#' in padrao:
+            self._tratadores_por_padrao.append((padrao, tratador))
+        else:
+            self._tratadores[padrao] = tratador
+
+    def tratador(self, topico: str) -> Optional[Callable]:
+        """Tratador específico do tópico, se houver"""
+        tratador = self._tratadores.get(topico)
+        if tratador is None and self._tratadores_por_padrao:
+            for padrao, candidato in self._tratadores_por_padrao:
+                if topico_corresponde(padrao, topico):
+                    return candidato
+        return tratador
+
+    def registrar_formato(self, padrao: str, formato: str):
+        """Define o formato do payload (``json`` ou ``binario``) dos tópicos que casam com o filtro"""
+        self._formatos_por_padrao.append((padrao, formato))
+        self._formatos.clear()
+
+    def formato(self, topico: str) -> str:
+        """Formato do payload do tópico; os filtros são avaliados uma vez por tópico"""
+        formato = self._formatos.get(topico)
+        if formato is None:
+            formato = next((candidato for padrao, candidato in self._formatos_por_padrao
+                            if topico_corresponde(padrao, topico)), FORMATO_JSON)
+            self._formatos[topico] = formato
+        return formato
+
+    def tipo(self, topico: str, id_sensor) -> Optional[TipoSensor]:
+        """Tipo de sensor da leitura: primeiro pelo tópico, depois pelo id_sensor"""
+        tipo = self._tipos_por_topico.get(topico)
+        if tipo is not None:
+            return tipo
+        if topico.startswith(PREFIXO_FAZENDA):
+            return self._tipos_por_nome.get(topico.rsplit('/', 1)[1])
+        return self._tipos_por_id.get(id_sensor)
+
+    def tipo_do_nome(self, nome: str) -> TipoSensor:
+        """Tipo de sensor registrado com o nome (último nível dos tópicos farm/...)"""
+        return self._tipos_por_nome[nome]
+
+    def tipo_da_tabela(self, tabela: str) -> TipoSensor:
+        """Tipo de sensor registrado para a tabela de leitura"""
+        return self._tipos[tabela]
+
+    def comandos(self) -> Dict[str, str]:
+        """INSERT de cada tabela de leitura, no formato esperado pelo escritor em lote"""
+        return {tabela: tipo.comando for tabela, tipo in self._tipos.items()}
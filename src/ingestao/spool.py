@@ -0,0 +1,127 @@
+"""
+Spool local e durável das leituras enquanto o Oracle está inacessível
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+from ingestao import config
+
+
+def _serializar(linha: dict) -> str:
+    valores = {}
+    for coluna, valor in linha.items():
+        if isinstance(valor, datetime):
+            valor = {'$datetime': valor.isoformat()}
+        elif isinstance(valor, date):
+            valor = {'$date': valor.isoformat()}
+        valores[coluna] = valor
+    return json.dumps(valores)
+
+
+def _desserializar(texto: str) -> dict:
+    linha = json.loads(texto)
+    for coluna, valor in linha.items():
+        if isinstance(valor, dict):
+            if '$datetime' in valor:
+                linha[coluna] = datetime.fromisoformat(valor['$datetime'])
+            elif '$date' in valor:
+                linha[coluna] = date.fromisoformat(valor['$date'])
+    return linha
+
+
+class SpoolLocal:
+    """
+    Fila persistente de lotes em SQLite (modo WAL), apenas com inserção no fim.
+
+    Cada lote guardado é uma transação; com ``synchronous=FULL`` o WAL recebe
+    fsync a cada commit, uma vez por lote e não a cada leitura, e um lote
+    guardado sobrevive a uma queda de energia. O reprocessamento
+    lê as linhas mais antigas com ``ler`` e só as remove com ``confirmar``
+    depois que o banco fez o commit, então uma queda no meio do caminho
+    reenvia o lote em vez de perdê-lo.
+
+    Linhas que o banco recusou por erro de dados vão para a tabela
+    ``rejeitadas`` com ``rejeitar``: ficam guardadas para análise, mas fora
+    da fila, para não travar o reprocessamento das seguintes.
+    """
+
+    def __init__(self, caminho: str = config.SPOOL_CAMINHO):
+        self.caminho = caminho
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                linha TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rejeitadas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                linha TEXT NOT NULL,
+                erro TEXT NOT NULL,
+                registrada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self._conn.commit()
+
+    def guardar(self, lote: Dict[str, List[dict]]):
+        """Anexa um lote (tabela -> linhas) ao spool em uma única transação"""
+        registros = [(tabela, _serializar(linha)) for tabela, linhas in lote.items() for linha in linhas]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT INTO spool (tabela, linha) VALUES (?, ?)", registros)
+        logging.warning(f"💾 {len(registros)} leituras guardadas no spool local.")
+
+    def ler(self, limite: int) -> Tuple[int, Dict[str, List[dict]]]:
+        """Retorna o maior id lido e as ``limite`` linhas mais antigas agrupadas por tabela"""
+        with self._lock:
+            registros = self._conn.execute(
+                "SELECT id, tabela, linha FROM spool ORDER BY id LIMIT ?", (limite,)
+            ).fetchall()
+        lote: Dict[str, List[dict]] = {}
+        for _, tabela, linha in registros:
+            lote.setdefault(tabela, []).append(_desserializar(linha))
+        ultimo_id = registros[-1][0] if registros else 0
+        return ultimo_id, lote
+
+    def confirmar(self, ultimo_id: int):
+        """Remove as linhas já gravadas no banco, até ``ultimo_id`` inclusive"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM spool WHERE id <= ?", (ultimo_id,))
+
+    def rejeitar(self, rejeitadas: List[Tuple[str, dict, str]]):
+        """Guarda linhas (tabela, linha, erro) recusadas pelo banco na tabela de rejeitadas"""
+        registros = [(tabela, _serializar(linha), erro) for tabela, linha, erro in rejeitadas]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT INTO rejeitadas (tabela, linha, erro) VALUES (?, ?, ?)", registros)
+        logging.error(f"🚫 {len(registros)} leituras recusadas pelo banco guardadas em {self.caminho} (rejeitadas).")
+
+    def rejeitadas(self) -> int:
+        """Quantidade de leituras recusadas pelo banco guardadas para análise"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rejeitadas").fetchone()[0]
+
+    def pendentes(self) -> int:
+        """Quantidade de leituras aguardando reprocessamento"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def fechar(self):
+        """Fecha o arquivo do spool"""
+        with self._lock:
+            self._conn.close()
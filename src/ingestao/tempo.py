@@ -0,0 +1,33 @@
+"""
+Conversão rápida de data_leitura/hora_leitura enviadas pelo firmware
+"""
+from datetime import date, datetime
+from functools import lru_cache
+
+# Data base das horas gravadas sem data (TipoSensor.hora_sem_data), a mesma de datetime.strptime('%H:%M:%S')
+DATA_BASE_HORA = date(1900, 1, 1)
+
+
+@lru_cache(maxsize=64)
+def converter_data(data_leitura: str) -> date:
+    """Converte 'YYYY-MM-DD'; o cache evita reconverter a mesma data a cada leitura do dia"""
+    if len(data_leitura) != 10:
+        raise ValueError(f"Data inválida: {data_leitura!r}")
+    return date.fromisoformat(data_leitura)
+
+
+def _partes_hora(hora_leitura: str):
+    """Separa 'HH:MM' ou 'HH:MM:SS' por posição, sem strptime e sem exceção no caminho comum"""
+    tamanho = len(hora_leitura)
+    if tamanho == 8 and hora_leitura[2] == ':' and hora_leitura[5] == ':':
+        return int(hora_leitura[0:2]), int(hora_leitura[3:5]), int(hora_leitura[6:8])
+    if tamanho == 5 and hora_leitura[2] == ':':
+        return int(hora_leitura[0:2]), int(hora_leitura[3:5]), 0
+    raise ValueError(f"Hora inválida: {hora_leitura!r}")
+
+
+def converter_data_hora(data_leitura: str, hora_leitura: str) -> datetime:
+    """Combina data e hora do firmware em um datetime"""
+    dia = converter_data(data_leitura)
+    hora, minuto, segundo = _partes_hora(hora_leitura)
+    return datetime(dia.year, dia.month, dia.day, hora, minuto, segundo)
@@ -0,0 +1,3 @@
+"""
+Testes do módulo de ingestão
+"""
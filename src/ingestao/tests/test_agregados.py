@@ -0,0 +1,44 @@
+"""
+Testes para os resumos de janela publicados pelos dispositivos
+"""
+import unittest
+from datetime import datetime
+
+from ingestao.agregados import eh_agregado, montar_linha_agregada, valores_da_janela
+
+
+class TestAgregados(unittest.TestCase):
+    def setUp(self):
+        self.item = {"id_sensor": 3, "data_leitura": "2024-11-20", "hora_leitura": "10:00:00",
+                     "janela": 60, "minimo": 6.1, "maximo": 6.4, "media": 6.257, "contagem": 12}
+
+    def test_identifica_resumo(self):
+        self.assertTrue(eh_agregado(self.item))
+        self.assertFalse(eh_agregado({"id_sensor": 3, "Valor": 6.2}))
+
+    def test_valores_da_janela(self):
+        self.assertEqual(valores_da_janela(self.item), (60, 6.1, 6.4, 6.257, 12))
+
+    def test_zero_e_valido_mas_campo_ausente_nao(self):
+        self.item["minimo"] = 0
+        self.assertIsNotNone(valores_da_janela(self.item))
+        del self.item["contagem"]
+        self.assertIsNone(valores_da_janela(self.item))
+
+    def test_janela_vazia_descartada(self):
+        self.item["contagem"] = 0
+        self.assertIsNone(valores_da_janela(self.item))
+
+    def test_valores_invalidos_recusados(self):
+        for campo, valor in (("minimo", float('nan')), ("maximo", "inf"), ("media", float('-inf')), ("minimo", 7.0)):
+            with self.subTest(campo=campo, valor=valor):
+                with self.assertRaises(ValueError):
+                    valores_da_janela({**self.item, campo: valor})
+
+    def test_montar_linha(self):
+        inicio = datetime(2024, 11, 20, 10, 0)
+        linha = montar_linha_agregada('ph', (3, inicio) + valores_da_janela(self.item))
+        self.assertEqual(linha, {
+            'tipo_sensor': 'ph', 'id_sensor': 3, 'inicio_janela': inicio, 'duracao_janela': 60,
+            'valor_minimo': 6.1, 'valor_maximo': 6.4, 'valor_medio': 6.26, 'quantidade_leituras': 12
+        })
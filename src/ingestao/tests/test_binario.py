@@ -0,0 +1,31 @@
+"""
+Testes para o formato binário compacto das leituras
+"""
+import unittest
+from datetime import datetime
+
+from ingestao.binario import LEITURA, codificar_leitura, decodificar_leituras
+
+
+class TestBinario(unittest.TestCase):
+    def test_ida_e_volta(self):
+        payload = codificar_leitura(1, datetime(2024, 5, 1, 10, 30, 15), 48.57)
+        self.assertEqual(len(payload), LEITURA.size)
+        [(id_sensor, data_hora, valor)] = decodificar_leituras(payload)
+        self.assertEqual((id_sensor, data_hora), (1, datetime(2024, 5, 1, 10, 30, 15)))
+        self.assertAlmostEqual(valor, 48.57, places=4)
+
+    def test_varias_leituras_por_payload(self):
+        payload = b''.join(codificar_leitura(3, datetime(2024, 5, 1, 10, 0, segundo), 6.5) for segundo in range(4))
+        self.assertEqual([data_hora.second for _, data_hora, _ in decodificar_leituras(payload)], [0, 1, 2, 3])
+
+    def test_tamanho_invalido(self):
+        with self.assertRaises(ValueError):
+            decodificar_leituras(codificar_leitura(1, datetime(2024, 5, 1), 1.0)[:-1])
+
+    def test_registro_invalido_descarta_so_ele(self):
+        boa = codificar_leitura(1, datetime(2024, 5, 1, 10, 0), 48.0)
+        data_invalida = LEITURA.pack(1, 2024, 13, 1, 10, 0, 0, 48.0)
+        payload = b''.join([boa, codificar_leitura(1, datetime(2024, 5, 1, 10, 1), float('nan')), data_invalida,
+                            codificar_leitura(1, datetime(2024, 5, 1, 10, 2), float('inf')), boa])
+        self.assertEqual(len(decodificar_leituras(payload)), 2)
@@ -0,0 +1,43 @@
+"""
+Testes para o controle da bomba com histerese
+"""
+import unittest
+from datetime import datetime
+
+from ingestao.bomba import ControladorBomba, ControladoresBomba
+
+
+class TestControladorBomba(unittest.TestCase):
+    def setUp(self):
+        self.controlador = ControladorBomba("sensor/bomba", umidade_ligar=45, umidade_desligar=55,
+                                            permanencia_minima=30)
+
+    def test_publica_apenas_nas_transicoes(self):
+        self.assertEqual(self.controlador.avaliar(40, agora=0), "ON")
+        self.assertIsNone(self.controlador.avaliar(41, agora=100))
+        self.assertIsNone(self.controlador.avaliar(50, agora=200))  # dentro da faixa mantém ligada
+        self.assertEqual(self.controlador.avaliar(56, agora=300), "OFF")
+        self.assertEqual(self.controlador.acionamentos, 2)
+
+    def test_permanencia_minima(self):
+        self.controlador.avaliar(40, agora=0)
+        self.assertIsNone(self.controlador.avaliar(60, agora=10))
+        self.assertEqual(self.controlador.avaliar(60, agora=31), "OFF")
+
+    def test_sincronizar_com_estado_retido(self):
+        self.controlador.sincronizar("OFF", agora=0)
+        self.assertIsNone(self.controlador.avaliar(50, agora=100))
+        self.assertIsNone(self.controlador.avaliar(40, agora=10))  # ainda na permanência mínima
+
+    def test_leitura_fora_de_ordem_ignorada(self):
+        self.assertEqual(self.controlador.avaliar(40, agora=0, data_hora=datetime(2024, 5, 1, 10, 5)), "ON")
+        # Chega depois, mas foi medida antes da última leitura avaliada
+        self.assertIsNone(self.controlador.avaliar(60, agora=100, data_hora=datetime(2024, 5, 1, 10, 0)))
+        self.assertEqual(self.controlador.avaliar(60, agora=200, data_hora=datetime(2024, 5, 1, 10, 6)), "OFF")
+
+    def test_um_controlador_por_topico(self):
+        controladores = ControladoresBomba(permanencia_minima=0)
+        controladores.obter("campo/1/bomba").avaliar(30)
+        controladores.obter("campo/2/bomba").avaliar(30)
+        self.assertIs(controladores.obter("campo/1/bomba"), controladores.obter("campo/1/bomba"))
+        self.assertEqual(controladores.obter("campo/2/bomba").acionamentos, 1)
@@ -0,0 +1,34 @@
+"""
+Testes para o descarte de leituras repetidas
+"""
+import unittest
+from datetime import datetime
+
+from ingestao.deduplicador import Deduplicador
+
+
+class TestDeduplicador(unittest.TestCase):
+    def test_leitura_repetida(self):
+        deduplicador = Deduplicador()
+        chave = ('leitura', 'sensor/umidade', 1, datetime(2024, 5, 1, 10, 0), 48.5)
+        self.assertFalse(deduplicador.vista(chave))
+        deduplicador.registrar([chave])
+        self.assertTrue(deduplicador.vista(chave))
+        self.assertFalse(deduplicador.vista(('leitura', 'sensor/umidade', 1, datetime(2024, 5, 1, 10, 0, 5), 48.5)))
+        self.assertEqual(deduplicador.descartadas, 1)
+
+    def test_capacidade_limitada_descarta_a_menos_recente(self):
+        deduplicador = Deduplicador(capacidade=2)
+        deduplicador.registrar(["a", "b"])
+        deduplicador.vista("a")  # "a" passa a ser a mais recente
+        deduplicador.registrar(["c"])  # remove "b"
+        self.assertTrue(deduplicador.vista("a"))
+        self.assertFalse(deduplicador.vista("b"))
+
+    def test_vista_nao_registra(self):
+        deduplicador = Deduplicador()
+        chave = (1, "2024-05-01", "10:00:00", 48.5)
+        self.assertFalse(deduplicador.vista(chave))
+        self.assertFalse(deduplicador.vista(chave))
+        deduplicador.registrar([chave])
+        self.assertTrue(deduplicador.vista(chave))
@@ -0,0 +1,74 @@
+"""
+Testes para o índice de dispositivos do esquema farm/...
+"""
+import unittest
+from unittest.mock import MagicMock
+
+import oracledb
+
+from ingestao.dispositivos import ID_SENSOR_DISPOSITIVOS, IndiceDispositivos, id_reservado
+from ingestao.roteador import dispositivo_do_topico
+
+
+class TestIndiceDispositivos(unittest.TestCase):
+    def setUp(self):
+        self.indice = IndiceDispositivos()
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+        self.cursor.fetchall.side_effect = [[(7, 1), (8, 2)], [(7, 'esp-a', 'SENSOR_UMIDADE', 40)]]
+        self.indice.carregar(self.conn)
+        self.conn.reset_mock()
+
+    def test_dispositivo_do_topico(self):
+        self.assertEqual(dispositivo_do_topico("farm/1/7/esp-a/umidade"), "1/7/esp-a")
+        self.assertIsNone(dispositivo_do_topico("farm/1/7/umidade"))
+        self.assertIsNone(dispositivo_do_topico("sensor/umidade"))
+
+    def test_dispositivo_conhecido_nao_consulta_banco(self):
+        linhas = [{'id_sensor': None, 'dispositivo': "1/7/esp-a"}, {'id_sensor': 1}]
+        self.indice.resolver(self.conn, 'SENSOR_UMIDADE', linhas)
+        self.assertEqual(linhas, [{'id_sensor': 40}, {'id_sensor': 1}])
+        self.conn.cursor.assert_not_called()
+
+    def test_dispositivo_novo_cadastrado_uma_vez(self):
+        self.cursor.var.return_value.getvalue.return_value = [55]
+        linhas = [{'id_sensor': None, 'dispositivo': "1/7/esp-b"}, {'id_sensor': None, 'dispositivo': "1/7/esp-b"}]
+        self.indice.resolver(self.conn, 'SENSOR_PH', linhas)
+        self.assertEqual(linhas, [{'id_sensor': 55}, {'id_sensor': 55}])
+        self.assertEqual(self.cursor.execute.call_count, 2)  # sensor + DISPOSITIVO_SENSOR
+        self.conn.commit.assert_called_once()
+        outras = [{'id_sensor': None, 'dispositivo': "1/7/esp-b"}]
+        self.indice.resolver(self.conn, 'SENSOR_PH', outras)  # já no índice: sem novo cadastro
+        self.assertEqual(outras, [{'id_sensor': 55}])
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_cadastro_concorrente_usa_o_existente(self):
+        self.cursor.var.return_value.getvalue.return_value = [56]
+        self.cursor.execute.side_effect = [None, oracledb.IntegrityError("ORA-00001"), None]
+        self.cursor.fetchone.return_value = (60,)
+        linhas = [{'id_sensor': None, 'dispositivo': "1/7/esp-c"}]
+        self.indice.resolver(self.conn, 'SENSOR_PH', linhas)
+        self.conn.rollback.assert_called_once()
+        self.assertEqual(linhas, [{'id_sensor': 60}])
+
+    def test_sensor_recusado_sem_dispositivo_cadastrado_propaga_o_erro(self):
+        self.cursor.var.return_value.getvalue.return_value = [57]
+        self.cursor.execute.side_effect = [oracledb.IntegrityError("ORA-00001"), None]
+        self.cursor.fetchone.return_value = None
+        linhas = [{'id_sensor': None, 'dispositivo': "1/7/esp-d"}]
+        with self.assertRaises(oracledb.IntegrityError):
+            self.indice.resolver(self.conn, 'SENSOR_PH', linhas)
+        self.conn.rollback.assert_called_once()
+        self.assertNotIn((7, 'esp-d', 'SENSOR_PH'), self.indice._sensores)  # nada guardado no índice
+
+    def test_faixa_de_ids_dos_dispositivos(self):
+        self.assertIn("DISPOSITIVO_SENSOR_SEQ.NEXTVAL", self.indice._comandos_cadastro['SENSOR_PH'])
+        self.assertFalse(id_reservado(5))
+        self.assertTrue(id_reservado(ID_SENSOR_DISPOSITIVOS))
+
+    def test_campo_de_outra_propriedade_descartado(self):
+        self.cursor.fetchall.side_effect = [[(7, 1), (8, 2)]]
+        linhas = [{'id_sensor': None, 'dispositivo': "1/8/esp-a"}, {'id_sensor': None, 'dispositivo': "1/9/esp-a"}]
+        self.indice.resolver(self.conn, 'SENSOR_UMIDADE', linhas)
+        self.assertEqual(linhas, [])
+        self.cursor.var.assert_not_called()
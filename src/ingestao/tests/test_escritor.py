@@ -0,0 +1,97 @@
+"""
+Testes para o escritor em lote
+"""
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+from ingestao.escritor import EscritorLotes
+
+COMANDOS = {'LEITURA_A': "INSERT INTO A VALUES (:v)", 'LEITURA_B': "INSERT INTO B VALUES (:v)"}
+
+
+class PoolFalso:
+    def __init__(self):
+        self.conn = MagicMock()
+        self.conn.cursor.return_value.getbatcherrors.return_value = []
+
+    @contextmanager
+    def conexao(self):
+        yield self.conn
+
+
+class TestEscritorLotes(unittest.TestCase):
+    def setUp(self):
+        self.pool = PoolFalso()
+        self.cursor = self.pool.conn.cursor.return_value
+
+    def test_gravar_um_commit_por_lote(self):
+        escritor = EscritorLotes(self.pool, COMANDOS)
+        escritor.gravar({'LEITURA_A': [{'v': 1}, {'v': 2}], 'LEITURA_B': [{'v': 3}]})
+        self.assertEqual(self.cursor.executemany.call_count, 2)
+        self.pool.conn.commit.assert_called_once()
+
+    def test_tabela_desconhecida(self):
+        escritor = EscritorLotes(self.pool, COMANDOS)
+        with self.assertRaises(ValueError):
+            escritor.adicionar('LEITURA_X', {'v': 1})
+
+    def test_lote_cheio_dispara_gravacao(self):
+        escritor = EscritorLotes(self.pool, COMANDOS, tamanho_lote=3, latencia_maxima=60)
+        escritor.iniciar()
+        for v in range(3):
+            escritor.adicionar('LEITURA_A', {'v': v})
+        time.sleep(0.2)
+        self.cursor.executemany.assert_called_once_with(
+            COMANDOS['LEITURA_A'], [{'v': 0}, {'v': 1}, {'v': 2}], batcherrors=True)
+        escritor.encerrar(timeout=1)
+
+    def test_varias_linhas_seguem_no_mesmo_lote(self):
+        escritor = EscritorLotes(self.pool, COMANDOS, tamanho_lote=3, latencia_maxima=60)
+        escritor.iniciar()
+        escritor.adicionar_varias('LEITURA_A', [{'v': v} for v in range(5)])
+        time.sleep(0.2)
+        self.cursor.executemany.assert_called_once_with(
+            COMANDOS['LEITURA_A'], [{'v': v} for v in range(5)], batcherrors=True)
+        escritor.encerrar(timeout=1)
+
+    def test_latencia_maxima_dispara_gravacao(self):
+        escritor = EscritorLotes(self.pool, COMANDOS, tamanho_lote=100, latencia_maxima=0.05)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        time.sleep(0.3)
+        self.pool.conn.commit.assert_called_once()
+        self.assertEqual(escritor.pendentes(), 0)
+        escritor.encerrar(timeout=1)
+
+    def test_encerrar_grava_pendentes(self):
+        escritor = EscritorLotes(self.pool, COMANDOS, tamanho_lote=100, latencia_maxima=60)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_B', {'v': 1})
+        escritor.encerrar(timeout=1)
+        self.pool.conn.commit.assert_called_once()
+
+    def test_prazo_esgotado_despeja_no_spool(self):
+        liberar = threading.Event()
+        self.pool.conn.commit.side_effect = lambda: liberar.wait(2)
+        spool = MagicMock()
+        escritor = EscritorLotes(self.pool, COMANDOS, tamanho_lote=1, latencia_maxima=60, spool=spool)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        time.sleep(0.1)
+        escritor.adicionar('LEITURA_B', {'v': 2})
+        escritor.encerrar(timeout=0.2)
+        liberar.set()
+        lotes = [chamada.args[0] for chamada in spool.guardar.call_args_list]
+        self.assertIn({'LEITURA_A': [{'v': 1}]}, lotes)
+        self.assertIn({'LEITURA_B': [{'v': 2}]}, lotes)
+
+    def test_depois_de_inserir_recebe_so_as_linhas_aceitas(self):
+        self.cursor.getbatcherrors.return_value = [MagicMock(code=1, offset=0)]
+        depois_de_inserir = MagicMock()
+        escritor = EscritorLotes(self.pool, COMANDOS, depois_de_inserir=depois_de_inserir)
+        escritor.gravar({'LEITURA_A': [{'v': 1}, {'v': 2}]})
+        depois_de_inserir.assert_called_once_with(self.pool.conn, {'LEITURA_A': [{'v': 2}]})
+        self.pool.conn.commit.assert_called_once()
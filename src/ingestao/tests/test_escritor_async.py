@@ -0,0 +1,65 @@
+"""
+Testes para o escritor em lote do modo asyncio
+"""
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from ingestao.escritor_async import EscritorLotesAsync
+
+COMANDOS = {'LEITURA_A': "INSERT INTO A VALUES (:v)"}
+
+
+class PoolAsyncFalso:
+    def __init__(self):
+        self.conn = MagicMock()
+        self.conn.commit = AsyncMock()
+        self.cursor = self.conn.cursor.return_value
+        self.cursor.executemany = AsyncMock()
+        self.cursor.getbatcherrors.return_value = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class TestEscritorLotesAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_lote_cheio_dispara_gravacao(self):
+        pool = PoolAsyncFalso()
+        escritor = EscritorLotesAsync(pool, COMANDOS, tamanho_lote=2, latencia_maxima=60)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        escritor.adicionar('LEITURA_A', {'v': 2})
+        await asyncio.sleep(0.05)
+        pool.cursor.executemany.assert_awaited_once_with(
+            COMANDOS['LEITURA_A'], [{'v': 1}, {'v': 2}], batcherrors=True)
+        pool.conn.commit.assert_awaited_once()
+        await escritor.encerrar()
+
+    async def test_encerrar_grava_pendentes(self):
+        pool = PoolAsyncFalso()
+        escritor = EscritorLotesAsync(pool, COMANDOS, tamanho_lote=100, latencia_maxima=60)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        await escritor.encerrar()
+        pool.conn.commit.assert_awaited_once()
+
+    async def test_aguardar_espaco_com_buffer_cheio(self):
+        escritor = EscritorLotesAsync(PoolAsyncFalso(), COMANDOS, tamanho_lote=1, maximo_pendentes=1)
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(escritor.aguardar_espaco(), 0.05)
+
+    async def test_prazo_esgotado_despeja_no_spool(self):
+        pool = PoolAsyncFalso()
+        async def commit_lento():
+            await asyncio.sleep(1)
+
+        pool.conn.commit = AsyncMock(side_effect=commit_lento)
+        spool = MagicMock()
+        escritor = EscritorLotesAsync(pool, COMANDOS, tamanho_lote=100, latencia_maxima=60, spool=spool)
+        escritor.iniciar()
+        escritor.adicionar('LEITURA_A', {'v': 1})
+        await escritor.encerrar(timeout=0.1)
+        spool.guardar.assert_called_once_with({'LEITURA_A': [{'v': 1}]})
@@ -0,0 +1,76 @@
+"""
+Testes para a assinatura compartilhada entre workers de ingestão
+
+O teste com broker usa MQTT_TESTE_SERVIDOR (padrão localhost:1883, ex.:
+``mosquitto -p 1883``) e é ignorado quando não há broker escutando.
+"""
+import os
+import socket
+import threading
+import time
+import unittest
+
+import paho.mqtt.client as mqtt
+
+from ingestao.grupo import arquivo_do_worker, assinaturas
+
+SERVIDOR_TESTE = os.getenv('MQTT_TESTE_SERVIDOR', 'localhost:1883')
+
+
+def _broker_disponivel(host: str, porta: int) -> bool:
+    try:
+        with socket.create_connection((host, porta), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+class TestGrupo(unittest.TestCase):
+    def test_assinaturas(self):
+        self.assertEqual(assinaturas("farmtech", ["sensor/#"], ["sensor/bomba"]),
+                         [("$share/farmtech/sensor/#", 1), ("sensor/bomba", 1)])
+
+    def test_arquivo_do_worker(self):
+        self.assertEqual(arquivo_do_worker("spool/leituras.db", 2), "spool/leituras_w2.db")
+        self.assertEqual(arquivo_do_worker("logs/mqtt.log", 0), "logs/mqtt_w0.log")
+
+
+class TestGrupoComBroker(unittest.TestCase):
+    def setUp(self):
+        host, porta = SERVIDOR_TESTE.rsplit(':', 1)
+        self.host, self.porta = host, int(porta)
+        if not _broker_disponivel(self.host, self.porta):
+            self.skipTest(f"sem broker MQTT em {SERVIDOR_TESTE}")
+
+    def _worker(self, nome, recebidas, conectados):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=nome, protocol=mqtt.MQTTv5)
+        client.on_connect = lambda c, u, f, rc, p: c.subscribe(assinaturas(f"teste{os.getpid()}", ["sensor/#"]))
+        client.on_subscribe = lambda c, u, mid, rcs, p: conectados.release()
+        client.on_message = lambda c, u, msg: recebidas.append(msg.payload)
+        client.connect(self.host, self.porta)
+        client.loop_start()
+        return client
+
+    def test_mensagens_divididas_entre_workers(self):
+        conectados = threading.Semaphore(0)
+        recebidas = ([], [])
+        workers = [self._worker(f"teste_w{i}_{os.getpid()}", recebidas[i], conectados) for i in range(2)]
+        for _ in workers:
+            self.assertTrue(conectados.acquire(timeout=5))
+
+        publicador = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
+        publicador.connect(self.host, self.porta)
+        publicador.loop_start()
+        for indice in range(20):
+            publicador.publish("sensor/umidade", str(indice), qos=1).wait_for_publish(5)
+
+        limite = time.monotonic() + 5
+        while len(recebidas[0]) + len(recebidas[1]) < 20 and time.monotonic() < limite:
+            time.sleep(0.05)
+        for client in workers + [publicador]:
+            client.loop_stop()
+            client.disconnect()
+
+        # Cada mensagem vai para um único worker do grupo
+        self.assertEqual(sorted(recebidas[0] + recebidas[1], key=int), [str(i).encode() for i in range(20)])
+        self.assertTrue(recebidas[0] and recebidas[1])
@@ -0,0 +1,66 @@
+"""
+Testes para o limite de mensagens por tópico
+"""
+import unittest
+
+from ingestao.limitador import BaldeTokens, LimitadorIngestao
+from ingestao.metricas import MENSAGENS_LIMITADAS
+
+
+class TestBaldeTokens(unittest.TestCase):
+    def test_rajada_e_reabastecimento(self):
+        balde = BaldeTokens(taxa=2, rajada=3, agora=0)
+        self.assertEqual([balde.consumir(0) for _ in range(4)], [True, True, True, False])
+        self.assertFalse(balde.consumir(0.4))
+        self.assertTrue(balde.consumir(0.5))  # 0,5 s a 2/s devolve um token
+
+
+class TestLimitadorIngestao(unittest.TestCase):
+    def test_descarta_sem_coalescer(self):
+        limitador = LimitadorIngestao(taxa=1, rajada=2, taxas_por_topico=[], coalescer=False)
+        antes = MENSAGENS_LIMITADAS.valor('farm/a/b/no-1/ph', 'descartada')
+        aceitas = [limitador.permitir('farm/a/b/no-1/ph', agora=0) for _ in range(5)]
+        self.assertEqual(aceitas, [True, True, False, False, False])
+        self.assertEqual(MENSAGENS_LIMITADAS.valor('farm/a/b/no-1/ph', 'descartada') - antes, 3)
+        # Outro dispositivo tem o próprio balde
+        self.assertTrue(limitador.permitir('farm/a/b/no-2/ph', agora=0))
+
+    def test_coalesce_na_mensagem_mais_recente(self):
+        entregues = []
+        limitador = LimitadorIngestao(taxa=1, rajada=1, taxas_por_topico=[], coalescer=True)
+        limitador._entregar = lambda *args: entregues.append(args)
+        self.assertTrue(limitador.permitir('farm/a/b/no-1/ph', 'm1', agora=0))
+        self.assertFalse(limitador.permitir('farm/a/b/no-1/ph', 'm2', agora=0.1))
+        self.assertFalse(limitador.permitir('farm/a/b/no-1/ph', 'm3', agora=0.2))
+        self.assertEqual(limitador.liberar_pendentes(agora=0.5), 0)
+        self.assertEqual(limitador.liberar_pendentes(agora=1.0), 1)
+        self.assertEqual(entregues, [('m3',)])
+
+    def test_taxa_por_filtro(self):
+        limitador = LimitadorIngestao(taxa=1, rajada=1, taxas_por_topico=[('sensor/bomba', 0)], coalescer=False)
+        self.assertTrue(all(limitador.permitir('sensor/bomba', agora=0) for _ in range(10)))
+        self.assertTrue(limitador.permitir('farm/a/b/no-1/ph', agora=0))
+        self.assertFalse(limitador.permitir('farm/a/b/no-1/ph', agora=0))  # demais tópicos: taxa geral
+
+    def test_encerrar_devolve_retidas(self):
+        limitador = LimitadorIngestao(taxa=1, rajada=1, taxas_por_topico=[], coalescer=True)
+        limitador.permitir('farm/a/b/no-1/ph', 'm1', agora=0)
+        limitador.permitir('farm/a/b/no-1/ph', 'm2', agora=0)
+        self.assertEqual(limitador.encerrar(), [('m2',)])
+        self.assertEqual(limitador.encerrar(), [])
+
+    def test_topico_compartilhado_sem_limite_por_padrao(self):
+        limitador = LimitadorIngestao(taxa=1, rajada=1, taxas_por_topico=[], coalescer=True,
+                                      compartilhados=['sensor/#'])
+        # 40 msg/s de vários dispositivos no mesmo sensor/umidade: todas seguem
+        self.assertTrue(all(limitador.permitir('sensor/umidade', f'm{i}', agora=i / 40) for i in range(40)))
+        # O tópico de um dispositivo continua limitado
+        self.assertTrue(limitador.permitir('farm/a/b/no-1/umidade', 'm1', agora=0))
+        self.assertFalse(limitador.permitir('farm/a/b/no-1/umidade', 'm2', agora=0))
+
+    def test_topico_compartilhado_limitado_nunca_coalesce(self):
+        limitador = LimitadorIngestao(taxa=1, rajada=1, taxas_por_topico=[('sensor/umidade', 1)], coalescer=True,
+                                      compartilhados=['sensor/#'])
+        self.assertTrue(limitador.permitir('sensor/umidade', 'dispositivo-a', agora=0))
+        self.assertFalse(limitador.permitir('sensor/umidade', 'dispositivo-b', agora=0))
+        self.assertEqual(limitador.encerrar(), [])  # descartada, não retida no lugar da de outro dispositivo
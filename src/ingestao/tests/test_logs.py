@@ -0,0 +1,35 @@
+"""
+Testes para a fila de logs e a amostragem por tópico
+"""
+import logging
+import queue
+import unittest
+
+from ingestao.logs import AmostragemPorTopico, FilaDeLogs
+
+
+def _registro(nivel=logging.INFO, topico=None):
+    registro = logging.LogRecord('teste', nivel, __file__, 1, "valor %s", (42,), None)
+    if topico is not None:
+        registro.topico = topico
+    return registro
+
+
+class TestLogs(unittest.TestCase):
+    def test_amostragem_por_topico(self):
+        amostragem = AmostragemPorTopico(intervalo=3)
+        aceitos = [amostragem.filter(_registro(topico='sensor/ph')) for _ in range(6)]
+        self.assertEqual(aceitos, [True, False, False, True, False, False])
+        self.assertTrue(amostragem.filter(_registro(topico='sensor/umidade')))
+        self.assertTrue(amostragem.filter(_registro(logging.WARNING, topico='sensor/ph')))
+        self.assertTrue(amostragem.filter(_registro()))
+
+    def test_fila_cheia_descarta_sem_formatar(self):
+        fila_de_logs = FilaDeLogs(queue.Queue(1))
+        registro = _registro()
+        fila_de_logs.emit(registro)
+        fila_de_logs.emit(_registro())
+        self.assertEqual(fila_de_logs.descartados, 1)
+        enfileirado = fila_de_logs.queue.get_nowait()
+        self.assertIs(enfileirado, registro)
+        self.assertEqual(enfileirado.args, (42,))
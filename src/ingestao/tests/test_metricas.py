@@ -0,0 +1,51 @@
+"""
+Testes para as métricas da ingestão e o endpoint no formato do Prometheus
+"""
+import unittest
+import urllib.request
+
+from ingestao.metricas import (CONTEUDO_PROMETHEUS, Contador, Histograma, Medidor, RegistroMetricas,
+                               iniciar_servidor)
+
+
+class TestMetricas(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroMetricas()
+
+    def test_contador_por_rotulo(self):
+        contador = self.registro.registrar(Contador('mensagens_total', 'Mensagens.', ('topico',)))
+        contador.inc('sensor/ph')
+        contador.inc('sensor/ph', quantidade=2)
+        contador.inc('sensor/"x"')
+        texto = self.registro.texto()
+        self.assertIn('# TYPE mensagens_total counter', texto)
+        self.assertIn('mensagens_total{topico="sensor/ph"} 3', texto)
+        self.assertIn('mensagens_total{topico="sensor/\\"x\\""} 1', texto)
+
+    def test_medidor_lido_na_coleta(self):
+        fila = [1, 2]
+        medidor = self.registro.registrar(Medidor('fila_profundidade', 'Fila.', ('fila',)))
+        medidor.acompanhar(lambda: len(fila), 'pipeline')
+        fila.append(3)
+        self.assertIn('fila_profundidade{fila="pipeline"} 3', self.registro.texto())
+
+    def test_histograma_cumulativo(self):
+        histograma = self.registro.registrar(Histograma('commit_segundos', 'Commit.', limites=(0.01, 0.1)))
+        for valor in (0.005, 0.05, 0.5):
+            histograma.observar(valor)
+        linhas = self.registro.texto().splitlines()
+        self.assertIn('commit_segundos_bucket{le="0.01"} 1', linhas)
+        self.assertIn('commit_segundos_bucket{le="0.1"} 2', linhas)
+        self.assertIn('commit_segundos_bucket{le="+Inf"} 3', linhas)
+        self.assertIn('commit_segundos_count 3', linhas)
+
+    def test_endpoint_http(self):
+        self.registro.registrar(Contador('reconexoes_total', 'Reconexões.')).inc()
+        servidor = iniciar_servidor(0, registro=self.registro)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{servidor.server_port}/metrics", timeout=5) as resposta:
+                self.assertEqual(resposta.headers['Content-Type'], CONTEUDO_PROMETHEUS)
+                self.assertIn('reconexoes_total 1', resposta.read().decode())
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
@@ -0,0 +1,217 @@
+"""
+Testes para o parse e o encaminhamento das mensagens no mqtt_client
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from ingestao import config
+
+_diretorio = tempfile.mkdtemp()
+for _variavel, _valor in (('DB_USER', 'teste'), ('DB_PASSWORD', 'teste'), ('DB_DSN', 'localhost/teste')):
+    os.environ.setdefault(_variavel, _valor)
+with patch.object(config, 'SPOOL_CAMINHO', os.path.join(_diretorio, 'spool.db')), \
+        patch.object(config, 'LOG_ARQUIVO', os.path.join(_diretorio, 'mqtt.log')):
+    import mqtt_client
+from ingestao.binario import codificar_leitura
+from ingestao.bomba import ControladoresBomba
+from ingestao.mqtt_async import PublicadorAsync
+from ingestao.reconexao import EsperaReconexao
+from ingestao.reordenacao import JanelaReordenacao
+
+RECEBIDA_EM = datetime(2024, 5, 1, 10, 5)
+
+
+def tearDownModule():
+    mqtt_client.spool.fechar()
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.linhas = {}
+        self.falhar = 0  # quantas chamadas seguidas devem falhar
+
+    def adicionar_varias(self, tabela, linhas):
+        if self.falhar:
+            self.falhar -= 1
+            raise RuntimeError("escritor encerrado")
+        self.linhas.setdefault(tabela, []).extend(linhas)
+
+
+def mensagem(topico, payload):
+    return SimpleNamespace(topic=topico, payload=json.dumps(payload).encode(), properties=None)
+
+
+def leitura(id_sensor, hora, valor):
+    return {"id_sensor": id_sensor, "data_leitura": "2024-05-01", "hora_leitura": hora, "Valor": valor}
+
+
+class TestProcessarMensagem(unittest.TestCase):
+    def setUp(self):
+        self.escritor = EscritorFalso()
+        self.client = MagicMock()
+        mqtt_client.deduplicador._vistas.clear()
+        for nome, valor in (('janela_reordenacao', JanelaReordenacao(atraso_maximo=300)),
+                            ('controladores_bomba', ControladoresBomba())):
+            substituto = patch.object(mqtt_client, nome, valor)
+            substituto.start()
+            self.addCleanup(substituto.stop)
+
+    def processar(self, topico, payload):
+        mqtt_client.processar_mensagem(self.client, mensagem(topico, payload), self.escritor, RECEBIDA_EM)
+
+    def test_valor_invalido_descarta_so_o_item(self):
+        self.processar("sensor/ph", [leitura(3, "10:00:00", 6.5), leitura(3, "10:00:05", "x")])
+        linhas = self.escritor.linhas['LEITURA_SENSOR_PH']
+        self.assertEqual([linha['valor_ph'] for linha in linhas], [6.5])
+
+    def test_leitura_reenviada_apos_falha_nao_e_repetida(self):
+        self.escritor.falhar = 1
+        self.processar("sensor/ph", leitura(3, "10:01:00", 6.8))
+        self.assertEqual(self.escritor.linhas, {})
+
+        self.processar("sensor/ph", leitura(3, "10:01:00", 6.8))
+        self.assertEqual(len(self.escritor.linhas['LEITURA_SENSOR_PH']), 1)
+
+        self.processar("sensor/ph", leitura(3, "10:01:00", 6.8))
+        self.assertEqual(len(self.escritor.linhas['LEITURA_SENSOR_PH']), 1)  # agora sim, repetida
+
+    def test_resumo_e_leitura_com_mesma_chave_nao_colidem(self):
+        # Umidade 60 às 10:02 e resumo de janela de 60 s iniciado às 10:02
+        resumo = {"id_sensor": 1, "data_leitura": "2024-05-01", "hora_leitura": "10:02:00",
+                  "janela": 60, "minimo": 50, "maximo": 70, "media": 60, "contagem": 12}
+        self.processar("sensor/umidade", [leitura(1, "10:02:00", 60), resumo])
+        self.assertEqual(len(self.escritor.linhas['LEITURA_SENSOR_UMIDADE']), 1)
+        self.assertEqual(len(self.escritor.linhas[mqtt_client.TABELA_AGREGADOS]), 1)
+
+    def test_botoes_de_nutrientes(self):
+        self.processar("sensor/potassio", leitura(4, "10:03:00", 1))
+        self.processar("sensor/sodio", leitura(5, "10:03:00", 0))  # botão solto: zero é leitura válida
+        linhas = self.escritor.linhas['LEITURA_SENSOR_NUTRIENTES']
+        self.assertEqual([(linha['id_sensor'], linha['valor_nutrientes']) for linha in linhas], [(4, 1.0), (5, 0.0)])
+
+    def test_ids_dos_botoes_em_outro_topico_vao_para_nutrientes(self):
+        self.processar("sensor/dados", [leitura(4, "10:04:00", 1), leitura(5, "10:04:00", 1), leitura(3, "10:04:00", 6.5)])
+        self.assertEqual([linha['id_sensor'] for linha in self.escritor.linhas['LEITURA_SENSOR_NUTRIENTES']], [4, 5])
+        self.assertEqual(len(self.escritor.linhas['LEITURA_SENSOR_PH']), 1)
+
+    def test_id_sensor_ausente_ou_invalido_e_descartado(self):
+        sem_id = leitura(None, "10:05:00", 1)
+        del sem_id['id_sensor']
+        self.processar("sensor/potassio", [sem_id, leitura("4", "10:05:01", 1), leitura(True, "10:05:02", 1),
+                                           leitura(0, "10:05:03", 1), leitura(4, "10:05:04", 1)])
+        self.assertEqual([linha['id_sensor'] for linha in self.escritor.linhas['LEITURA_SENSOR_NUTRIENTES']], [4])
+
+    def test_resumo_sem_id_sensor_e_descartado(self):
+        resumo = {"data_leitura": "2024-05-01", "hora_leitura": "10:06:00",
+                  "janela": 60, "minimo": 50, "maximo": 70, "media": 60, "contagem": 12}
+        self.processar("sensor/potassio", resumo)  # o tópico sozinho já daria o tipo
+        self.assertNotIn(mqtt_client.TABELA_AGREGADOS, self.escritor.linhas)
+
+    def test_relogio_do_dispositivo_em_outro_fuso_aciona_a_bomba(self):
+        # Firmware em UTC-3, servidor em UTC: a leitura parece 3 h atrasada para o relógio do servidor
+        self.processar("sensor/umidade", leitura(1, "07:05:00", 10))
+        self.client.publish.assert_called_once_with(mqtt_client.pump_topic, "ON", qos=1, retain=True)
+
+    def test_backfill_fora_da_janela_nao_aciona_a_bomba(self):
+        self.processar("sensor/umidade", leitura(1, "10:05:00", 60))
+        self.processar("sensor/umidade", leitura(1, "09:00:00", 10))
+        self.client.publish.assert_called_once_with(mqtt_client.pump_topic, "OFF", qos=1, retain=True)
+        self.assertEqual(len(self.escritor.linhas['LEITURA_SENSOR_UMIDADE']), 2)  # gravada mesmo assim
+    def test_valor_binario_nao_finito_nao_aciona_a_bomba(self):
+        payload = b''.join(codificar_leitura(1, datetime(2024, 5, 1, 10, 5, segundo), valor)
+                           for segundo, valor in enumerate((float('nan'), float('inf'), 40.0)))
+        msg = SimpleNamespace(topic="sensor/umidade", payload=payload,
+                              properties=SimpleNamespace(ContentType=mqtt_client.CONTEUDO_BINARIO))
+        mqtt_client.processar_mensagem(self.client, msg, self.escritor, RECEBIDA_EM)
+        self.assertEqual([linha['valor_umidade'] for linha in self.escritor.linhas['LEITURA_SENSOR_UMIDADE']], [40.0])
+        self.client.publish.assert_called_once_with(mqtt_client.pump_topic, "ON", qos=1, retain=True)
+    def test_status_invalido_conta_falha_de_parse(self):
+        antes = mqtt_client.FALHAS_PARSE.valor("sensor/status")
+        mqtt_client.processar_mensagem(self.client, SimpleNamespace(topic="sensor/status", payload=b"{", properties=None),
+                                       self.escritor, RECEBIDA_EM)
+        self.processar("sensor/status", {"device": "ESP32"})
+        self.assertEqual(mqtt_client.FALHAS_PARSE.valor("sensor/status"), antes + 2)
+
+    def test_mensagem_descartada_pelo_limitador_e_contada(self):
+        antes = mqtt_client.MENSAGENS.valor("sensor/ph")
+        with patch.object(mqtt_client, 'limitador', MagicMock(permitir=MagicMock(return_value=False))), \
+                patch.object(mqtt_client, 'pipeline') as pipeline:
+            mqtt_client.on_message(self.client, None, mensagem("sensor/ph", leitura(3, "10:07:00", 6.5)))
+        pipeline.enfileirar.assert_not_called()
+        self.assertEqual(mqtt_client.MENSAGENS.valor("sensor/ph"), antes + 1)
+
+class ParadaSemEspera(threading.Event):
+    """Guarda as esperas pedidas em vez de dormir"""
+
+    def __init__(self):
+        super().__init__()
+        self.esperas = []
+
+    def wait(self, timeout=None):
+        self.esperas.append(timeout)
+        return self.is_set()
+
+
+class ClienteQueCai:
+    """Recusa as primeiras tentativas; a primeira conexão cai e a segunda dura até a parada"""
+
+    def __init__(self, recusas, parada):
+        self.recusas = recusas
+        self.parada = parada
+        self.conexoes = 0
+        self.paradas_da_rede = 0
+
+    def reconnect(self):
+        if self.recusas:
+            self.recusas -= 1
+            raise ConnectionRefusedError("conexão recusada")
+        self.conexoes += 1
+
+    def loop_start(self):
+        if self.conexoes == 1:
+            mqtt_client.conexao_perdida.set()
+        else:
+            self.parada.set()
+
+    def loop_stop(self):
+        self.paradas_da_rede += 1
+
+
+class TestManterConexao(unittest.TestCase):
+    def test_esperas_vem_do_backoff_da_ingestao(self):
+        parada = ParadaSemEspera()
+        cliente = ClienteQueCai(recusas=2, parada=parada)
+        espera = EsperaReconexao(minimo=1, maximo=8, sortear=lambda minimo, teto: teto)
+        with patch.object(mqtt_client, 'espera_reconexao', espera):
+            mqtt_client.manter_conexao(cliente, parada)
+        self.assertEqual(parada.esperas, [1, 2, 4])  # duas recusas e uma queda
+        self.assertEqual(cliente.conexoes, 2)
+        self.assertEqual(cliente.paradas_da_rede, 1)  # a rede da última conexão segue para o encerramento
+class TestEncerrarIngestaoAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_comandos_da_bomba_saem_antes_de_desconectar(self):
+        publicados = []
+
+        async def publicar(topico, payload, qos=0, retain=False):
+            await asyncio.sleep(0.01)
+            publicados.append((topico, payload))
+
+        cliente = MagicMock(messages=[])
+        cliente.publish = publicar
+        publicador = PublicadorAsync(cliente)
+        publicador.publish("sensor/bomba", "ON", qos=1, retain=True)
+        escritor_async = MagicMock(encerrar=AsyncMock())
+        consumo = asyncio.get_running_loop().create_future()
+
+        with patch.object(config, 'MQTT_SESSAO_PERSISTENTE', True), \
+                patch.object(mqtt_client, 'limitador', MagicMock(encerrar=MagicMock(return_value=[]))):
+            await mqtt_client.encerrar_ingestao_async(cliente, publicador, escritor_async, consumo, prazo=5)
+
+        self.assertEqual(publicados, [("sensor/bomba", "ON")])
+        escritor_async.encerrar.assert_awaited_once()
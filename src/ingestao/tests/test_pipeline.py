@@ -0,0 +1,80 @@
+"""
+Testes para o pipeline de processamento das mensagens
+"""
+import threading
+import unittest
+
+from ingestao.pipeline import PipelineIngestao
+
+
+class TestPipelineIngestao(unittest.TestCase):
+    def test_processa_em_ordem_por_chave(self):
+        recebidas = []
+        pipeline = PipelineIngestao(lambda topico, valor: recebidas.append((topico, valor)),
+                                    workers=3, intervalo_relatorio=0)
+        pipeline.iniciar()
+        for valor in range(50):
+            pipeline.enfileirar("sensor/umidade", "sensor/umidade", valor)
+        pipeline.encerrar(timeout=2)
+        self.assertEqual([valor for _, valor in recebidas], list(range(50)))
+        self.assertEqual(pipeline.estatisticas()['processadas'], 50)
+
+    def test_descartar_nova_com_fila_cheia(self):
+        liberar = threading.Event()
+        pipeline = PipelineIngestao(lambda valor: liberar.wait(), workers=1, tamanho_fila=1,
+                                    politica='descartar_nova', intervalo_relatorio=0)
+        pipeline.iniciar()
+        resultados = [pipeline.enfileirar("t", v) for v in range(5)]
+        liberar.set()
+        pipeline.encerrar(timeout=2)
+        self.assertFalse(all(resultados))
+        self.assertGreater(pipeline.estatisticas()['descartadas'], 0)
+
+    def test_descartar_antiga_mantem_a_mais_recente(self):
+        processadas = []
+        bloqueio = threading.Event()
+        iniciou = threading.Event()
+
+        def processar(valor):
+            iniciou.set()
+            bloqueio.wait()
+            processadas.append(valor)
+
+        pipeline = PipelineIngestao(processar, workers=1, tamanho_fila=1,
+                                    politica='descartar_antiga', intervalo_relatorio=0)
+        pipeline.iniciar()
+        pipeline.enfileirar("t", 0)
+        iniciou.wait(1)
+        for valor in range(1, 5):
+            self.assertTrue(pipeline.enfileirar("t", valor))
+        bloqueio.set()
+        pipeline.encerrar(timeout=2)
+        self.assertEqual(processadas, [0, 4])
+
+    def test_erro_no_processador_nao_para_o_worker(self):
+        def processar(valor):
+            if valor == 0:
+                raise ValueError("payload inválido")
+
+        pipeline = PipelineIngestao(processar, workers=1, intervalo_relatorio=0)
+        pipeline.iniciar()
+        pipeline.enfileirar("t", 0)
+        pipeline.enfileirar("t", 1)
+        pipeline.encerrar(timeout=2)
+        estatisticas = pipeline.estatisticas()
+        self.assertEqual(estatisticas['erros'], 1)
+        self.assertEqual(estatisticas['processadas'], 1)
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            PipelineIngestao(print, politica='ignorar')
+
+    def test_encerrar_respeita_prazo_total(self):
+        liberar = threading.Event()
+        pipeline = PipelineIngestao(lambda valor: liberar.wait(2), workers=2, intervalo_relatorio=0)
+        pipeline.iniciar()
+        for valor in range(6):
+            pipeline.enfileirar(f"t{valor}", valor)
+        restantes = pipeline.encerrar(timeout=0.2)
+        liberar.set()
+        self.assertGreater(restantes, 0)
@@ -0,0 +1,74 @@
+"""
+Testes para o pool de sessões Oracle da ingestão
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+import oracledb
+from oracledb import errors
+
+from ingestao.pool import PoolConexoes
+
+
+class TestPoolConexoes(unittest.TestCase):
+    def setUp(self):
+        self.pool_conexoes = PoolConexoes("user", "senha", "dsn")
+
+    @patch('oracledb.create_pool')
+    def test_pool_criado_uma_unica_vez(self, mock_create_pool):
+        self.pool_conexoes.obter_pool()
+        self.pool_conexoes.obter_pool()
+        mock_create_pool.assert_called_once()
+
+    @patch('oracledb.create_pool')
+    def test_conexao_devolvida_ao_pool(self, mock_create_pool):
+        pool = mock_create_pool.return_value
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIs(conn, pool.acquire.return_value)
+        pool.release.assert_called_once_with(conn)
+
+    @patch('oracledb.create_pool', side_effect=oracledb.DatabaseError("sem banco"))
+    def test_banco_indisponivel_produz_none(self, mock_create_pool):
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIsNone(conn)
+
+    @patch('oracledb.create_pool')
+    def test_pool_recriado_apos_falha_no_acquire(self, mock_create_pool):
+        pool_quebrado = Mock()
+        pool_quebrado.acquire.side_effect = oracledb.DatabaseError("sessão perdida")
+        mock_create_pool.side_effect = [pool_quebrado, Mock()]
+
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIsNone(conn)
+        pool_quebrado.close.assert_called_once_with(force=True)
+
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIsNotNone(conn)
+        self.assertEqual(mock_create_pool.call_count, 2)
+
+    @patch('oracledb.create_pool')
+    def test_pool_esgotado_nao_e_descartado(self, mock_create_pool):
+        pool = mock_create_pool.return_value
+        try:
+            errors._raise_err(errors.ERR_POOL_NO_CONNECTION_AVAILABLE)
+        except oracledb.DatabaseError as e:
+            pool.acquire.side_effect = [e, Mock()]
+
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIsNone(conn)
+        pool.close.assert_not_called()
+
+        with self.pool_conexoes.conexao() as conn:
+            self.assertIsNotNone(conn)
+        mock_create_pool.assert_called_once()
+
+    @patch('oracledb.create_pool')
+    def test_sessao_sem_saude_e_descartada(self, mock_create_pool):
+        pool = mock_create_pool.return_value
+        pool.acquire.return_value.is_healthy.return_value = False
+
+        with self.assertRaises(oracledb.DatabaseError):
+            with self.pool_conexoes.conexao():
+                raise oracledb.DatabaseError("conexão encerrada")
+        pool.drop.assert_called_once()
+        pool.release.assert_not_called()
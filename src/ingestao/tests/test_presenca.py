@@ -0,0 +1,63 @@
+"""
+Testes para a presença dos dispositivos e a detecção de silêncio
+"""
+import unittest
+
+from ingestao.presenca import OFFLINE, ONLINE, PresencaDispositivos
+
+
+class TestPresencaDispositivos(unittest.TestCase):
+    def setUp(self):
+        self.presenca = PresencaDispositivos(silencio=60, intervalo=1)
+
+    def test_silencio_apos_prazo(self):
+        self.presenca.visto('umidade/1', agora=0)
+        self.presenca.visto('ph/3', agora=0)
+        self.presenca.visto('ph/3', agora=50)
+        self.assertEqual(self.presenca.verificar(agora=61), ['umidade/1'])
+        self.assertEqual(self.presenca.silenciosas(), ['umidade/1'])
+        self.assertEqual(self.presenca.ativas(), 1)
+        # O contato em 50 reagendou ph/3 para 110
+        self.assertEqual(self.presenca.verificar(agora=109), [])
+        self.assertEqual(self.presenca.verificar(agora=111), ['ph/3'])
+
+    def test_uma_entrada_no_heap_por_chave(self):
+        for agora in range(1000):
+            self.presenca.visto('umidade/1', agora=agora)
+        self.assertEqual(len(self.presenca._prazos), 1)
+
+    def test_volta_apos_silencio(self):
+        self.presenca.visto('umidade/1', agora=0)
+        self.presenca.verificar(agora=61)
+        self.presenca.visto('umidade/1', agora=70)
+        self.assertEqual(self.presenca.silenciosas(), [])
+        self.assertEqual(self.presenca.verificar(agora=131), ['umidade/1'])
+
+    def test_status_offline_marca_na_hora(self):
+        self.presenca.registrar_status('ESP32', ONLINE, agora=0)
+        self.presenca.registrar_status('ESP32', OFFLINE)
+        self.assertEqual(self.presenca.silenciosas(), ['ESP32'])
+        self.assertEqual(self.presenca.verificar(agora=61), [])  # não é anunciado duas vezes
+        self.presenca.registrar_status('ESP32', ONLINE, agora=100)
+        self.assertEqual(self.presenca.silenciosas(), [])
+
+    def test_leituras_mantem_o_dispositivo_e_lwt_marca_os_sensores(self):
+        self.presenca.registrar_status('esp32-01', ONLINE, agora=0)
+        for agora in range(0, 200, 10):
+            self.presenca.visto('esp32-01/umidade', agora=agora, dispositivo='esp32-01')
+            self.presenca.visto('esp32-01/ph', agora=agora, dispositivo='esp32-01')
+            self.assertEqual(self.presenca.verificar(agora=agora), [])  # só o status não venceria o prazo
+        self.assertEqual(self.presenca.ativas(), 3)
+
+        self.presenca.registrar_status('esp32-01', OFFLINE, agora=200)
+        self.assertEqual(sorted(self.presenca.silenciosas()), ['esp32-01', 'esp32-01/ph', 'esp32-01/umidade'])
+        self.assertEqual(self.presenca.verificar(agora=300), [])  # já anunciados pelo LWT
+
+        self.presenca.visto('esp32-01/umidade', agora=310, dispositivo='esp32-01')
+        self.assertEqual(self.presenca.silenciosas(), ['esp32-01/ph'])
+
+    def test_dispositivo_silencia_com_todos_os_sensores(self):
+        self.presenca.visto('esp32-01/umidade', agora=0, dispositivo='esp32-01')
+        self.presenca.visto('esp32-01/ph', agora=30, dispositivo='esp32-01')
+        self.assertEqual(self.presenca.verificar(agora=61), ['esp32-01/umidade'])
+        self.assertEqual(self.presenca.verificar(agora=91), ['esp32-01/ph', 'esp32-01'])
@@ -0,0 +1,24 @@
+"""
+Testes para o backoff com jitter das reconexões ao broker
+"""
+import unittest
+
+from ingestao.reconexao import EsperaReconexao
+
+
+class TestEsperaReconexao(unittest.TestCase):
+    def test_teto_dobra_ate_o_maximo(self):
+        espera = EsperaReconexao(minimo=1, maximo=10, sortear=lambda minimo, teto: teto)
+        self.assertEqual([espera.proxima() for _ in range(6)], [1, 2, 4, 8, 10, 10])
+
+    def test_jitter_entre_minimo_e_teto(self):
+        espera = EsperaReconexao(minimo=1, maximo=120)
+        for _ in range(50):
+            self.assertTrue(1 <= espera.proxima() <= 120)
+
+    def test_reiniciar_apos_conexao(self):
+        espera = EsperaReconexao(minimo=2, maximo=60, sortear=lambda minimo, teto: teto)
+        espera.proxima()
+        espera.proxima()
+        espera.reiniciar()
+        self.assertEqual(espera.proxima(), 2)
@@ -0,0 +1,37 @@
+"""
+Testes para o registro de sensores conhecidos
+"""
+import unittest
+from unittest.mock import MagicMock
+
+from ingestao.registro_sensores import RegistroSensores
+
+
+class TestRegistroSensores(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroSensores()
+        self.conn = MagicMock()
+        self.cursor = self.conn.cursor.return_value
+
+    def test_carregar_aquece_registro(self):
+        self.cursor.fetchall.side_effect = [[(1,), (2,)], [(3,)], []]
+        self.registro.carregar(self.conn)
+        self.registro.garantir(self.conn, 'SENSOR_UMIDADE', [2])
+        self.registro.garantir(self.conn, 'SENSOR_PH', [3])
+        self.cursor.executemany.assert_not_called()
+        self.registro.garantir(self.conn, 'SENSOR_PH', [1])
+        self.assertEqual(self.cursor.executemany.call_args[0][1], [{'id_sensor': 1}])
+
+    def test_sensor_novo_cadastrado_uma_vez(self):
+        self.registro.garantir(self.conn, 'SENSOR_PH', [7, 7])
+        self.registro.garantir(self.conn, 'SENSOR_PH', [7])
+        self.cursor.executemany.assert_called_once()
+        self.assertEqual(self.cursor.executemany.call_args[0][1], [{'id_sensor': 7}])
+        self.conn.commit.assert_called_once()
+
+    def test_sensor_conhecido_nao_consulta_banco(self):
+        self.cursor.fetchall.side_effect = [[(1,)], [], []]
+        self.registro.carregar(self.conn)
+        self.conn.reset_mock()
+        self.registro.garantir(self.conn, 'SENSOR_UMIDADE', [1])
+        self.conn.cursor.assert_not_called()
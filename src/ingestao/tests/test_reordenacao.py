@@ -0,0 +1,30 @@
+"""
+Testes para a janela de reordenação no relógio do dispositivo
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from ingestao.reordenacao import JanelaReordenacao
+
+INICIO = datetime(2024, 5, 1, 10, 0)
+
+
+class TestJanelaReordenacao(unittest.TestCase):
+    def setUp(self):
+        self.janela = JanelaReordenacao(atraso_maximo=300)
+
+    def test_relogio_do_dispositivo_nao_e_comparado_com_o_servidor(self):
+        # Horário de anos atrás (ou em outro fuso): ao vivo para o sensor, então não é atrasada
+        self.assertFalse(self.janela.atrasada('umidade/1', datetime(2020, 1, 1)))
+        self.assertFalse(self.janela.atrasada('umidade/1', datetime(2020, 1, 1, 0, 0, 5)))
+
+    def test_backfill_fora_da_janela(self):
+        self.janela.atrasada('umidade/1', INICIO)
+        self.assertFalse(self.janela.atrasada('umidade/1', INICIO - timedelta(seconds=300)))
+        self.assertTrue(self.janela.atrasada('umidade/1', INICIO - timedelta(seconds=301)))
+        self.assertFalse(self.janela.atrasada('ph/3', INICIO - timedelta(hours=1)))  # cada sensor tem o seu horário
+
+    def test_zero_desliga(self):
+        janela = JanelaReordenacao(atraso_maximo=0)
+        janela.atrasada('umidade/1', INICIO)
+        self.assertFalse(janela.atrasada('umidade/1', INICIO - timedelta(days=1)))
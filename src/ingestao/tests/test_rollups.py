@@ -0,0 +1,47 @@
+"""
+Testes para os rollups incrementais de 1 minuto, 1 hora e 1 dia
+"""
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from ingestao.roteador import TipoSensor
+from ingestao.rollups import COMANDO_ROLLUPS, Rollups, gravar_rollups, inicio_periodo
+
+
+class TestRollups(unittest.TestCase):
+    def test_inicio_periodo(self):
+        data_hora = datetime(2024, 5, 1, 10, 37, 42, 500)
+        self.assertEqual(inicio_periodo(data_hora, 60), datetime(2024, 5, 1, 10, 37))
+        self.assertEqual(inicio_periodo(data_hora, 3600), datetime(2024, 5, 1, 10, 0))
+        self.assertEqual(inicio_periodo(data_hora, 86400), datetime(2024, 5, 1))
+
+    def test_acumula_por_sensor_e_periodo(self):
+        rollups = Rollups()
+        rollups.adicionar('ph', 3, datetime(2024, 5, 1, 10, 0, 5), 6.5, False)
+        rollups.adicionar('ph', 3, datetime(2024, 5, 1, 10, 0, 50), 8.0, True)
+        rollups.adicionar('ph', 3, datetime(2024, 5, 1, 10, 1, 10), 5.0, True)
+        linhas = {(linha['duracao_periodo'], linha['inicio_periodo']): linha for linha in rollups.linhas()}
+        self.assertEqual(len(linhas), 4)  # 2 minutos, 1 hora, 1 dia
+        minuto = linhas[(60, datetime(2024, 5, 1, 10, 0))]
+        self.assertEqual((minuto['quantidade'], minuto['soma'], minuto['minimo'], minuto['maximo'], minuto['fora_limite']),
+                         (2, 14.5, 6.5, 8.0, 1))
+        dia = linhas[(86400, datetime(2024, 5, 1))]
+        self.assertEqual((dia['quantidade'], dia['minimo'], dia['fora_limite']), (3, 5.0, 2))
+
+    def test_data_hora_e_limites_do_tipo(self):
+        tipo = TipoSensor('temperatura', 'LEITURA_T', "", 'SENSOR_UMIDADE', 'valor_temperatura',
+                          hora_sem_data=True, limites=(12.0, 36.0))
+        linha = tipo.montar_linha(2, datetime(2024, 5, 1, 10, 30), 40)
+        self.assertEqual(tipo.data_hora_da_linha(linha), datetime(2024, 5, 1, 10, 30))
+        self.assertTrue(tipo.fora_do_limite(40.0))
+        self.assertFalse(tipo.fora_do_limite(20.0))
+
+    def test_conflito_entre_workers_repetido(self):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.getbatcherrors.return_value = [SimpleNamespace(code=1, offset=1, message="ORA-00001")]
+        linhas = [{'id_sensor': 1}, {'id_sensor': 2}]
+        gravar_rollups(conn, linhas)
+        self.assertEqual(cursor.executemany.call_args_list[1].args, (COMANDO_ROLLUPS, [{'id_sensor': 2}]))
@@ -0,0 +1,57 @@
+"""
+Testes para o roteamento das mensagens por tópico e id_sensor
+"""
+import unittest
+from datetime import date, datetime
+
+from ingestao.roteador import Roteador, TipoSensor, topico_corresponde
+
+
+def _tipo(nome, tabela, **kwargs):
+    return TipoSensor(nome, tabela, f"INSERT INTO {tabela}", 'SENSOR_X', 'valor', **kwargs)
+
+
+class TestRoteador(unittest.TestCase):
+    def setUp(self):
+        self.roteador = Roteador()
+        self.umidade = _tipo('umidade', 'LEITURA_SENSOR_UMIDADE')
+        self.nutrientes = _tipo('nutrientes', 'LEITURA_SENSOR_NUTRIENTES')
+        self.roteador.registrar_tipo(self.umidade, ids_sensor=(1,))
+        self.roteador.registrar_tipo(self.nutrientes, topicos=('sensor/potassio', 'sensor/sodio'))
+
+    def test_tipo_pelo_id_e_pelo_topico(self):
+        self.assertIs(self.roteador.tipo('sensor/umidade', 1), self.umidade)
+        self.assertIs(self.roteador.tipo('sensor/potassio', 1), self.nutrientes)
+        self.assertIsNone(self.roteador.tipo('sensor/umidade', 99))
+        self.assertIs(self.roteador.tipo('farm/1/7/esp32-a/umidade', None), self.umidade)
+        self.assertIsNone(self.roteador.tipo('farm/1/7/esp32-a/vento', 1))
+        self.assertEqual(set(self.roteador.comandos()), {'LEITURA_SENSOR_UMIDADE', 'LEITURA_SENSOR_NUTRIENTES'})
+
+    def test_tratadores_exatos_e_por_filtro(self):
+        bomba, qualquer = object(), object()
+        self.roteador.registrar_tratador('sensor/bomba', bomba)
+        self.roteador.registrar_tratador('farm/+/status/#', qualquer)
+        self.assertIs(self.roteador.tratador('sensor/bomba'), bomba)
+        self.assertIs(self.roteador.tratador('farm/1/status/esp32'), qualquer)
+        self.assertIsNone(self.roteador.tratador('sensor/umidade'))
+
+    def test_formato_por_topico(self):
+        self.roteador.registrar_formato('sensor/bin/#', 'binario')
+        self.assertEqual(self.roteador.formato('sensor/bin/umidade'), 'binario')
+        self.assertEqual(self.roteador.formato('sensor/umidade'), 'json')
+
+    def test_topico_corresponde(self):
+        self.assertTrue(topico_corresponde('sensor/+', 'sensor/ph'))
+        self.assertFalse(topico_corresponde('sensor/+', 'sensor/ph/x'))
+        self.assertTrue(topico_corresponde('sensor/#', 'sensor/ph/x'))
+        self.assertFalse(topico_corresponde('sensor/ph', 'sensor'))
+
+    def test_montar_linha(self):
+        linha = self.umidade.montar_linha(1, datetime(2024, 5, 1, 10, 30, 15), "48.567")
+        self.assertEqual(linha, {'id_sensor': 1, 'data_leitura': date(2024, 5, 1),
+                                 'hora_leitura': datetime(2024, 5, 1, 10, 30, 15), 'valor': 48.57})
+        temperatura = _tipo('temperatura', 'T', hora_sem_data=True, extras={'limite_minimo': 12.0})
+        linha = temperatura.montar_linha(2, datetime(2024, 5, 1, 10, 30), 25)
+        self.assertEqual(linha['hora_leitura'], datetime(1900, 1, 1, 10, 30))
+        self.assertEqual(linha['limite_minimo'], 12.0)
+
@@ -0,0 +1,94 @@
+"""
+Testes para o spool local e o reprocessamento pelo escritor em lote
+"""
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import oracledb
+
+from ingestao.escritor import EscritorLotes
+from ingestao.spool import SpoolLocal
+
+COMANDOS = {'LEITURA_A': "INSERT INTO A VALUES (:v, :data, :hora)"}
+
+
+class PoolIntermitente:
+    def __init__(self):
+        self.disponivel = False
+        self.conn = MagicMock()
+        self.conn.cursor.return_value.getbatcherrors.return_value = []
+
+    @contextmanager
+    def conexao(self):
+        yield self.conn if self.disponivel else None
+
+
+def recusar_valor_nulo(comando, linhas, batcherrors=False):
+    if any(linha['v'] is None for linha in linhas):
+        raise oracledb.IntegrityError("ORA-01400: não é possível inserir NULL")
+
+
+class TestSpoolLocal(unittest.TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.spool = SpoolLocal(os.path.join(self.diretorio.name, "spool", "leituras.db"))
+
+    def tearDown(self):
+        self.spool.fechar()
+        self.diretorio.cleanup()
+
+    def test_guardar_e_ler_preserva_tipos(self):
+        linha = {'v': 51.5, 'data': date(2024, 5, 1), 'hora': datetime(2024, 5, 1, 10, 30, 15)}
+        self.spool.guardar({'LEITURA_A': [linha]})
+        ultimo_id, lote = self.spool.ler(10)
+        self.assertEqual(lote, {'LEITURA_A': [linha]})
+        self.spool.confirmar(ultimo_id)
+        self.assertEqual(self.spool.pendentes(), 0)
+
+    def test_escritor_usa_spool_e_reprocessa(self):
+        pool = PoolIntermitente()
+        escritor = EscritorLotes(pool, COMANDOS, spool=self.spool, intervalo_replay=60)
+        lote = {'LEITURA_A': [{'v': 1, 'data': date(2024, 5, 1), 'hora': datetime(2024, 5, 1, 10, 0)}]}
+
+        self.assertFalse(escritor.gravar(lote))
+        self.assertFalse(escritor.gravar(lote))  # vai direto ao spool, sem tentar o banco
+        self.assertEqual(self.spool.pendentes(), 2)
+
+        pool.disponivel = True
+        self.assertEqual(escritor.reprocessar_spool(), 2)
+        self.assertEqual(self.spool.pendentes(), 0)
+        pool.conn.commit.assert_called_once()
+
+    def test_linha_recusada_nao_trava_o_spool(self):
+        pool = PoolIntermitente()
+        pool.conn.cursor.return_value.executemany.side_effect = recusar_valor_nulo
+        escritor = EscritorLotes(pool, COMANDOS, spool=self.spool, intervalo_replay=60)
+        ruim = {'v': None, 'data': date(2024, 5, 1), 'hora': datetime(2024, 5, 1, 10, 0)}
+        boa = {'v': 2, 'data': date(2024, 5, 1), 'hora': datetime(2024, 5, 1, 10, 1)}
+
+        self.assertFalse(escritor.gravar({'LEITURA_A': [ruim, boa]}))  # banco fora do ar
+        self.assertEqual(self.spool.pendentes(), 2)
+
+        pool.disponivel = True
+        escritor.reprocessar_spool()
+        self.assertEqual(self.spool.pendentes(), 0)
+        self.assertEqual(self.spool.rejeitadas(), 1)
+        self.assertEqual(pool.conn.commit.call_count, 1)  # só a linha boa
+
+        self.assertTrue(escritor.gravar({'LEITURA_A': [boa]}))
+        self.assertEqual(self.spool.pendentes(), 0)
+        self.assertEqual(pool.conn.commit.call_count, 2)
+
+    def test_erro_de_conexao_guarda_o_lote(self):
+        pool = PoolIntermitente()
+        pool.disponivel = True
+        pool.conn.cursor.return_value.executemany.side_effect = oracledb.OperationalError("ORA-03113")
+        escritor = EscritorLotes(pool, COMANDOS, spool=self.spool, intervalo_replay=60)
+
+        self.assertFalse(escritor.gravar({'LEITURA_A': [{'v': 1, 'data': None, 'hora': None}]}))
+        self.assertEqual(self.spool.pendentes(), 1)
+        self.assertEqual(self.spool.rejeitadas(), 0)
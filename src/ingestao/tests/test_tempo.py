@@ -0,0 +1,25 @@
+"""
+Testes para a conversão de data/hora das leituras
+"""
+import unittest
+from datetime import date, datetime
+
+from ingestao.tempo import converter_data, converter_data_hora
+
+
+class TestTempo(unittest.TestCase):
+    def test_formatos_do_firmware(self):
+        self.assertEqual(converter_data_hora("2024-05-01", "10:30:15"), datetime(2024, 5, 1, 10, 30, 15))
+        self.assertEqual(converter_data_hora("2024-05-01", "10:30"), datetime(2024, 5, 1, 10, 30))
+
+    def test_equivalente_ao_strptime(self):
+        for hora in ("00:00:00", "23:59:59", "07:05"):
+            esperado = datetime.strptime("2024-05-01 " + (hora if len(hora) == 8 else hora + ":00"), '%Y-%m-%d %H:%M:%S')
+            self.assertEqual(converter_data_hora("2024-05-01", hora), esperado)
+        self.assertEqual(converter_data("2024-12-31"), date(2024, 12, 31))
+
+    def test_valores_invalidos(self):
+        for data, hora in (("2024-5-1", "10:00"), ("2024-05-01", "10h00"),
+                           ("2024-05-01", "24:00:00"), ("2024-02-30", "10:00")):
+            with self.assertRaises(ValueError):
+                converter_data_hora(data, hora)
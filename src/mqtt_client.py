@@ -1,20 +1,53 @@
 import os
+import asyncio
+import signal
+import threading
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+import aiomqtt
 import ssl
 import oracledb
 import json
-from dotenv import load_dotenv
+import math
 from datetime import datetime
+from dotenv import load_dotenv
 import streamlit as st
 from fase5.alerts import AlertSystem
+from ingestao.pool import PoolConexoes
+from ingestao.escritor import EscritorLotes
+from ingestao.registro_sensores import RegistroSensores
+from ingestao.pipeline import PipelineIngestao
+from ingestao.limitador import LimitadorIngestao
+from ingestao.presenca import PresencaDispositivos
+from ingestao.reconexao import EsperaReconexao
+from ingestao.spool import SpoolLocal
+from ingestao.deduplicador import Deduplicador
+from ingestao.reordenacao import JanelaReordenacao
+from ingestao.bomba import ControladoresBomba
+from ingestao.roteador import Roteador, TipoSensor, dispositivo_do_topico
+from ingestao.dispositivos import IndiceDispositivos, id_reservado
+from ingestao.binario import CONTEUDO_BINARIO, FORMATO_BINARIO, decodificar_leituras
+from ingestao.rollups import LIMITES, Rollups, gravar_rollups, gravar_rollups_async
+from ingestao.agregados import (COMANDO_AGREGADOS, TABELA_AGREGADOS, eh_agregado,
+                                montar_linha_agregada, valores_da_janela)
+from ingestao.tempo import converter_data_hora
+from ingestao.logs import configurar_logs
+from ingestao.metricas import (ACIONAMENTOS_BOMBA, FALHAS_PARSE, LEITURAS_ATRASADAS, MENSAGENS, PRESENCA,
+                               PROFUNDIDADE_FILAS, RECONEXOES, SESSOES_POOL, iniciar_servidor)
+from ingestao.grupo import arquivo_do_worker, assinaturas
+from ingestao.escritor_async import EscritorLotesAsync, criar_pool_async
+from ingestao.mqtt_async import Mensagem, PublicadorAsync
+from ingestao import config
 import time
 import logging
 
-# Configurações do HiveMQ Cloud
-mqtt_server = "91c5f1ea0f494ccebe45208ea8ffceff.s1.eu.hivemq.cloud"
-mqtt_port = 8883
-mqtt_user = "FARM_TECH"
-mqtt_password = "Pato1234"
+# Configurações do HiveMQ Cloud (sobrescrevíveis para testar com um broker local, ex.: mosquitto)
+mqtt_server = os.getenv('MQTT_SERVIDOR', "91c5f1ea0f494ccebe45208ea8ffceff.s1.eu.hivemq.cloud")
+mqtt_port = int(os.getenv('MQTT_PORTA', 8883))
+mqtt_user = os.getenv('MQTT_USUARIO', "FARM_TECH")
+mqtt_password = os.getenv('MQTT_SENHA', "Pato1234")
+mqtt_tls = os.getenv('MQTT_TLS', '1') == '1'
 
 # Tópicos MQTT
 humidity_topic = "sensor/umidade"
@@ -24,166 +57,215 @@ ph_sensor = "sensor/ph"
 k_button_topic = "sensor/potassio"
 p_button_topic = "sensor/sodio"
 
+# Tópicos assinados pela ingestão (tópico, QoS)
+TOPICOS_INSCRICAO = [
+    (humidity_topic, 1),  # sensor/umidade - onde o ESP32 está enviando tudo
+    (temperature_topic, 1),
+    (ph_sensor, 1),
+    (pump_topic, 1),
+    (k_button_topic, 1),
+    (p_button_topic, 1),
+    ("sensor/status", 1),
+    ("sensor/+", 1),  # Wildcard para capturar qualquer tópico sensor/*
+    ("farm/+/+/+/+", 1)  # farm/<propriedade>/<campo>/<dispositivo>/<tipo>
+]
+
+# Com vários workers, o broker divide sensor/# entre os processos do grupo; o estado
+# da bomba é assinado por todos para que cada controlador conheça o comando atual
+if config.INGESTAO_GRUPO:
+    TOPICOS_INSCRICAO = assinaturas(config.INGESTAO_GRUPO, ["sensor/#", "farm/#"], [pump_topic, "farm/+/+/+/bomba"])
+
+def arquivo_deste_processo(caminho):
+    """No modo com vários workers, cada processo usa o próprio arquivo"""
+    return arquivo_do_worker(caminho, config.INGESTAO_WORKER) if config.INGESTAO_GRUPO else caminho
+
 # Carrega as variáveis de ambiente para o banco de dados
 load_dotenv()
 db_user = os.getenv('DB_USER') or st.secrets["database"]["user"]
 db_password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"] 
 db_dsn = os.getenv('DB_DSN') or st.secrets["database"]["dsn"]
 
-# Configuração de logging
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+# Configuração de logging: arquivo rotativo e console escritos fora das threads da ingestão
+ouvinte_logs = configurar_logs(arquivo_deste_processo(config.LOG_ARQUIVO))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/mqtt.log'),
-        logging.StreamHandler()  # Também mostra no console
-    ]
-)
+# Pool de sessões compartilhado por todas as mensagens
+pool_conexoes = PoolConexoes(db_user, db_password, db_dsn)
 
-def conectar_banco():
-    try:
-        conn = oracledb.connect(user=db_user, password=db_password, dsn=db_dsn)
-        logging.info("Conectado ao banco de dados Oracle.")
-        return conn
-    except oracledb.DatabaseError as e:
-        logging.error(f"Erro ao conectar ao banco de dados: {e}")
-        return None
+# Tipos de sensor: tabela de leitura, INSERT (binds nomeados), tabela do sensor e conversões
+roteador = Roteador()
+roteador.registrar_tipo(TipoSensor(
+    'umidade', 'LEITURA_SENSOR_UMIDADE', """
+        INSERT INTO LEITURA_SENSOR_UMIDADE 
+        (id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura, recebida_em)
+        VALUES 
+        (LEITURA_SENSOR_UMIDADE_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_umidade, :recebida_em)
+    """,
+    tabela_sensor='SENSOR_UMIDADE', coluna_valor='valor_umidade',
+    unidade='%', icone='💧', aciona_bomba=True, limites=LIMITES['umidade']
+), ids_sensor=(1,))
+roteador.registrar_tipo(TipoSensor(
+    'temperatura', 'LEITURA_SENSOR_TEMPERATURA', """
+        INSERT INTO leitura_sensor_temperatura 
+        (id_sensor_umidade, data_leitura, hora_leitura, valor_temperatura, limite_minimo_temperatura, limite_maximo_temperatura, recebida_em)
+        VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor_temperatura, :limite_minimo, :limite_maximo, :recebida_em)
+    """,
+    # Temperatura referencia o sensor de umidade (mesmo DHT22)
+    tabela_sensor='SENSOR_UMIDADE', coluna_valor='valor_temperatura',
+    unidade='°C', icone='🌡️', hora_sem_data=True,
+    extras={'limite_minimo': LIMITES['temperatura'][0], 'limite_maximo': LIMITES['temperatura'][1]},
+    limites=LIMITES['temperatura']
+), ids_sensor=(2,))
+roteador.registrar_tipo(TipoSensor(
+    'ph', 'LEITURA_SENSOR_PH', """
+        INSERT INTO LEITURA_SENSOR_PH 
+        (id_leitura_ph, id_sensor_ph, data_leitura, hora_leitura, valor_ph_leitura, recebida_em)
+        VALUES 
+        (LEITURA_SENSOR_PH_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_ph, :recebida_em)
+    """,
+    tabela_sensor='SENSOR_PH', coluna_valor='valor_ph', icone='🧪', limites=LIMITES['ph']
+), ids_sensor=(3,))
+roteador.registrar_tipo(TipoSensor(
+    'nutrientes', 'LEITURA_SENSOR_NUTRIENTES', """
+        INSERT INTO LEITURA_SENSOR_NUTRIENTES 
+        (id_leitura_nutrientes, id_sensor_nutrientes, data_leitura, hora_leitura, valor_nutrientes_leitura, recebida_em)
+        VALUES 
+        (LEITURA_SENSOR_NUTRIENTES_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_nutrientes, :recebida_em)
+    """,
+    # Botões K (id_sensor 4) e P (id_sensor 5): o tópico identifica o tipo, o id_sensor o nutriente
+    tabela_sensor='SENSOR_NUTRIENTES', coluna_valor='valor_nutrientes', icone='🌱'
+), ids_sensor=(4, 5), topicos=(k_button_topic, p_button_topic))
 
-def verificar_ou_inserir_sensor_umidade(conn, id_sensor):
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sensor_umidade WHERE id_sensor_umidade = :id_sensor", {'id_sensor': id_sensor})
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO sensor_umidade (id_sensor_umidade) VALUES (:id_sensor)", {'id_sensor': id_sensor})
-        conn.commit()
-        logging.info(f"Sensor de umidade {id_sensor} inserido com sucesso.")
-    cursor.close()
-
-def verificar_ou_inserir_sensor_ph(conn, id_sensor):
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sensor_ph WHERE id_sensor_ph = :id_sensor", {'id_sensor': id_sensor})
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO sensor_ph (id_sensor_ph) VALUES (:id_sensor)", {'id_sensor': id_sensor})
-        conn.commit()
-        logging.info(f"Sensor de pH {id_sensor} inserido com sucesso.")
-    cursor.close()
-
-def inserir_leitura_umidade(conn, id_sensor, data_leitura, hora_leitura, valor_umidade):
-    verificar_ou_inserir_sensor_umidade(conn, id_sensor)
-    cursor = conn.cursor()
-    try:
-        # Tenta primeiro com formato HH:MM:SS, depois HH:MM
-        try:
-            data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}:00", '%Y-%m-%d %H:%M:%S')
-        
-        umidade_formatada = round(float(valor_umidade), 2)
-
-        cursor.execute("""
-            INSERT INTO LEITURA_SENSOR_UMIDADE 
-            (id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura)
-            VALUES 
-            (LEITURA_SENSOR_UMIDADE_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_umidade)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_hora_leitura.date(),
-            'hora_leitura': data_hora_leitura,
-            'valor_umidade': umidade_formatada
-        })
-        conn.commit()
-        logging.info(f"✅ Leitura de umidade inserida: {umidade_formatada}%")
-    except Exception as e:
-        logging.error(f"Erro ao inserir dados de umidade: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+# Comandos de inserção usados pelo escritor em lote; os resumos de janela de todos os tipos têm tabela própria
+COMANDOS_INSERCAO = {**roteador.comandos(), TABELA_AGREGADOS: COMANDO_AGREGADOS}
 
-def inserir_leitura_ph(conn, id_sensor, data_leitura, hora_leitura, ph_equivalente):
-    verificar_ou_inserir_sensor_ph(conn, id_sensor)
-    cursor = conn.cursor()
-    try:
-        # Tenta primeiro com formato HH:MM:SS, depois HH:MM
-        try:
-            data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}:00", '%Y-%m-%d %H:%M:%S')
-        
-        ph_formatado = round(float(ph_equivalente), 2)
-
-        cursor.execute("""
-            INSERT INTO LEITURA_SENSOR_PH 
-            (id_leitura_ph, id_sensor_ph, data_leitura, hora_leitura, valor_ph_leitura)
-            VALUES 
-            (LEITURA_SENSOR_PH_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_ph)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_hora_leitura.date(),
-            'hora_leitura': data_hora_leitura,
-            'valor_ph': ph_formatado
-        })
-        conn.commit()
-        logging.info(f"✅ Leitura de pH inserida: {ph_formatado}")
-    except Exception as e:
-        logging.error(f"Erro ao inserir dados de pH: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+# Sensores já cadastrados, para não consultar as tabelas de sensores a cada leitura
+registro_sensores = RegistroSensores()
 
-def inserir_leitura_temperatura(conn, id_sensor, data_leitura, hora_leitura, temperatura):
-    verificar_ou_inserir_sensor_umidade(conn, id_sensor)
-    cursor = conn.cursor()
-    try:
-        data_leitura_formatada = datetime.strptime(data_leitura, '%Y-%m-%d').date()
-        
-        # Tenta primeiro com formato HH:MM:SS, depois HH:MM
+# Dispositivos dos tópicos farm/... -> sensor e campo, sem consulta por mensagem
+indice_dispositivos = IndiceDispositivos()
+
+def grupos_do_lote(tabela, linhas):
+    """Linhas do lote por tabela de sensor; o lote de LEITURA_AGREGADA mistura tipos"""
+    if tabela != TABELA_AGREGADOS:
+        return {roteador.tipo_da_tabela(tabela).tabela_sensor: linhas}
+    grupos = {}
+    for linha in linhas:
+        tabela_sensor = roteador.tipo_do_nome(linha['tipo_sensor']).tabela_sensor
+        grupos.setdefault(tabela_sensor, []).append(linha)
+    return grupos
+
+def verificar_sensores_do_lote(conn, tabela, linhas):
+    """Resolve os dispositivos do lote e cadastra os sensores que ainda não estão no registro"""
+    grupos = grupos_do_lote(tabela, linhas)
+    for tabela_sensor, grupo in grupos.items():
+        indice_dispositivos.resolver(conn, tabela_sensor, grupo)
+        registro_sensores.garantir(conn, tabela_sensor, (linha['id_sensor'] for linha in grupo))
+    if tabela == TABELA_AGREGADOS:
+        # resolver descarta linhas do próprio grupo; o lote precisa refletir isso
+        linhas[:] = [linha for grupo in grupos.values() for linha in grupo]
+
+async def verificar_sensores_do_lote_async(conn, tabela, linhas):
+    """Versão de ``verificar_sensores_do_lote`` para o modo asyncio"""
+    grupos = grupos_do_lote(tabela, linhas)
+    for tabela_sensor, grupo in grupos.items():
+        await indice_dispositivos.resolver_async(conn, tabela_sensor, grupo)
+        await registro_sensores.garantir_async(conn, tabela_sensor, (linha['id_sensor'] for linha in grupo))
+    if tabela == TABELA_AGREGADOS:
+        linhas[:] = [linha for grupo in grupos.values() for linha in grupo]
+
+def rollups_do_lote(gravadas):
+    """Incrementos de 1 min, 1 h e 1 dia das leituras que o banco aceitou no lote"""
+    rollups = Rollups()
+    for tabela, linhas in gravadas.items():
+        if tabela == TABELA_AGREGADOS:
+            continue  # resumos de janela não trazem as leituras fora do limite
+        tipo = roteador.tipo_da_tabela(tabela)
+        for linha in linhas:
+            valor = linha[tipo.coluna_valor]
+            rollups.adicionar(tipo.nome, linha['id_sensor'], tipo.data_hora_da_linha(linha),
+                              valor, tipo.fora_do_limite(valor))
+    return rollups.linhas()
+
+def atualizar_rollups(conn, gravadas):
+    """MERGE dos rollups na mesma transação do lote: um lote reprocessado do spool não conta duas vezes"""
+    gravar_rollups(conn, rollups_do_lote(gravadas))
+
+async def atualizar_rollups_async(conn, gravadas):
+    """Versão de ``atualizar_rollups`` para o modo asyncio"""
+    await gravar_rollups_async(conn, rollups_do_lote(gravadas))
+
+# Estado das bombas, com histerese e permanência mínima
+controladores_bomba = ControladoresBomba()
+
+# Último contato de cada sensor e dispositivo, para avisar quando um deles fica em silêncio
+presenca = PresencaDispositivos()
+
+# Janela de leituras recentes para descartar repetições antes do banco
+deduplicador = Deduplicador()
+janela_reordenacao = JanelaReordenacao()
+
+# Leituras que o banco não aceitar ficam no disco até serem reprocessadas
+spool = SpoolLocal(arquivo_deste_processo(config.SPOOL_CAMINHO))
+
+escritor = EscritorLotes(pool_conexoes, COMANDOS_INSERCAO, antes_de_gravar=verificar_sensores_do_lote,
+                         depois_de_inserir=atualizar_rollups, spool=spool)
+
+# Espera antes de cada nova tentativa de conexão, compartilhada pelos modos paho e asyncio
+espera_reconexao = EsperaReconexao()
+
+# Client id fixo: é por ele que o broker reencontra a sessão persistente após um reinício
+client_id = f"{config.MQTT_CLIENT_ID}_{config.INGESTAO_WORKER}"
+
+def opcoes_de_sessao():
+    """clean_start e propriedades do CONNECT no MQTT v5 (grupo de workers); o v3.1.1 usa clean_session"""
+    if not config.INGESTAO_GRUPO:
+        return {}
+    propriedades = Properties(PacketTypes.CONNECT)
+    propriedades.ReceiveMaximum = config.MQTT_INFLIGHT
+    if config.MQTT_SESSAO_PERSISTENTE:
+        propriedades.SessionExpiryInterval = config.MQTT_SESSAO_EXPIRACAO
+    return {'clean_start': not config.MQTT_SESSAO_PERSISTENTE, 'properties': propriedades}
+
+# Marcado pelo on_disconnect: a thread de rede do paho, sem reconexão própria, termina com a conexão
+conexao_perdida = threading.Event()
+
+def manter_conexao(client, parada):
+    """
+    Conecta ao broker e reconecta após cada queda até ``parada``.
+
+    O cliente é criado com ``reconnect_on_failure=False``: o paho não tem
+    jitter e dobraria a própria espera, então é este laço que espera
+    ``espera_reconexao.proxima()`` (backoff com jitter) entre as tentativas.
+    A thread de rede (``loop_start``) só roda enquanto a conexão está aberta
+    e segue viva na parada, para o ``encerrar_ingestao``.
+    """
+    while not parada.is_set():
+        conexao_perdida.clear()
         try:
-            hora_leitura_formatada = datetime.strptime(hora_leitura, '%H:%M:%S')
-        except ValueError:
-            hora_leitura_formatada = datetime.strptime(f"{hora_leitura}:00", '%H:%M:%S')
-        
-        temperatura_formatada = round(float(temperatura), 2)
-
-        cursor.execute("""
-            INSERT INTO leitura_sensor_temperatura 
-            (id_sensor_umidade, data_leitura, hora_leitura, valor_temperatura, limite_minimo_temperatura, limite_maximo_temperatura)
-            VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor_temperatura, :limite_minimo, :limite_maximo)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_leitura_formatada,
-            'hora_leitura': hora_leitura_formatada,
-            'valor_temperatura': temperatura_formatada,
-            'limite_minimo': 12.00,
-            'limite_maximo': 36.00
-        })
-        conn.commit()
-        logging.info(f"✅ Leitura de temperatura inserida: {temperatura_formatada}°C")
-    except Exception as e:
-        logging.error(f"Erro ao inserir dados de temperatura: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+            client.reconnect()
+        except OSError as e:
+            logging.warning(f"⚠️ Não foi possível conectar ao broker {mqtt_server}:{mqtt_port}: {e}")
+        else:
+            client.loop_start()
+            while not parada.is_set() and not conexao_perdida.wait(1):
+                pass
+            if parada.is_set():
+                return
+            client.loop_stop()
+        espera = espera_reconexao.proxima()
+        logging.info(f"🔁 Nova tentativa de conexão em {espera:.1f}s")
+        parada.wait(espera)
 
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
+def on_connect(client, userdata, flags, rc, properties=None):
+    if not rc.is_failure:
+        espera_reconexao.reiniciar()
         print("🟢 CONECTADO AO BROKER MQTT COM SUCESSO!")
         logging.info("🟢 Conectado ao broker MQTT com sucesso!")
+        if flags.session_present:
+            logging.info("📥 Sessão persistente retomada: o broker entrega as mensagens pendentes")
         
         # Inscreve em todos os tópicos
-        topics = [
-            (humidity_topic, 1),  # sensor/umidade - onde o ESP32 está enviando tudo
-            (temperature_topic, 1),
-            (ph_sensor, 1),
-            (pump_topic, 1),
-            (k_button_topic, 1),
-            (p_button_topic, 1),
-            ("sensor/status", 1),
-            ("sensor/+", 1)  # Wildcard para capturar qualquer tópico sensor/*
-        ]
-        
-        for topic, qos in topics:
+        for topic, qos in TOPICOS_INSCRICAO:
             result = client.subscribe(topic, qos)
             print(f"📡 INSCRITO NO TÓPICO: {topic} (QoS: {qos})")
             logging.info(f"📡 Inscrito no tópico: {topic} (QoS: {qos}) - Resultado: {result}")
@@ -194,106 +276,347 @@ def on_connect(client, userdata, flags, rc):
         print(f"❌ FALHA NA CONEXÃO MQTT. CÓDIGO: {rc}")
         logging.error(f"❌ Falha na conexão MQTT. Código: {rc}")
 
-def on_message(client, userdata, msg):
+def tratar_bomba(client, topic, payload_str):
+    """Estado retido no broker ou comando manual do dashboard (texto, não JSON)"""
+    logging.info("💧 Comando da bomba: %s", payload_str)
+    controladores_bomba.obter(topic).sincronizar(payload_str)
+
+def tratar_status(client, topic, payload_str):
+    """Mensagem de status (LWT) do dispositivo: atualiza a presença"""
+    try:
+        payload = json.loads(payload_str)
+        status = payload['status']
+    except (ValueError, TypeError, KeyError):
+        FALHAS_PARSE.inc(topic)
+        logging.warning("⚠️ Status inválido: %s (tópico %s)", payload_str, topic)
+        return
+    # No esquema farm/ o dispositivo vem do tópico; em sensor/status, do campo "device" do firmware
+    dispositivo = dispositivo_do_topico(topic) or payload.get('device', topic)
+    presenca.registrar_status(dispositivo, status)
+
+# Tópicos com tratamento próprio; os demais são leituras de sensores
+roteador.registrar_tratador(pump_topic, tratar_bomba)
+roteador.registrar_tratador("sensor/status", tratar_status)
+roteador.registrar_tratador("farm/+/+/+/bomba", tratar_bomba)
+roteador.registrar_tratador("farm/+/+/+/status", tratar_status)
+
+# Tópicos cujos payloads usam o formato binário compacto em vez de JSON
+for filtro in config.PAYLOAD_BINARIO_TOPICOS:
+    roteador.registrar_formato(filtro, FORMATO_BINARIO)
+
+def id_sensor_valido(id_sensor):
+    """id_sensor de um tópico sensor/: inteiro positivo (os tópicos farm/ o resolvem pelo dispositivo)"""
+    return isinstance(id_sensor, int) and not isinstance(id_sensor, bool) and id_sensor > 0
+
+def registrar_leituras(client, topic, escritor, leituras, dispositivo=None, recebida_em=None):
+    """
+    Descarta repetições e enfileira as leituras (id_sensor, data_hora, valor) da mensagem.
+
+    As linhas de cada tabela entram juntas no escritor e seguem no mesmo
+    lote, com o instante de recebimento ao lado do horário do dispositivo.
+    A bomba é avaliada só com a leitura mais recente de cada tipo, e só se
+    ela estiver dentro da janela de reordenação (LEITURA_ATRASO_MAXIMO),
+    medida contra a leitura mais recente do mesmo sensor no relógio do
+    dispositivo: um backfill de leituras antigas é gravado mas não aciona
+    comandos.
+    """
+    recebida_em = datetime.now() if recebida_em is None else recebida_em
+    por_tabela = {}
+    chaves = {}  # tipo -> chaves do deduplicador, marcadas só depois de entregues ao escritor
+    mais_recente = {}
+    for id_sensor, data_hora, valor in leituras:
+        # Mensagens retidas e reentregas de QoS1 chegam repetidas
+        chave = ('leitura', topic, id_sensor, data_hora, valor)
+        if deduplicador.vista(chave) or any(chave in vistas for vistas in chaves.values()):
+            logging.info("🔁 Leitura repetida descartada: sensor %s em %s", id_sensor, data_hora, extra={'topico': topic})
+            continue
+
+        if dispositivo is None and not id_sensor_valido(id_sensor):
+            # Sem dispositivo o id_sensor do payload vai direto para o banco (e para o registro de sensores)
+            logging.warning("⚠️ ID sensor inválido: %r (tópico %s)", id_sensor, topic)
+            continue
+        if dispositivo is None and id_reservado(id_sensor):
+            logging.warning("⚠️ ID sensor %s é da faixa dos dispositivos farm/ (tópico %s)", id_sensor, topic)
+            continue
+
+        # O tipo vem do tópico, quando ele identifica o sensor, ou do id_sensor do payload
+        tipo = roteador.tipo(topic, id_sensor)
+        if tipo is None:
+            logging.warning("⚠️ ID sensor desconhecido: %s (tópico %s)", id_sensor, topic)
+            continue
+
+        linha = tipo.montar_linha(id_sensor, data_hora, valor)
+        linha['recebida_em'] = recebida_em
+        if dispositivo is not None:
+            presenca.visto(f"{dispositivo}/{tipo.nome}", dispositivo=dispositivo)
+        else:
+            presenca.visto(f"{tipo.nome}/{id_sensor}")
+        if dispositivo is not None:
+            # O id_sensor é resolvido pelo índice de dispositivos na gravação do lote
+            linha['dispositivo'] = dispositivo
+        por_tabela.setdefault(tipo, []).append(linha)
+        chaves.setdefault(tipo, set()).add(chave)
+        if janela_reordenacao.atrasada((dispositivo or topic, tipo.nome, id_sensor), data_hora):
+            # Fora da janela: os rollups usam o horário do dispositivo, então o período original é corrigido
+            LEITURAS_ATRASADAS.inc(tipo.nome)
+            continue
+        if tipo.aciona_bomba and (tipo not in mais_recente or data_hora >= mais_recente[tipo][0]):
+            mais_recente[tipo] = (data_hora, valor)
+
+    for tipo, linhas in por_tabela.items():
+        escritor.adicionar_varias(tipo.tabela, linhas)
+        deduplicador.registrar(chaves[tipo])
+        # Rotineiro: amostrado por tópico (LOG_AMOSTRAGEM)
+        logging.info("%s %s leitura(s) de %s enfileirada(s)", tipo.icone, len(linhas), tipo.nome,
+                     extra={'topico': topic})
+
+    for tipo, (data_hora, valor) in mais_recente.items():
+        # Controle da bomba: publica apenas quando o estado muda; no esquema farm/ cada dispositivo tem a sua
+        topico_bomba = pump_topic if dispositivo is None else f"farm/{dispositivo}/bomba"
+        comando = controladores_bomba.obter(topico_bomba).avaliar(float(valor), data_hora=data_hora)
+        if comando is not None:
+            client.publish(topico_bomba, comando, qos=1, retain=True)
+            ACIONAMENTOS_BOMBA.inc(comando)
+
+def registrar_agregados(topic, escritor, agregados, dispositivo=None, recebida_em=None):
+    """
+    Descarta repetições e enfileira os resumos de janela da mensagem em LEITURA_AGREGADA.
+
+    Resumos não acionam a bomba: só descrevem janelas já encerradas.
+    """
+    recebida_em = datetime.now() if recebida_em is None else recebida_em
+    linhas = []
+    chaves = set()
+    for agregado in agregados:
+        id_sensor, inicio, duracao = agregado[:3]
+        # Marcada como resumo: (início, duração) não pode colidir com (data_hora, valor) de uma leitura
+        chave = ('agregado', topic, id_sensor, inicio, duracao)
+        if deduplicador.vista(chave) or chave in chaves:
+            logging.info("🔁 Resumo repetido descartado: sensor %s em %s", id_sensor, inicio, extra={'topico': topic})
+            continue
+
+        if dispositivo is None and not id_sensor_valido(id_sensor):
+            # Sem dispositivo o id_sensor do payload vai direto para o banco (e para o registro de sensores)
+            logging.warning("⚠️ ID sensor inválido: %r (tópico %s)", id_sensor, topic)
+            continue
+        if dispositivo is None and id_reservado(id_sensor):
+            logging.warning("⚠️ ID sensor %s é da faixa dos dispositivos farm/ (tópico %s)", id_sensor, topic)
+            continue
+
+        tipo = roteador.tipo(topic, id_sensor)
+        if tipo is None:
+            logging.warning("⚠️ ID sensor desconhecido: %s (tópico %s)", id_sensor, topic)
+            continue
+
+        linha = montar_linha_agregada(tipo.nome, agregado)
+        linha['recebida_em'] = recebida_em
+        if dispositivo is not None:
+            linha['dispositivo'] = dispositivo
+        linhas.append(linha)
+        chaves.add(chave)
+
+    if linhas:
+        escritor.adicionar_varias(TABELA_AGREGADOS, linhas)
+        deduplicador.registrar(chaves)
+        logging.info("📈 %s resumo(s) de janela enfileirado(s)", len(linhas), extra={'topico': topic})
+
+def leituras_do_json(payload):
+    """
+    Leituras (id_sensor, data_hora, valor) e resumos de janela de um payload JSON.
+
+    Aceita uma leitura no formato do firmware, uma lista de leituras ou um
+    envelope ``{"readings": [...]}`` cujos demais campos (ex.: id_sensor)
+    valem para todas as leituras da lista. Itens com ``janela`` são resumos
+    calculados no dispositivo (ver ``ingestao.agregados``) e voltam na
+    segunda lista.
+    """
+    if isinstance(payload, list):
+        itens, comuns = payload, None
+    elif not isinstance(payload, dict):
+        return [], []
+    elif "readings" in payload:
+        itens = payload.pop("readings")
+        comuns = payload
+    else:
+        itens, comuns = (payload,), None
+
+    leituras = []
+    agregados = []
+    for item in itens:
+        if not isinstance(item, dict):
+            continue
+        if comuns:
+            item = {**comuns, **item}
+        id_sensor = item.get("id_sensor")
+        data_leitura = item.get("data_leitura")
+        hora_leitura = item.get("hora_leitura")
+        if not all([data_leitura, hora_leitura]):
+            continue
+        try:
+            if eh_agregado(item):
+                janela = valores_da_janela(item)
+                if janela is not None:
+                    agregados.append((id_sensor, converter_data_hora(data_leitura, hora_leitura)) + janela)
+                continue
+            valor = item.get("Valor")
+            if valor is None or valor == "":
+                continue  # zero é leitura válida (ex.: botão de nutriente solto)
+            # Convertido aqui, item a item: um valor inválido não derruba as demais leituras da mensagem
+            valor = float(valor)
+            if not math.isfinite(valor):
+                raise ValueError(f"valor não finito: {item.get('Valor')!r}")
+            leituras.append((id_sensor, converter_data_hora(data_leitura, hora_leitura), valor))
+        except (TypeError, ValueError) as e:
+            logging.warning("⚠️ Leitura ignorada: %s", e)
+    return leituras, agregados
+
+def formato_da_mensagem(topic, msg):
+    """Binário quando o Content-Type (MQTT v5) pede ou quando o tópico está em PAYLOAD_BINARIO_TOPICOS"""
+    propriedades = getattr(msg, 'properties', None)
+    if getattr(propriedades, 'ContentType', None) == CONTEUDO_BINARIO:
+        return FORMATO_BINARIO
+    return roteador.formato(topic)
+
+def processar_mensagem(client, msg, escritor=escritor, recebida_em=None):
+    """Faz o parse da mensagem e encaminha a leitura ao escritor em lote"""
+    recebida_em = datetime.now() if recebida_em is None else recebida_em
     try:
         topic = msg.topic
-        payload_str = msg.payload.decode()
         
-        # CONSOLE LOG DESTACADO
-        print("=" * 60)
-        print(f"🚨 MENSAGEM MQTT RECEBIDA!")
-        print(f"📍 TÓPICO: {topic}")
-        print(f"📦 PAYLOAD: {payload_str}")
-        print("=" * 60)
+        # Cada mensagem só aparece no log em DEBUG (LOG_NIVEL=DEBUG); a formatação fica para a thread do log
+        logging.debug("📨 Mensagem recebida no tópico '%s': %s", topic, msg.payload)
         
-        logging.info(f"📨 Mensagem recebida no tópico '{topic}': {payload_str}")
-        
-        # Trata mensagens da bomba que não são JSON
-        if topic == pump_topic:
-            print(f"💧 COMANDO DA BOMBA: {payload_str}")
-            logging.info(f"💧 Comando da bomba: {payload_str}")
+        tratador = roteador.tratador(topic)
+        if tratador is not None:
+            tratador(client, topic, msg.payload.decode())
             return
         
-        # Tenta fazer parse do JSON apenas para outros tópicos
-        try:
-            payload = json.loads(payload_str)
-        except json.JSONDecodeError:
-            print(f"⚠️ PAYLOAD NÃO É JSON VÁLIDO: {payload_str}")
-            logging.warning(f"⚠️ Payload não é JSON válido: {payload_str}")
-            return
+        # No esquema farm/ o dispositivo vem do tópico; nos tópicos sensor/ o payload traz o id_sensor
+        dispositivo = dispositivo_do_topico(topic)
         
-        # Verifica se é uma mensagem de status
-        if topic == "sensor/status":
-            print(f"📊 STATUS DO DISPOSITIVO: {payload['status']}")
-            logging.info(f"📊 Status do dispositivo: {payload['status']}")
-            return
-            
-        conn = conectar_banco()
-        if conn:
+        agregados = ()
+        if formato_da_mensagem(topic, msg) == FORMATO_BINARIO:
             try:
-                # Processa baseado no ID do sensor, não no tópico
-                id_sensor = payload.get("id_sensor")
-                data_leitura = payload.get("data_leitura")
-                hora_leitura = payload.get("hora_leitura")
-                valor = payload.get("Valor")
-
-                if all([id_sensor, data_leitura, hora_leitura, valor]):
-                    # ID 1 = Umidade
-                    if id_sensor == 1:
-                        print(f"💧 PROCESSANDO UMIDADE: {valor}%")
-                        inserir_leitura_umidade(conn, id_sensor, data_leitura, hora_leitura, valor)
-                        
-                        # Controle da bomba
-                        umidade_float = float(valor)
-                        if umidade_float > 50:
-                            client.publish(pump_topic, "OFF", qos=1, retain=True)
-                            print("💧 BOMBA DESLIGADA - Umidade alta")
-                            logging.info("💧 Bomba DESLIGADA - Umidade alta")
-                        else:
-                            client.publish(pump_topic, "ON", qos=1, retain=True)
-                            print("💧 BOMBA LIGADA - Umidade baixa")
-                            logging.info("💧 Bomba LIGADA - Umidade baixa")
-                    
-                    # ID 2 = Temperatura
-                    elif id_sensor == 2:
-                        print(f"🌡️ PROCESSANDO TEMPERATURA: {valor}°C")
-                        inserir_leitura_temperatura(conn, id_sensor, data_leitura, hora_leitura, valor)
-                    
-                    # ID 3 = pH
-                    elif id_sensor == 3:
-                        print(f"🧪 PROCESSANDO PH: {valor}")
-                        inserir_leitura_ph(conn, id_sensor, data_leitura, hora_leitura, valor)
-                    
-                    else:
-                        print(f"⚠️ ID SENSOR DESCONHECIDO: {id_sensor}")
-                        logging.warning(f"⚠️ ID sensor desconhecido: {id_sensor}")
-
-            finally:
-                conn.close()
+                leituras = decodificar_leituras(msg.payload)
+            except ValueError as e:
+                FALHAS_PARSE.inc(topic)
+                logging.warning("⚠️ %s (tópico %s)", e, topic)
+                return
+        else:
+            try:
+                payload = json.loads(msg.payload)
+            except json.JSONDecodeError:
+                FALHAS_PARSE.inc(topic)
+                logging.warning("⚠️ Payload não é JSON válido: %s", msg.payload)
+                return
+            leituras, agregados = leituras_do_json(payload)
+        
+        registrar_leituras(client, topic, escritor, leituras, dispositivo, recebida_em)
+        if agregados:
+            registrar_agregados(topic, escritor, agregados, dispositivo, recebida_em)
                 
     except Exception as e:
-        print(f"❌ ERRO AO PROCESSAR MENSAGEM: {e}")
-        logging.error(f"❌ Erro ao processar mensagem MQTT: {e}")
-        if 'conn' in locals():
-            conn.close()
+        logging.error("❌ Erro ao processar mensagem MQTT: %s", e)
 
-def on_disconnect(client, userdata, rc):
-    if rc != 0:
+# Parse e persistência rodam fora da thread de rede do paho
+pipeline = PipelineIngestao(processar_mensagem)
+
+# Limite por tópico aplicado no callback, antes da fila e do parse
+limitador = LimitadorIngestao()
+
+# Medidores lidos só quando o endpoint de métricas é consultado
+PRESENCA.acompanhar(presenca.ativas, 'ativos')
+PRESENCA.acompanhar(lambda: len(presenca.silenciosas()), 'silenciosos')
+PROFUNDIDADE_FILAS.acompanhar(pipeline.profundidade, 'pipeline')
+PROFUNDIDADE_FILAS.acompanhar(escritor.pendentes, 'escritor')
+PROFUNDIDADE_FILAS.acompanhar(ouvinte_logs.queue.qsize, 'logs')
+for estado in ('ocupadas', 'abertas', 'maximo'):
+    SESSOES_POOL.acompanhar(lambda estado=estado: pool_conexoes.sessoes()[estado], estado)
+
+def iniciar_metricas():
+    """Sobe o endpoint de métricas (METRICAS_PORTA + número do worker); None se desligado ou indisponível"""
+    if not config.METRICAS_PORTA:
+        return None
+    try:
+        return iniciar_servidor(config.METRICAS_PORTA + config.INGESTAO_WORKER, config.METRICAS_ENDERECO)
+    except OSError as e:
+        logging.warning(f"⚠️ Endpoint de métricas não iniciado: {e}")
+        return None
+
+def on_message(client, userdata, msg):
+    # Apenas enfileira: o loop do paho fica livre para keepalive e ACKs de QoS1.
+    # O instante de recebimento é marcado aqui, antes da espera na fila do pipeline
+    recebida_em = datetime.now()
+    # Contada antes do limitador: as mensagens descartadas por ele também foram recebidas
+    MENSAGENS.inc(msg.topic)
+    if limitador.permitir(msg.topic, msg.topic, client, msg, escritor, recebida_em):
+        pipeline.enfileirar(msg.topic, client, msg, escritor, recebida_em)
+
+def on_disconnect(client, userdata, flags, rc, properties=None):
+    if rc.is_failure:
+        RECONEXOES.inc()
         print(f"⚠️ DESCONECTADO INESPERADAMENTE! CÓDIGO: {rc}")
         logging.warning(f"⚠️ Desconectado inesperadamente do broker. Código: {rc}")
     else:
         print("🔴 DESCONECTADO DO BROKER MQTT")
         logging.info("🔴 Desconectado do broker MQTT")
+    conexao_perdida.set()
+
+def sinais_de_parada(parar):
+    """SIGTERM (run.py, systemd, docker) e SIGINT (Ctrl+C) pedem o encerramento ordenado"""
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *args: parar())
+
+def encerrar_ingestao(client, prazo=config.ENCERRAMENTO_PRAZO):
+    """
+    Encerramento ordenado dentro de ``prazo`` segundos.
+
+    Para o broker parar de entregar, esvazia as filas do pipeline e grava os
+    lotes pendentes com commit. Com sessão persistente (MQTT_SESSAO_PERSISTENTE)
+    a ingestão desconecta primeiro: as assinaturas ficam na sessão e o broker
+    guarda o que chegar até o próximo início; comandos da bomba gerados no
+    esvaziamento não são publicados, mas o estado retido e a próxima leitura
+    os refazem. Sem sessão persistente, as assinaturas são canceladas e a
+    desconexão fica para o fim, com os comandos já publicados. O que o banco
+    não gravar dentro do prazo vai para o spool.
+    """
+    limite = time.monotonic() + prazo
+    restante = lambda: max(0.0, limite - time.monotonic())
+    logging.info(f"🛑 Encerrando a ingestão (prazo de {prazo:.0f}s)...")
+    
+    if config.MQTT_SESSAO_PERSISTENTE:
+        client.disconnect()
+    elif client.is_connected():
+        cancelado = threading.Event()
+        client.on_unsubscribe = lambda *args: cancelado.set()
+        client.unsubscribe([topico for topico, _ in TOPICOS_INSCRICAO])
+        cancelado.wait(min(5.0, restante()))
+    
+    # A última mensagem retida de cada tópico limitado ainda é processada
+    for args in limitador.encerrar():
+        pipeline.enfileirar(*args)
+    pipeline.encerrar(restante())
+    escritor.encerrar(restante())
+    if not config.MQTT_SESSAO_PERSISTENTE:
+        client.disconnect()
+    client.loop_stop()
+    logging.info(f"✅ Ingestão encerrada em {prazo - restante():.1f}s.")
 
 def main():
     print("🚀 INICIANDO CLIENTE MQTT...")
     logging.info("🚀 Iniciando cliente MQTT...")
+    if config.INGESTAO_GRUPO:
+        logging.info("👥 Worker %s do grupo compartilhado '%s'", config.INGESTAO_WORKER, config.INGESTAO_GRUPO)
     
-    # Configuração do cliente MQTT
-    client = mqtt.Client(
-        client_id=f"FarmTech_Client_{int(time.time())}",
-        clean_session=True
-    )
+    # Configuração do cliente MQTT; assinatura compartilhada exige MQTT v5
+    if config.INGESTAO_GRUPO:
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, protocol=mqtt.MQTTv5,
+                             reconnect_on_failure=False)
+    else:
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id,
+                             clean_session=not config.MQTT_SESSAO_PERSISTENTE, reconnect_on_failure=False)
+    client.max_inflight_messages_set(config.MQTT_INFLIGHT)
+    client.max_queued_messages_set(config.MQTT_FILA_MAXIMA)
     
     client.username_pw_set(mqtt_user, mqtt_password)
     client.on_connect = on_connect
@@ -301,25 +624,184 @@ def main():
     client.on_disconnect = on_disconnect
     
     # Configuração TLS
-    client.tls_set(cert_reqs=ssl.CERT_NONE, tls_version=ssl.PROTOCOL_TLSv1_2)
-    client.tls_insecure_set(True)
+    if mqtt_tls:
+        client.tls_set(cert_reqs=ssl.CERT_NONE, tls_version=ssl.PROTOCOL_TLSv1_2)
+        client.tls_insecure_set(True)
     
+    servidor_metricas = iniciar_metricas()
+    parada = threading.Event()
+    sinais_de_parada(parada.set)
     try:
+        with pool_conexoes.conexao() as conn:
+            if conn:
+                registro_sensores.carregar(conn)
+                indice_dispositivos.carregar(conn)
+        
+        escritor.iniciar()
+        pipeline.iniciar()
+        limitador.iniciar(pipeline.enfileirar)
+        presenca.iniciar()
+        
         print(f"🔗 CONECTANDO AO BROKER {mqtt_server}:{mqtt_port}...")
         logging.info(f"🔗 Conectando ao broker {mqtt_server}:{mqtt_port}...")
-        client.connect(mqtt_server, mqtt_port, keepalive=60)
+        # Só guarda servidor e opções da sessão; as tentativas (com backoff) ficam com manter_conexao
+        client.connect_async(mqtt_server, mqtt_port, keepalive=60, **opcoes_de_sessao())
         
-        # Inicia o loop
-        client.loop_forever()
+        # A rede roda na thread do paho; a principal cuida das reconexões e atende os sinais de parada
+        manter_conexao(client, parada)
+        print("🛑 CLIENTE MQTT ENCERRANDO...")
         
-    except KeyboardInterrupt:
-        print("🛑 CLIENTE MQTT ENCERRADO PELO USUÁRIO")
-        logging.info("🛑 Cliente MQTT encerrado pelo usuário")
-        client.disconnect()
     except Exception as e:
         print(f"❌ ERRO NO CLIENTE MQTT: {e}")
         logging.error(f"❌ Erro no cliente MQTT: {e}")
-        client.disconnect()
+    finally:
+        encerrar_ingestao(client)
+        presenca.encerrar()
+        pool_conexoes.fechar()
+        spool.fechar()
+        if servidor_metricas is not None:
+            servidor_metricas.shutdown()
+        ouvinte_logs.stop()
+
+async def consumir_mensagens(client, publicador, escritor_async):
+    """Processa as mensagens do broker no loop, respeitando o limite de leituras pendentes do escritor"""
+    async for message in client.messages:
+        recebida_em = datetime.now()
+        mensagem = Mensagem(message.topic.value, message.payload, message.properties)
+        MENSAGENS.inc(mensagem.topic)
+        if not limitador.permitir(mensagem.topic, publicador, mensagem, escritor_async, recebida_em):
+            continue
+        await escritor_async.aguardar_espaco()
+        processar_mensagem(publicador, mensagem, escritor_async, recebida_em)
+
+async def encerrar_ingestao_async(client, publicador, escritor_async, consumo, prazo=config.ENCERRAMENTO_PRAZO):
+    """Versão de ``encerrar_ingestao`` para o modo asyncio, com a conexão ainda aberta"""
+    limite = time.monotonic() + prazo
+    restante = lambda: max(0.0, limite - time.monotonic())
+    logging.info(f"🛑 Encerrando a ingestão (prazo de {prazo:.0f}s)...")
+    
+    # Com sessão persistente as assinaturas ficam no broker; o que chegar depois da
+    # desconexão (ao sair do ``async with``) é entregue no próximo início
+    if not config.MQTT_SESSAO_PERSISTENTE:
+        try:
+            await asyncio.wait_for(client.unsubscribe([topico for topico, _ in TOPICOS_INSCRICAO]), min(5.0, restante()))
+        except (aiomqtt.MqttError, asyncio.TimeoutError) as e:
+            logging.warning(f"⚠️ Falha ao cancelar as assinaturas: {e}")
+    consumo.cancel()
+    await asyncio.gather(consumo, return_exceptions=True)
+    
+    # Mensagens já recebidas foram confirmadas ao broker (antes do UNSUBACK ou da desconexão)
+    while len(client.messages) and restante() > 0:
+        message = await anext(client.messages)
+        MENSAGENS.inc(message.topic.value)
+        processar_mensagem(publicador, Mensagem(message.topic.value, message.payload, message.properties),
+                           escritor_async)
+    
+    # Entregas já agendadas pela thread do limitador rodam no sleep(0); as retidas, em seguida
+    retidas = limitador.encerrar()
+    await asyncio.sleep(0)
+    for args in retidas:
+        processar_mensagem(*args)
+    
+    # Comandos da bomba gerados no esvaziamento saem antes da desconexão
+    try:
+        await asyncio.wait_for(publicador.aguardar(), min(5.0, restante()))
+    except asyncio.TimeoutError:
+        logging.warning("⚠️ Comandos da bomba ainda pendentes no fim do prazo de publicação")
+    
+    await escritor_async.encerrar(restante())
+    logging.info(f"✅ Ingestão encerrada em {prazo - restante():.1f}s.")
+
+async def main_async():
+    """Executa assinatura, parse, controle da bomba e gravação em um único loop asyncio"""
+    print("🚀 INICIANDO CLIENTE MQTT (ASYNCIO)...")
+    logging.info("🚀 Iniciando cliente MQTT em modo asyncio...")
+    
+    pool_async = criar_pool_async(db_user, db_password, db_dsn)
+    escritor_async = EscritorLotesAsync(pool_async, COMANDOS_INSERCAO,
+                                        antes_de_gravar=verificar_sensores_do_lote_async,
+                                        depois_de_inserir=atualizar_rollups_async, spool=spool)
+    PROFUNDIDADE_FILAS.acompanhar(escritor_async.pendentes, 'escritor')
+    SESSOES_POOL.acompanhar(lambda: pool_async.busy, 'ocupadas')
+    SESSOES_POOL.acompanhar(lambda: pool_async.opened, 'abertas')
+    SESSOES_POOL.acompanhar(lambda: pool_async.max, 'maximo')
+    servidor_metricas = iniciar_metricas()
+    
+    parada = asyncio.Event()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sinal, parada.set)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C continua chegando como KeyboardInterrupt
+    try:
+        async with pool_async.acquire() as conn:
+            await registro_sensores.carregar_async(conn)
+            await indice_dispositivos.carregar_async(conn)
+    except oracledb.Error as e:
+        logging.error(f"Erro ao carregar registro de sensores: {e}")
+    
+    escritor_async.iniciar()
+    # Mensagens retidas pelo limitador voltam ao loop a partir da thread dele
+    loop = asyncio.get_running_loop()
+    limitador.iniciar(lambda *args: loop.call_soon_threadsafe(processar_mensagem, *args))
+    presenca.iniciar()
+    tls_params = aiomqtt.TLSParameters(cert_reqs=ssl.CERT_NONE, tls_version=ssl.PROTOCOL_TLSv1_2) if mqtt_tls else None
+    protocolo = aiomqtt.ProtocolVersion.V5 if config.INGESTAO_GRUPO else aiomqtt.ProtocolVersion.V311
+    
+    try:
+        while not parada.is_set():
+            try:
+                print(f"🔗 CONECTANDO AO BROKER {mqtt_server}:{mqtt_port}...")
+                logging.info(f"🔗 Conectando ao broker {mqtt_server}:{mqtt_port}...")
+                async with aiomqtt.Client(
+                    mqtt_server, mqtt_port,
+                    username=mqtt_user, password=mqtt_password, identifier=client_id, protocol=protocolo,
+                    clean_session=None if config.INGESTAO_GRUPO else not config.MQTT_SESSAO_PERSISTENTE,
+                    keepalive=60, max_inflight_messages=config.MQTT_INFLIGHT,
+                    max_queued_outgoing_messages=config.MQTT_FILA_MAXIMA,
+                    tls_params=tls_params, tls_insecure=True if mqtt_tls else None,
+                    **opcoes_de_sessao()
+                ) as client:
+                    await client.subscribe(TOPICOS_INSCRICAO)
+                    espera_reconexao.reiniciar()
+                    logging.info("🟢 Conectado ao broker MQTT e inscrito nos tópicos.")
+                    publicador = PublicadorAsync(client)
+                    
+                    consumo = asyncio.create_task(consumir_mensagens(client, publicador, escritor_async))
+                    espera = asyncio.create_task(parada.wait())
+                    await asyncio.wait({consumo, espera}, return_when=asyncio.FIRST_COMPLETED)
+                    espera.cancel()
+                    if parada.is_set():
+                        print("🛑 CLIENTE MQTT ENCERRANDO...")
+                        await encerrar_ingestao_async(client, publicador, escritor_async, consumo)
+                    else:
+                        consumo.result()
+            except aiomqtt.MqttError as e:
+                if parada.is_set():
+                    break
+                RECONEXOES.inc()
+                espera = espera_reconexao.proxima()
+                logging.warning(f"⚠️ Conexão MQTT perdida: {e}. Reconectando em {espera:.1f}s...")
+                try:
+                    await asyncio.wait_for(parada.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        # Sem conexão (ou após o encerramento ordenado, quando não há mais nada pendente)
+        await escritor_async.encerrar(config.ENCERRAMENTO_PRAZO)
+        presenca.encerrar()
+        await pool_async.close(force=True)
+        spool.fechar()
+        if servidor_metricas is not None:
+            servidor_metricas.shutdown()
+        ouvinte_logs.stop()
 
 if __name__ == "__main__":
-    main()
+    if config.INGESTAO_MODO == 'asyncio':
+        try:
+            asyncio.run(main_async())
+        except KeyboardInterrupt:
+            print("🛑 CLIENTE MQTT ENCERRADO PELO USUÁRIO")
+            logging.info("🛑 Cliente MQTT encerrado pelo usuário")
+    else:
+        main()
@@ -6,6 +6,13 @@ import os
 import logging
 import signal
 from datetime import datetime
+from ingestao import config
+
+# Nome do grupo de assinatura compartilhada quando há mais de um worker de ingestão
+GRUPO_PADRAO = "farmtech"
+
+# Folga, além do prazo de encerramento da ingestão, antes de matar um processo que não saiu
+FOLGA_ENCERRAMENTO = 5
 
 def setup_logging():
     log_dir = "logs"
@@ -18,7 +25,7 @@ def setup_logging():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
-def start_mqtt_client():
+def start_mqtt_client(worker=0):
     # Configura o ambiente Python
     env = os.environ.copy()
     src_path = os.path.abspath("src")
@@ -27,13 +34,18 @@ def start_mqtt_client():
     else:
         env['PYTHONPATH'] = src_path
 
+    # Com mais de um worker, todos entram no mesmo grupo de assinatura compartilhada
+    env['INGESTAO_WORKER'] = str(worker)
+    if config.INGESTAO_WORKERS > 1:
+        env['INGESTAO_GRUPO'] = config.INGESTAO_GRUPO or GRUPO_PADRAO
+
     mqtt_process = subprocess.Popen([
         sys.executable,
         "-u",  # Força saída sem buffer
         "src/mqtt_client.py"
     ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
     
-    logging.info("Cliente MQTT iniciado com PID: %d", mqtt_process.pid)
+    logging.info("Cliente MQTT (worker %d) iniciado com PID: %d", worker, mqtt_process.pid)
     return mqtt_process
 
 def start_streamlit():
@@ -54,6 +66,26 @@ def start_streamlit():
     logging.info("Streamlit iniciado com PID: %d", streamlit_process.pid)
     return streamlit_process
 
+def stop_processes(processes, timeout):
+    """
+    Pede o encerramento ordenado (SIGTERM) a todos os processos e espera até ``timeout`` segundos.
+
+    O cliente MQTT usa o sinal para esvaziar as filas e gravar os lotes
+    pendentes; quem não terminar no prazo é morto.
+    """
+    processes = [process for process in processes if process is not None and process.poll() is None]
+    for process in processes:
+        process.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        try:
+            # communicate lê os pipes, evitando que o filho trave escrevendo neles durante o encerramento
+            process.communicate(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            logging.error("Processo %d não encerrou em %ss; finalizando à força.", process.pid, timeout)
+            process.kill()
+            process.communicate()
+
 def check_process(process, name):
     if process.poll() is not None:
         logging.error(f"{name} parou. Código de saída: {process.poll()}")
@@ -62,15 +94,14 @@ def check_process(process, name):
 
 def run_apps():
     setup_logging()
-    mqtt_process = None
+    mqtt_processes = []
     streamlit_process = None
     
     def cleanup(signum, frame):
+        # O encerramento ordenado dos processos acontece no finally; um segundo sinal não o interrompe
         logging.info("Recebido sinal de término. Encerrando processos...")
-        if mqtt_process:
-            mqtt_process.terminate()
-        if streamlit_process:
-            streamlit_process.terminate()
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
         sys.exit(0)
     
     # Registra handler para SIGTERM e SIGINT
@@ -81,20 +112,20 @@ def run_apps():
         logging.info("Iniciando aplicações...")
         print("🚀 Iniciando FarmTech Solutions...")
         
-        # Inicia MQTT Client
-        print("📡 Iniciando cliente MQTT...")
-        mqtt_process = start_mqtt_client()
+        # Inicia os workers do cliente MQTT
+        print(f"📡 Iniciando cliente MQTT ({config.INGESTAO_WORKERS} worker(s))...")
+        mqtt_processes = [start_mqtt_client(worker) for worker in range(config.INGESTAO_WORKERS)]
         time.sleep(3)  # Aguarda inicialização do MQTT
         
         # Verifica se MQTT iniciou corretamente
-        if not check_process(mqtt_process, "Cliente MQTT"):
-            out, err = mqtt_process.communicate()
-            logging.error(f"Falha ao iniciar cliente MQTT. Saída: {out.decode() if out else ''}")
-            logging.error(f"Erro: {err.decode() if err else ''}")
-            print("❌ Falha ao iniciar cliente MQTT")
-            return
-        else:
-            print("✅ Cliente MQTT iniciado com sucesso")
+        for worker, mqtt_process in enumerate(mqtt_processes):
+            if not check_process(mqtt_process, f"Cliente MQTT (worker {worker})"):
+                out, err = mqtt_process.communicate()
+                logging.error(f"Falha ao iniciar cliente MQTT. Saída: {out.decode() if out else ''}")
+                logging.error(f"Erro: {err.decode() if err else ''}")
+                print("❌ Falha ao iniciar cliente MQTT")
+                return
+        print("✅ Cliente MQTT iniciado com sucesso")
             
         # Inicia Streamlit
         print("🌐 Iniciando dashboard Streamlit...")
@@ -108,23 +139,22 @@ def run_apps():
         
         # Loop principal de monitoramento
         while True:
-            # Verifica MQTT
-            if not check_process(mqtt_process, "Cliente MQTT"):
-                out, err = mqtt_process.communicate()
-                logging.error(f"Cliente MQTT parou. Saída: {out.decode() if out else ''}")
-                logging.error(f"Erro: {err.decode() if err else ''}")
-                
-                print("🔄 Reiniciando cliente MQTT...")
-                logging.info("Reiniciando cliente MQTT...")
-                mqtt_process.terminate()
-                mqtt_process = start_mqtt_client()
-                time.sleep(3)
+            # Verifica cada worker MQTT
+            for worker, mqtt_process in enumerate(mqtt_processes):
+                if not check_process(mqtt_process, f"Cliente MQTT (worker {worker})"):
+                    out, err = mqtt_process.communicate()
+                    logging.error(f"Cliente MQTT parou. Saída: {out.decode() if out else ''}")
+                    logging.error(f"Erro: {err.decode() if err else ''}")
+                    
+                    print(f"🔄 Reiniciando cliente MQTT (worker {worker})...")
+                    logging.info(f"Reiniciando cliente MQTT (worker {worker})...")
+                    mqtt_processes[worker] = start_mqtt_client(worker)
+                    time.sleep(3)
             
             # Verifica Streamlit
             if not check_process(streamlit_process, "Streamlit"):
                 print("🔄 Reiniciando Streamlit...")
                 logging.info("Reiniciando Streamlit...")
-                streamlit_process.terminate()
                 streamlit_process = start_streamlit()
                 time.sleep(2)
             
@@ -138,10 +168,7 @@ def run_apps():
         logging.error(f"Erro: {e}")
     finally:
         logging.info("Encerrando aplicações...")
-        if mqtt_process:
-            mqtt_process.terminate()
-        if streamlit_process:
-            streamlit_process.terminate()
+        stop_processes(mqtt_processes + [streamlit_process], config.ENCERRAMENTO_PRAZO + FOLGA_ENCERRAMENTO)
         print("👋 FarmTech Solutions encerrado")
 
 if __name__ == "__main__":
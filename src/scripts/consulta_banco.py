@@ -25,7 +25,9 @@ def carregar_dados_umidade(conn, logging):
         # Conexão usando SQLAlchemy com o Oracle
         engine = create_engine(f'oracle+oracledb://{Config.user}:{Config.password}@{Config.dsn}')
         
-        # Query para carregar apenas dados de leitura e umidade (últimos 50 registros)
+        # Query para carregar apenas dados de leitura e umidade (últimos 50 registros).
+        # O ORDER BY usa as colunas da tabela (l.), e não os aliases de TO_CHAR, para que o
+        # índice IX_LEITURA_*_DATA entregue as linhas já ordenadas e o ROWNUM pare cedo
         query = """
         SELECT * FROM (
             SELECT 
@@ -33,9 +35,11 @@ def carregar_dados_umidade(conn, logging):
                 TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura,
                 valor_umidade_leitura
             FROM 
-                LEITURA_SENSOR_UMIDADE
+                LEITURA_SENSOR_UMIDADE l
+            WHERE 
+                l.data_leitura IS NOT NULL
             ORDER BY 
-                data_leitura DESC, hora_leitura DESC
+                l.data_leitura DESC, l.hora_leitura DESC
         ) WHERE ROWNUM <= 50
         """
         
@@ -79,9 +83,11 @@ def carregar_dados_temperatura(conn, logging):
                 TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura,
                 valor_temperatura
             FROM 
-                LEITURA_SENSOR_TEMPERATURA
+                LEITURA_SENSOR_TEMPERATURA l
+            WHERE 
+                l.data_leitura IS NOT NULL
             ORDER BY 
-                data_leitura DESC, hora_leitura DESC
+                l.data_leitura DESC, l.hora_leitura DESC
         ) WHERE ROWNUM <= 50
         """
         
@@ -122,9 +128,11 @@ def carregar_dados_ph(conn, logging):
                 TO_CHAR(hora_leitura, 'HH24:MI:SS') as hora_leitura,
                 valor_ph_leitura
             FROM 
-                LEITURA_SENSOR_PH
+                LEITURA_SENSOR_PH l
+            WHERE 
+                l.data_leitura IS NOT NULL
             ORDER BY 
-                data_leitura DESC, hora_leitura DESC
+                l.data_leitura DESC, l.hora_leitura DESC
         ) WHERE ROWNUM <= 50
         """
         
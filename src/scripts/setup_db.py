@@ -1,9 +1,15 @@
 import os
+import sys
 from dotenv import load_dotenv
 import oracledb
 import logging
 import streamlit as st
 
+# Adiciona o diretório src ao path para usar os limites da ingestão
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestao.rollups import LIMITES
+
 # Configuração do logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -18,6 +24,10 @@ console_handler.setLevel(logging.INFO)
 console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 logger.addHandler(console_handler)
 
+# Início da faixa de IDs dos sensores cadastrados pelos dispositivos farm/ (ingestao.dispositivos.ID_SENSOR_DISPOSITIVOS):
+# abaixo dela ficam os sensores cadastrados à mão ou pelo id_sensor dos tópicos sensor/
+ID_SENSOR_DISPOSITIVOS = 1000000000
+
 def criar_sequencias_e_triggers(conn):
     """Cria sequências e triggers para IDs automáticos nas tabelas que precisam de IDs gerados automaticamente."""
     cursor = conn.cursor()
@@ -31,6 +41,7 @@ def criar_sequencias_e_triggers(conn):
         'LEITURA_SENSOR_PH': 'id_leitura_ph',
         'SENSOR_NUTRIENTES': 'id_sensor_nutrientes',
         'LEITURA_SENSOR_NUTRIENTES': 'id_leitura_nutrientes',
+        'LEITURA_AGREGADA': 'id_leitura_agregada',
         'CLIMA': 'id_clima'
     }
     
@@ -59,6 +70,20 @@ def criar_sequencias_e_triggers(conn):
         except oracledb.DatabaseError as e:
             logger.error(f"Erro ao criar sequência ou trigger para a tabela {tabela}: {e}")
             conn.rollback()
+
+    # Sequência própria dos sensores cadastrados por dispositivo, em faixa separada dos SENSOR_*_SEQ
+    try:
+        cursor.execute(f"""
+            BEGIN
+                EXECUTE IMMEDIATE 'CREATE SEQUENCE DISPOSITIVO_SENSOR_SEQ START WITH {ID_SENSOR_DISPOSITIVOS} INCREMENT BY 1';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -955 THEN RAISE; END IF;
+            END;
+        """)
+        logger.info("Sequência 'DISPOSITIVO_SENSOR_SEQ' criada ou já existia.")
+    except oracledb.DatabaseError as e:
+        logger.error(f"Erro ao criar a sequência DISPOSITIVO_SENSOR_SEQ: {e}")
     cursor.close()
 
 def tabela_existe(cursor, nome_tabela):
@@ -66,8 +91,9 @@ def tabela_existe(cursor, nome_tabela):
     return cursor.fetchone()[0] > 0
 
 def criar_tabelas(conn):
-    """Cria todas as tabelas necessárias no banco de dados Oracle se elas não existirem."""
+    """Cria todas as tabelas necessárias no banco de dados Oracle se elas não existirem. Retorna as tabelas criadas."""
     cursor = conn.cursor()
+    criadas = []
     try:
         tabelas = {
             'PRODUTOR': """
@@ -118,6 +144,7 @@ def criar_tabelas(conn):
                     valor_umidade_leitura DECIMAL(10,2),
                     limite_minimo_umidade DECIMAL(10,2),
                     limite_maximo_umidade DECIMAL(10,2),
+                    recebida_em TIMESTAMP,
                     FOREIGN KEY (id_sensor_umidade) REFERENCES Sensor_Umidade(id_sensor_umidade)
                 )
             """,
@@ -130,6 +157,7 @@ def criar_tabelas(conn):
                     valor_temperatura DECIMAL(10,2),
                     limite_minimo_temperatura DECIMAL(10,2),
                     limite_maximo_temperatura DECIMAL(10,2),
+                    recebida_em TIMESTAMP,
                     FOREIGN KEY (id_sensor_umidade) REFERENCES Sensor_Umidade(id_sensor_umidade)
                 )
             """,
@@ -152,6 +180,7 @@ def criar_tabelas(conn):
                     valor_ph_leitura DECIMAL(10,2),
                     limite_minimo_ph DECIMAL(10,2),
                     limite_maximo_ph DECIMAL(10,2),
+                    recebida_em TIMESTAMP,
                     FOREIGN KEY (id_sensor_ph) REFERENCES Sensor_PH(id_sensor_ph)
                 )
             """,
@@ -174,9 +203,48 @@ def criar_tabelas(conn):
                     valor_nutrientes_leitura DECIMAL(10,2),
                     limite_minimo_nutrientes DECIMAL(10,2),
                     limite_maximo_nutrientes DECIMAL(10,2),
+                    recebida_em TIMESTAMP,
                     FOREIGN KEY (id_sensor_nutrientes) REFERENCES Sensor_Nutrientes(id_sensor_nutrientes)
                 )
             """,
+            'DISPOSITIVO_SENSOR': """
+                CREATE TABLE Dispositivo_Sensor (
+                    id_campo NUMBER NOT NULL,
+                    codigo_dispositivo VARCHAR2(64) NOT NULL,
+                    tabela_sensor VARCHAR2(30) NOT NULL,
+                    id_sensor NUMBER NOT NULL,
+                    PRIMARY KEY (id_campo, codigo_dispositivo, tabela_sensor),
+                    FOREIGN KEY (id_campo) REFERENCES Campo(id_campo)
+                )
+            """,
+            'LEITURA_AGREGADA': """
+                CREATE TABLE Leitura_Agregada (
+                    id_leitura_agregada NUMBER PRIMARY KEY,
+                    tipo_sensor VARCHAR2(30) NOT NULL,
+                    id_sensor NUMBER NOT NULL,
+                    inicio_janela TIMESTAMP NOT NULL,
+                    duracao_janela NUMBER NOT NULL,
+                    valor_minimo DECIMAL(10,2),
+                    valor_maximo DECIMAL(10,2),
+                    valor_medio DECIMAL(10,2),
+                    quantidade_leituras NUMBER,
+                    recebida_em TIMESTAMP
+                )
+            """,
+            'ROLLUP_LEITURA': """
+                CREATE TABLE Rollup_Leitura (
+                    tipo_sensor VARCHAR2(30) NOT NULL,
+                    id_sensor NUMBER NOT NULL,
+                    duracao_periodo NUMBER NOT NULL,
+                    inicio_periodo TIMESTAMP NOT NULL,
+                    quantidade NUMBER NOT NULL,
+                    soma NUMBER NOT NULL,
+                    minimo DECIMAL(10,2),
+                    maximo DECIMAL(10,2),
+                    fora_limite NUMBER NOT NULL,
+                    PRIMARY KEY (tipo_sensor, duracao_periodo, inicio_periodo, id_sensor)
+                )
+            """,
             'CLIMA': """
                 CREATE TABLE Clima (
                     id_clima NUMBER PRIMARY KEY,
@@ -195,6 +263,7 @@ def criar_tabelas(conn):
         for nome_tabela, comando_sql in tabelas.items():
             if not tabela_existe(cursor, nome_tabela):
                 cursor.execute(comando_sql)
+                criadas.append(nome_tabela)
                 logger.info(f"Tabela '{nome_tabela}' criada com sucesso.")
             else:
                 logger.info(f"Tabela '{nome_tabela}' já existe.")
@@ -206,11 +275,140 @@ def criar_tabelas(conn):
         conn.rollback()
     finally:
         cursor.close()
+    return criadas
+
+# Leituras já gravadas que entram nos rollups quando ROLLUP_LEITURA é criada:
+# (tipo, tabela, coluna do sensor, coluna do valor); os limites de fora_limite vêm de ingestao.rollups.LIMITES
+ROLLUPS_INICIAIS = [
+    ('umidade', 'LEITURA_SENSOR_UMIDADE', 'id_sensor_umidade', 'valor_umidade_leitura'),
+    ('temperatura', 'LEITURA_SENSOR_TEMPERATURA', 'id_sensor_umidade', 'valor_temperatura'),
+    ('ph', 'LEITURA_SENSOR_PH', 'id_sensor_ph', 'valor_ph_leitura'),
+    ('nutrientes', 'LEITURA_SENSOR_NUTRIENTES', 'id_sensor_nutrientes', 'valor_nutrientes_leitura')
+]
+PERIODOS_ROLLUP = {60: 'MI', 3600: 'HH', 86400: 'DD'}
+
+def popular_rollups(conn):
+    """Calcula os rollups das leituras existentes; daí em diante a ingestão os mantém."""
+    cursor = conn.cursor()
+    try:
+        for tipo, tabela, coluna_sensor, coluna_valor in ROLLUPS_INICIAIS:
+            # Tipos sem faixa (nutrientes) nunca contam leituras fora do limite, como na ingestão
+            if tipo in LIMITES:
+                minimo, maximo = LIMITES[tipo]
+                fora_limite = f"SUM(CASE WHEN valor < {minimo} OR valor > {maximo} THEN 1 ELSE 0 END)"
+            else:
+                fora_limite = "0"
+            for duracao, formato in PERIODOS_ROLLUP.items():
+                # A hora da temperatura é gravada com data base; a data vem de data_leitura
+                cursor.execute(f"""
+                    INSERT INTO ROLLUP_LEITURA
+                    (tipo_sensor, id_sensor, duracao_periodo, inicio_periodo, quantidade, soma, minimo, maximo, fora_limite)
+                    SELECT '{tipo}', id_sensor, {duracao}, TRUNC(momento, '{formato}'), COUNT(*), SUM(valor),
+                           MIN(valor), MAX(valor), {fora_limite}
+                    FROM (
+                        SELECT {coluna_sensor} AS id_sensor, {coluna_valor} AS valor,
+                               CAST(data_leitura AS TIMESTAMP) + (hora_leitura - TRUNC(hora_leitura)) AS momento
+                        FROM {tabela}
+                        WHERE {coluna_sensor} IS NOT NULL AND {coluna_valor} IS NOT NULL
+                    )
+                    GROUP BY id_sensor, TRUNC(momento, '{formato}')
+                """)
+            logger.info(f"Rollups de '{tabela}' calculados a partir das leituras existentes.")
+        conn.commit()
+    except oracledb.DatabaseError as e:
+        logger.error(f"Erro ao calcular os rollups iniciais: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
+# Tabelas que guardam, ao lado do horário do dispositivo, o instante em que a ingestão recebeu a mensagem
+TABELAS_RECEBIMENTO = ['LEITURA_SENSOR_UMIDADE', 'LEITURA_SENSOR_TEMPERATURA', 'LEITURA_SENSOR_PH',
+                       'LEITURA_SENSOR_NUTRIENTES', 'LEITURA_AGREGADA']
+
+def adicionar_colunas(conn):
+    """Adiciona às tabelas criadas antes dela a coluna recebida_em (nula nas linhas antigas)."""
+    cursor = conn.cursor()
+    for tabela in TABELAS_RECEBIMENTO:
+        try:
+            cursor.execute(f"ALTER TABLE {tabela} ADD (recebida_em TIMESTAMP)")
+            logger.info(f"Coluna 'recebida_em' adicionada à tabela '{tabela}'.")
+        except oracledb.DatabaseError as e:
+            erro, = e.args
+            if erro.code == 1430:  # coluna já existe
+                logger.info(f"Tabela '{tabela}' já tem a coluna 'recebida_em'.")
+            else:
+                logger.error(f"Erro ao adicionar 'recebida_em' à tabela {tabela}: {e}")
+    cursor.close()
+
+def criar_indices(conn):
+    """Cria os índices usados pela ingestão se eles não existirem."""
+    cursor = conn.cursor()
+    indices = {
+        # Índices únicos: barram leituras repetidas (mensagens retidas / reentregas QoS1)
+        'UX_LEITURA_UMIDADE': """
+            CREATE UNIQUE INDEX UX_LEITURA_UMIDADE ON Leitura_sensor_Umidade
+            (id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura)
+        """,
+        'UX_LEITURA_TEMPERATURA': """
+            CREATE UNIQUE INDEX UX_LEITURA_TEMPERATURA ON Leitura_sensor_Temperatura
+            (id_sensor_umidade, data_leitura, hora_leitura, valor_temperatura)
+        """,
+        'UX_LEITURA_PH': """
+            CREATE UNIQUE INDEX UX_LEITURA_PH ON Leitura_sensor_PH
+            (id_sensor_ph, data_leitura, hora_leitura, valor_ph_leitura)
+        """,
+        'UX_LEITURA_NUTRIENTES': """
+            CREATE UNIQUE INDEX UX_LEITURA_NUTRIENTES ON Leitura_sensor_Nutrientes
+            (id_sensor_nutrientes, data_leitura, hora_leitura, valor_nutrientes_leitura)
+        """,
+        'UX_LEITURA_AGREGADA': """
+            CREATE UNIQUE INDEX UX_LEITURA_AGREGADA ON Leitura_Agregada
+            (tipo_sensor, id_sensor, inicio_janela, duracao_janela)
+        """,
+        # Gráficos de longo prazo do dashboard: intervalo de tempo por tipo
+        'IX_LEITURA_AGREGADA_INICIO': """
+            CREATE INDEX IX_LEITURA_AGREGADA_INICIO ON Leitura_Agregada
+            (tipo_sensor, inicio_janela)
+        """,
+        # Consultas ordenadas pelo horário do dispositivo: as linhas chegam na ordem de
+        # recebimento (backfills fora de ordem), então a ordem vem do índice e não de um sort
+        'IX_LEITURA_UMIDADE_DATA': """
+            CREATE INDEX IX_LEITURA_UMIDADE_DATA ON Leitura_sensor_Umidade (data_leitura, hora_leitura)
+        """,
+        'IX_LEITURA_TEMPERATURA_DATA': """
+            CREATE INDEX IX_LEITURA_TEMPERATURA_DATA ON Leitura_sensor_Temperatura (data_leitura, hora_leitura)
+        """,
+        'IX_LEITURA_PH_DATA': """
+            CREATE INDEX IX_LEITURA_PH_DATA ON Leitura_sensor_PH (data_leitura, hora_leitura)
+        """,
+        # Visão de nutrientes do dashboard: intervalo de datas escolhido pelo usuário
+        'IX_LEITURA_NUTRIENTES_DATA': """
+            CREATE INDEX IX_LEITURA_NUTRIENTES_DATA ON Leitura_sensor_Nutrientes (data_leitura, hora_leitura)
+        """
+    }
+
+    for nome_indice, comando_sql in indices.items():
+        try:
+            cursor.execute(comando_sql)
+            logger.info(f"Índice '{nome_indice}' criado com sucesso.")
+        except oracledb.DatabaseError as e:
+            erro, = e.args
+            if erro.code == 955:  # nome já usado por outro objeto
+                logger.info(f"Índice '{nome_indice}' já existe.")
+            elif erro.code == 1452:  # há linhas duplicadas na tabela
+                logger.error(f"Índice '{nome_indice}' não criado: remova as leituras duplicadas e rode o setup novamente.")
+            else:
+                logger.error(f"Erro ao criar índice {nome_indice}: {e}")
+    cursor.close()
 
 def setup_banco_dados(conn):
     logger.info("Iniciando configuração do banco de dados")
-    criar_tabelas(conn)
+    criadas = criar_tabelas(conn)
+    adicionar_colunas(conn)
     criar_sequencias_e_triggers(conn)
+    criar_indices(conn)
+    if 'ROLLUP_LEITURA' in criadas:
+        popular_rollups(conn)
     logger.info("Configuração do banco de dados concluída")
 
 if __name__ == "__main__":